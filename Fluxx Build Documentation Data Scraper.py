@@ -6,33 +6,66 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import WebDriverException, TimeoutException
+from selenium.common.exceptions import (WebDriverException, TimeoutException,
+                                        NoSuchElementException, StaleElementReferenceException)
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 from getpass import getpass
-from urllib.parse import urlparse
+from urllib.parse import urlparse, parse_qs, unquote
 import sys
+import argparse
 import platform
 import os
 import re
 import subprocess
 import json
 import zipfile
+import io
 import requests
-import winreg
+try:
+    import winreg
+except ImportError:
+    winreg = None  # Only needed on Windows to locate Chrome
 import shutil
+import signal
+try:
+    import resource
+except ImportError:
+    resource = None  # Unix only; peak memory uses the Win32 API on Windows
+import tempfile
+import sqlite3
+import hashlib
+import functools
+import cProfile
+import pstats
+import tracemalloc
+import heapq
+from abc import ABC, abstractmethod
+import random
 import time
 from docx import Document
-from docx.shared import Pt, RGBColor
+from docx.shared import Pt, RGBColor, Emu, Twips
+from docx.enum.style import WD_STYLE_TYPE
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 import datetime
 import threading
+import queue
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import base64
+import gzip
+from html import escape as html_escape
+from html.parser import HTMLParser
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from xml.sax.saxutils import escape as xml_escape
 
-print("Script starting...")
-print(f"Python version: {sys.version}")
-print(f"Current working directory: {os.getcwd()}")
+# Worker processes re-import this script; only the main process prints the banner
+if __name__ == "__main__":
+    print("Script starting...")
+    print(f"Python version: {sys.version}")
+    print(f"Current working directory: {os.getcwd()}")
 
 def print_logo():
     """Print the Social Edge logo and contact info"""
@@ -289,6 +322,764 @@ def wait_with_spinner(message, action_func, *args, **kwargs):
         spinner_thread.join()
         raise e
 
+TIMEOUT_PROFILE_FILE = 'fluxx_timeouts.json'
+
+def percentile(values, pct):
+    """Return the nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+class TimeoutProfile:
+    """Learn wait timeouts per tenant and operation from observed latencies
+
+    Every successful wait records how long it took. Once an operation has
+    enough samples its timeout becomes p99 x safety_factor (clamped), so
+    lookups that will never succeed fail fast on quick tenants while slow
+    tenants get the time they actually need. A wait that times out is not
+    a sample: it only counts as a miss, and each consecutive miss widens the
+    timeout by miss_growth, at most max_miss_steps times, until the next
+    success. Samples persist between runs; misses do not.
+    """
+
+    def __init__(self, path=TIMEOUT_PROFILE_FILE, safety_factor=3.0, min_timeout=2.0,
+                 max_timeout=90.0, min_samples=20, max_samples=500, miss_growth=1.5, max_miss_steps=2):
+        self.path = path
+        self.safety_factor = safety_factor
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.miss_growth = miss_growth
+        self.max_miss_steps = max_miss_steps
+        self.tenant = None
+        self.samples = {}  # operation -> recent wait durations in seconds
+        self.misses = {}  # operation -> timeouts since its last success
+        self.lock = threading.RLock()
+
+    def load(self, tenant):
+        """Load the saved samples for a tenant (hostname or URL)"""
+        self.tenant = urlparse(tenant).netloc or tenant
+        self.samples = {}
+        self.misses = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            operations = saved.get('tenants', {}).get(self.tenant, {}).get('operations', {})
+            for operation, stats in operations.items():
+                self.samples[operation] = list(stats.get('samples', []))[-self.max_samples:]
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        """Persist samples and current percentiles for the loaded tenant"""
+        if not self.tenant:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            saved = {}
+        tenants = saved.setdefault('tenants', {})
+        with self.lock:
+            tenants[self.tenant] = {
+                'updated': datetime.datetime.now().isoformat(timespec='seconds'),
+                'operations': {
+                    operation: dict(self.stats(operation), samples=[round(s, 3) for s in samples])
+                    for operation, samples in self.samples.items()
+                }
+            }
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(saved, f, indent=2)
+        except OSError as e:
+            print(f"Warning: Could not save timeout profile: {str(e)}")
+
+    def record(self, operation, seconds):
+        with self.lock:
+            self.misses.pop(operation, None)
+            samples = self.samples.setdefault(operation, [])
+            samples.append(seconds)
+            if len(samples) > self.max_samples:
+                del samples[:len(samples) - self.max_samples]
+
+    def record_miss(self, operation):
+        """Count a wait that timed out; its duration only says the timeout was too short"""
+        with self.lock:
+            self.misses[operation] = self.misses.get(operation, 0) + 1
+
+    def timeout(self, operation, default):
+        """Return the timeout to use for an operation"""
+        with self.lock:
+            samples = list(self.samples.get(operation, []))
+            misses = min(self.misses.get(operation, 0), self.max_miss_steps)
+        if len(samples) < self.min_samples:
+            return default
+        learned = percentile(samples, 99) * self.safety_factor * self.miss_growth ** misses
+        return min(self.max_timeout, max(self.min_timeout, learned))
+
+    def stats(self, operation):
+        samples = self.samples.get(operation, [])
+        return {
+            'count': len(samples),
+            'p50': percentile(samples, 50),
+            'p90': percentile(samples, 90),
+            'p99': percentile(samples, 99),
+            'timeout': round(self.timeout(operation, 0), 2) if len(samples) >= self.min_samples else None
+        }
+
+TIMEOUT_PROFILE = TimeoutProfile()
+
+class AdaptiveWait(WebDriverWait):
+    """WebDriverWait whose timeout comes from TIMEOUT_PROFILE and that records its latency"""
+
+    def __init__(self, driver, operation, default=10, profile=None):
+        self.profile = profile or TIMEOUT_PROFILE
+        self.operation = operation
+        # Replayed pages are already final, so polling needs no delay
+        super().__init__(driver, self.profile.timeout(operation, default),
+                         poll_frequency=0.001 if SESSION_TRACE.replaying else 0.5)
+
+    def until(self, method, message=""):
+        start = time.monotonic()
+        try:
+            result = super().until(method, message)
+        except TimeoutException:
+            elapsed = time.monotonic() - start
+            # Many waits miss by design (a theme without a workflow), so a timeout
+            # widens the next one a bounded step instead of becoming a sample
+            self.profile.record_miss(self.operation)
+            SCAN_METRICS.record_wait(self.operation, elapsed, ok=False)
+            raise
+        self.profile.record(self.operation, time.monotonic() - start)
+        SCAN_METRICS.record_wait(self.operation, time.monotonic() - start)
+        return result
+
+def adaptive_wait(driver, operation, default=10):
+    """Create a wait sized from the observed latency of this operation"""
+    return AdaptiveWait(driver, operation, default)
+
+# Retry Policy:
+#
+# Scan loops run each entity (model, theme, method, state, action) through
+# RETRY_POLICY.call instead of swallowing every exception:
+# - stale:   the element went stale; re-resolve it by its stable key and retry
+# - timeout: a wait timed out; retry once more with backoff
+# - missing: the element is not there; record it and move on immediately
+# - error:   anything else; record it and move on
+# Repeated failures on one dashboard open a circuit so the rest of that
+# dashboard is skipped quickly instead of burning a full wait per entity.
+# Every failure is kept for the per-entity failure report at the end of the run.
+# Once the watchdog has killed a hung browser, call() raises BrowserHungError
+# instead of failing each remaining entity against the dead driver; the phase
+# loop (scan_models) then restarts the browser and scans the model again.
+
+class CircuitOpenError(Exception):
+    """Raised when a dashboard has failed too many times in a row"""
+
+class BrowserHungError(Exception):
+    """Raised when the watchdog has killed a hung browser; the model is scanned again after a restart"""
+
+def classify_error(error):
+    """Classify a scan error as stale, timeout, missing or error"""
+    if isinstance(error, StaleElementReferenceException):
+        return 'stale'
+    if isinstance(error, TimeoutException):
+        return 'timeout'
+    if isinstance(error, NoSuchElementException):
+        return 'missing'
+    if isinstance(error, CircuitOpenError):
+        return 'circuit_open'
+    return 'error'
+
+def css_string(value):
+    """Quote a value for use inside a single-quoted CSS attribute selector"""
+    return str(value).replace('\\', '\\\\').replace("'", "\\'")
+
+def find_by_stable_key(scope, selector, key, value):
+    """Re-resolve an element by a stable attribute such as data-model-id or data-card-uid"""
+    return scope.find_element(By.CSS_SELECTOR, f"{selector}[{key}='{css_string(value)}']")
+
+class RetryPolicy:
+    """Retry classified scan errors with bounded backoff and per-dashboard circuits"""
+
+    def __init__(self, attempts=None, base_delay=0.5, max_delay=4.0,
+                 circuit_threshold=5, circuit_cooldown=30.0):
+        self.attempts = attempts or {'stale': 3, 'timeout': 2, 'missing': 1, 'error': 1}
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.circuit_threshold = circuit_threshold
+        self.circuit_cooldown = circuit_cooldown
+        self.consecutive = {}  # dashboard -> consecutive failures
+        self.opened_at = {}  # dashboard -> time the circuit opened
+        self.failures = []
+        self.retries = 0
+        self.watchdog = None  # The live BrowserSession's watchdog, if any
+
+    def check_browser(self):
+        """Stop the current model at once if the watchdog has killed the browser"""
+        if self.watchdog is not None and self.watchdog.tripped:
+            raise BrowserHungError(f"{self.watchdog.operation} exceeded its deadline")
+
+    def call(self, action, dashboard, entity, resolve=None):
+        """Run action() and return its result, or None after recording a failure
+
+        resolve is called before a retry after a stale element error so the
+        action can pick up a fresh element.
+        """
+        self.check_browser()
+        if self.is_open(dashboard):
+            self.record(dashboard, entity, CircuitOpenError(f"Circuit open for {dashboard}"), 0)
+            return None
+
+        SCAN_METRICS.begin_entity(dashboard, entity)
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = action()
+                self.close_circuit(dashboard)
+                SCAN_METRICS.end_entity(attempt, True)
+                return result
+            except KeyboardInterrupt:
+                raise
+            except Exception as e:
+                if self.watchdog is not None and self.watchdog.tripped:
+                    # The error came from the killed browser, not from this entity
+                    SCAN_METRICS.end_entity(attempt, False)
+                    self.check_browser()
+                kind = classify_error(e)
+                if attempt < self.attempts.get(kind, 1):
+                    self.retries += 1
+                    pause(min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+                    if kind == 'stale' and resolve:
+                        try:
+                            resolve()
+                        except Exception:
+                            pass
+                    continue
+                self.record(dashboard, entity, e, attempt)
+                self.consecutive[dashboard] = self.consecutive.get(dashboard, 0) + 1
+                if self.consecutive[dashboard] >= self.circuit_threshold:
+                    self.opened_at[dashboard] = time.time()
+                SCAN_METRICS.end_entity(attempt, False)
+                return None
+
+    def close_circuit(self, dashboard):
+        self.consecutive[dashboard] = 0
+        self.opened_at.pop(dashboard, None)
+
+    def is_open(self, dashboard):
+        """Return True while a dashboard's circuit is open (half-open after the cooldown)"""
+        opened = self.opened_at.get(dashboard)
+        if opened is None:
+            return False
+        if time.time() - opened >= self.circuit_cooldown:
+            # Let one entity through; a success closes the circuit, a failure reopens it
+            self.opened_at[dashboard] = time.time()
+            return False
+        return True
+
+    def record(self, dashboard, entity, error, attempts):
+        self.failures.append({
+            'dashboard': dashboard,
+            'entity': dict(entity),
+            'kind': classify_error(error),
+            'message': str(getattr(error, 'msg', None) or error).strip().split('\n')[0][:300],
+            'attempts': attempts
+        })
+
+    def failed_models(self):
+        """Return the names of models with at least one failure, in first-seen order"""
+        names = []
+        for failure in self.failures:
+            name = failure['entity'].get('model')
+            if name and name not in names:
+                names.append(name)
+        return names
+
+    def report(self):
+        """Return the per-entity failure report"""
+        by_kind = {}
+        for failure in self.failures:
+            by_kind[failure['kind']] = by_kind.get(failure['kind'], 0) + 1
+        return {
+            'generated': datetime.datetime.now().isoformat(timespec='seconds'),
+            'retries': self.retries,
+            'failure_count': len(self.failures),
+            'failures_by_kind': by_kind,
+            'failed_models': self.failed_models(),
+            'failures': self.failures
+        }
+
+    def reset(self):
+        self.consecutive = {}
+        self.opened_at = {}
+        self.failures = []
+        self.retries = 0
+
+RETRY_POLICY = RetryPolicy()
+
+def print_failure_report(policy=None, save=True):
+    """Print the per-entity failure summary and save it as JSON"""
+    policy = policy or RETRY_POLICY
+    report = policy.report()
+    if not report['failures']:
+        return None
+
+    print_divider()
+    print(f"{report['failure_count']} entities could not be scanned ({report['retries']} retries made):")
+    for kind, count in sorted(report['failures_by_kind'].items()):
+        print(f"- {kind}: {count}")
+    for failure in report['failures'][:20]:
+        entity = ' / '.join(str(v) for v in failure['entity'].values())
+        print(f"  [{failure['dashboard']}] {entity}: {failure['kind']}")
+    if len(report['failures']) > 20:
+        print(f"  ... and {len(report['failures']) - 20} more")
+
+    filename = None
+    if save:
+        timestamp_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f'fluxx_failures_{timestamp_str}.json'
+        try:
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            print(f"\nFailure report saved to: {filename}")
+        except OSError as e:
+            print(f"Warning: Could not save failure report: {str(e)}")
+            filename = None
+    return filename
+
+# Scan Metrics Reference:
+#
+# SCAN_METRICS times every phase, every model within a phase and every entity
+# that goes through RETRY_POLICY.call (model tree, theme modal, method, state,
+# action), with its attempts and the time spent inside adaptive waits. Phase
+# functions call begin_phase/begin_model/end_phase; a model ends when the next
+# one begins. After each scan pass write_scan_metrics() saves
+# fluxx_metrics_<timestamp>.json and the same numbers in Prometheus text
+# format (.prom), both with slowest-N lists of models and entities.
+
+SCAN_METRICS_SCHEMA = 'fluxx-scan-metrics'
+SCAN_STATUS_SCHEMA = 'fluxx-scan-status'
+ENTITY_KINDS = ('action', 'state', 'method', 'theme', 'model')  # The most specific key names the entity
+
+class ScanMetrics:
+    """Record phase, model, entity and wait timings for one scan"""
+
+    def __init__(self, slowest=20):
+        self.slowest = slowest
+        self.lock = threading.RLock()
+        self.reset()
+
+    def reset(self, site_url=None):
+        with self.lock:
+            self.site_url = site_url
+            self.created = datetime.datetime.now()
+            self.started = time.monotonic()
+            self.filename = None
+            self.phases = {}  # phase -> totals over every run of the phase
+            self.models = []
+            self.entities = []
+            self.waits = {}  # operation -> [(seconds, ok)]
+            self.phase = None
+            self.phase_start = None
+            self.phase_done = 0  # Models finished in the current run of the phase
+            self.phase_total = None
+            self.model = None
+            self.stack = []  # Open entities; a wait is charged to the innermost one
+
+    def begin_phase(self, phase, total=None):
+        with self.lock:
+            self.end_phase()
+            self.phase = phase
+            self.phase_start = time.monotonic()
+            self.phase_done = 0
+            self.phase_total = total
+            self.phases.setdefault(phase, {'runs': 0, 'seconds': 0.0, 'models': 0, 'entities': 0,
+                                           'retries': 0, 'failures': 0, 'wait_seconds': 0.0})
+
+    def end_phase(self):
+        with self.lock:
+            self.end_model()
+            if self.phase is None:
+                return
+            totals = self.phases[self.phase]
+            totals['runs'] += 1
+            totals['seconds'] += time.monotonic() - self.phase_start
+            self.phase = None
+
+    def begin_model(self, model_name):
+        with self.lock:
+            self.end_model()
+            self.model = {'phase': self.phase, 'model': model_name, 'start': time.monotonic(),
+                          'entities': 0, 'retries': 0, 'failures': 0, 'wait_seconds': 0.0}
+
+    def end_model(self):
+        with self.lock:
+            model, self.model = self.model, None
+            if model is None:
+                return
+            model['seconds'] = time.monotonic() - model.pop('start')
+            self.models.append(model)
+            if model['phase'] in self.phases:
+                self.phases[model['phase']]['models'] += 1
+            if model['phase'] == self.phase:
+                self.phase_done += 1
+
+    def discard_model(self):
+        """Drop the current model's timing, e.g. when it is scanned again after a browser restart"""
+        with self.lock:
+            self.model = None
+
+    def begin_entity(self, dashboard, entity):
+        with self.lock:
+            kind = next((key for key in ENTITY_KINDS if key in entity), 'other')
+            self.stack.append({'phase': self.phase, 'dashboard': dashboard, 'kind': kind, 'entity': entity,
+                               'start': time.monotonic(), 'wait_seconds': 0.0})
+
+    def end_entity(self, attempts, ok):
+        with self.lock:
+            if not self.stack:
+                return
+            record = self.stack.pop()
+            record['seconds'] = time.monotonic() - record.pop('start')
+            # Scan loops fill the entity in as they go (e.g. a state's header), so read it now
+            record['entity'] = ' / '.join(str(value) for value in record['entity'].values())
+            record['attempts'] = attempts
+            record['ok'] = ok
+            self.entities.append(record)
+            for totals in (self.phases.get(record['phase']), self.model):
+                if totals is not None:
+                    totals['entities'] += 1
+                    totals['retries'] += max(0, attempts - 1)
+                    totals['failures'] += 0 if ok else 1
+
+    def record_wait(self, operation, seconds, ok=True):
+        with self.lock:
+            self.waits.setdefault(operation, []).append((seconds, ok))
+            for owner in [self.phases.get(self.phase), self.model] + self.stack[-1:]:
+                if owner is not None:
+                    owner['wait_seconds'] += seconds
+
+    def report(self):
+        """Return the metrics report as a JSON-ready dict"""
+        with self.lock:
+            def summary(values):
+                return {'count': len(values), 'seconds': round(sum(values), 3),
+                        'p50': round(percentile(values, 50), 3), 'p90': round(percentile(values, 90), 3),
+                        'max': round(max(values), 3)}
+            
+            def rounded(record):
+                return {key: round(value, 3) if isinstance(value, float) else value for key, value in record.items()}
+            
+            by_kind = {}
+            for record in self.entities:
+                by_kind.setdefault(record['kind'], []).append(record)
+            phases = {phase: rounded(totals) for phase, totals in self.phases.items()}
+            if self.phase in phases:
+                phases[self.phase]['seconds'] = round(phases[self.phase]['seconds'] + time.monotonic() - self.phase_start, 3)
+            return {
+                'schema': SCAN_METRICS_SCHEMA,
+                'site_url': self.site_url,
+                'created': self.created.isoformat(timespec='seconds'),
+                'elapsed_seconds': round(time.monotonic() - self.started, 3),
+                'phases': phases,
+                'entities': {kind: dict(summary([record['seconds'] for record in records]),
+                                        retries=sum(max(0, record['attempts'] - 1) for record in records),
+                                        failures=sum(1 for record in records if not record['ok']),
+                                        wait_seconds=round(sum(record['wait_seconds'] for record in records), 3))
+                             for kind, records in by_kind.items()},
+                'waits': {operation: dict(summary([seconds for seconds, _ in samples]),
+                                          timeouts=sum(1 for _, ok in samples if not ok))
+                          for operation, samples in self.waits.items()},
+                'slowest_models': [rounded(model) for model in
+                                   heapq.nlargest(self.slowest, self.models, key=lambda model: model['seconds'])],
+                'slowest_entities': [rounded(record) for record in
+                                     heapq.nlargest(self.slowest, self.entities, key=lambda record: record['seconds'])],
+            }
+
+    def status(self):
+        """Return the live progress of the scan as a JSON-ready dict"""
+        with self.lock:
+            now = time.monotonic()
+            phases = {}
+            for phase, totals in self.phases.items():
+                seconds = totals['seconds'] + (now - self.phase_start if phase == self.phase else 0)
+                phases[phase] = {'models': totals['models'], 'seconds': round(seconds, 1),
+                                 'models_per_second': round(totals['models'] / seconds, 3) if seconds else None}
+            throughput = eta = None
+            if self.phase is not None:
+                elapsed = now - self.phase_start
+                throughput = self.phase_done / elapsed if elapsed and self.phase_done else None
+                if throughput and self.phase_total is not None:
+                    eta = max(0, self.phase_total - self.phase_done) / throughput
+            return {
+                'schema': SCAN_STATUS_SCHEMA,
+                'site_url': self.site_url,
+                'started': self.created.isoformat(timespec='seconds'),
+                'elapsed_seconds': round(now - self.started, 1),
+                'phase': self.phase,
+                'model': self.model['model'] if self.model else None,
+                'done': self.phase_done if self.phase else None,
+                'total': self.phase_total if self.phase else None,
+                'models_per_second': round(throughput, 3) if throughput else None,
+                'eta_seconds': round(eta, 1) if eta is not None else None,
+                'retries': sum(totals['retries'] for totals in self.phases.values()),
+                'failures': sum(totals['failures'] for totals in self.phases.values()),
+                'phases': phases,
+            }
+
+    def prometheus(self):
+        """Return the live status and the metrics totals in the Prometheus text format"""
+        return prometheus_status(self.status()) + prometheus_metrics(self.report())
+
+SCAN_METRICS = ScanMetrics()
+
+def prometheus_label(value):
+    """Escape a Prometheus label value"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def prometheus_site(report):
+    """Return the site label of a metrics report or live status"""
+    return f'site="{prometheus_label(report["site_url"] or "")}"'
+
+def prometheus_metrics(*reports):
+    """Render metrics reports in the Prometheus text exposition format, one site label per report"""
+    lines = []
+    
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for report, labels, value in samples:
+            label_text = ','.join([prometheus_site(report)] +
+                                  [f'{key}="{prometheus_label(label)}"' for key, label in labels])
+            lines.append(f"{name}{{{label_text}}} {value}")
+    
+    metric('fluxx_scan_elapsed_seconds', 'gauge', "Time since the scan started",
+           [(report, (), report['elapsed_seconds']) for report in reports])
+    for key, help_text in (('seconds', "Wall time of each scan phase"),
+                           ('wait_seconds', "Time spent in adaptive waits during each phase"),
+                           ('retries', "Retries made during each phase"),
+                           ('failures', "Entities that failed after their retries"),
+                           ('models', "Models processed in each phase"),
+                           ('entities', "Entities fetched in each phase")):
+        metric(f'fluxx_scan_phase_{key}', 'gauge', help_text,
+               [(report, (('phase', phase),), totals[key]) for report in reports for phase, totals in report['phases'].items()])
+    for name, section, label, help_text in (('fluxx_scan_entity_seconds', 'entities', 'kind', "Time to fetch each entity"),
+                                            ('fluxx_scan_wait_seconds', 'waits', 'operation', "Time spent in each adaptive wait")):
+        samples = []
+        for report in reports:
+            for key, stats in report[section].items():
+                samples += [(report, ((label, key), ('quantile', quantile)), stats[field])
+                            for quantile, field in (('0.5', 'p50'), ('0.9', 'p90'), ('1', 'max'))]
+        metric(name, 'summary', help_text, samples)
+        for report in reports:
+            site = prometheus_site(report)
+            lines += [f'{name}_sum{{{site},{label}="{prometheus_label(key)}"}} {stats["seconds"]}' for key, stats in report[section].items()]
+            lines += [f'{name}_count{{{site},{label}="{prometheus_label(key)}"}} {stats["count"]}' for key, stats in report[section].items()]
+    metric('fluxx_scan_slowest_model_seconds', 'gauge', "Slowest models and the phase they were scanned in",
+           [(report, (('phase', model['phase']), ('model', model['model'])), model['seconds'])
+            for report in reports for model in report['slowest_models']])
+    metric('fluxx_scan_slowest_entity_seconds', 'gauge', "Slowest entities",
+           [(report, (('phase', record['phase']), ('kind', record['kind']), ('entity', record['entity'])), record['seconds'])
+            for report in reports for record in report['slowest_entities']])
+    return '\n'.join(lines) + '\n'
+
+def write_scan_metrics(metrics=None, show=5):
+    """Save the metrics as JSON and Prometheus text, print the slowest models, return the JSON filename"""
+    metrics = metrics or SCAN_METRICS
+    report = metrics.report()
+    if not metrics.filename:
+        metrics.filename = f'fluxx_metrics_{metrics.created.strftime("%Y%m%d_%H%M%S")}.json'
+    try:
+        with open(metrics.filename, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        with open(os.path.splitext(metrics.filename)[0] + '.prom', 'w', encoding='utf-8') as f:
+            f.write(prometheus_metrics(report))
+    except OSError as e:
+        print(f"Warning: Could not save scan metrics: {str(e)}")
+        return None
+    
+    print_divider()
+    for phase, totals in report['phases'].items():
+        print(f"{phase}: {totals['seconds']:.1f}s for {totals['models']} models, "
+              f"{totals['wait_seconds']:.1f}s waiting, {totals['retries']} retries")
+    if report['slowest_models'][:show]:
+        print("Slowest models:")
+        for model in report['slowest_models'][:show]:
+            print(f"  {model['seconds']:>7.1f}s  {model['phase']} / {model['model']}")
+    print(f"\nScan metrics saved to: {metrics.filename}")
+    return metrics.filename
+
+# Status Endpoint Reference:
+#
+# --status-port PORT serves the scan's live progress from SCAN_METRICS on
+# http://127.0.0.1:PORT while the tool runs (localhost only):
+#   /status    JSON: current phase and model, models done/total, models per
+#              second for the current phase and each finished phase, and an
+#              ETA for the current phase from its throughput so far
+#   /metrics   the same numbers plus the scan metrics totals in Prometheus
+#              text format, for scraping and alerting on shared runners
+# A batch serves its workers' statuses instead (see the Batch Reference).
+
+STATUS_SERVER_PORT = 8766
+
+def prometheus_status(*statuses):
+    """Render live statuses in the Prometheus text exposition format, one site label per status"""
+    lines = []
+    for name, key, help_text in (
+            ('fluxx_scan_models_done', 'done', "Models finished in the current phase"),
+            ('fluxx_scan_models_total', 'total', "Models in the current phase"),
+            ('fluxx_scan_models_per_second', 'models_per_second', "Throughput of the current phase"),
+            ('fluxx_scan_eta_seconds', 'eta_seconds', "Estimated seconds left in the current phase")):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        for status in statuses:
+            phase = f',phase="{prometheus_label(status["phase"])}"' if status['phase'] else ''
+            if status[key] is not None:
+                lines.append(f"{name}{{{prometheus_site(status)}{phase}}} {status[key]}")
+    lines += ["# HELP fluxx_scan_phase_models_per_second Throughput of each phase",
+              "# TYPE fluxx_scan_phase_models_per_second gauge"]
+    lines += [f'fluxx_scan_phase_models_per_second{{{prometheus_site(status)},phase="{prometheus_label(name)}"}} '
+              f'{totals["models_per_second"]}'
+              for status in statuses for name, totals in status['phases'].items() if totals['models_per_second'] is not None]
+    return '\n'.join(lines) + '\n'
+
+class StatusRequestHandler(BaseHTTPRequestHandler):
+    """Serve /status as JSON and /metrics in Prometheus format from the server's metrics (or batch status)"""
+    
+    def do_GET(self):
+        metrics = self.server.metrics
+        path = urlparse(self.path).path
+        if path in ('/', '/status'):
+            body, content_type = json.dumps(metrics.status(), indent=2), 'application/json; charset=utf-8'
+        elif path == '/metrics':
+            body = metrics.prometheus()
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            self.send_error(404)
+            return
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def log_message(self, format, *args):
+        pass
+
+def start_status_server(port=STATUS_SERVER_PORT, metrics=None):
+    """Serve the scan status on localhost from a background thread and return the server"""
+    httpd = ThreadingHTTPServer(('127.0.0.1', port), StatusRequestHandler)
+    httpd.daemon_threads = True
+    httpd.metrics = metrics or SCAN_METRICS
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    print(f"Scan status at http://127.0.0.1:{httpd.server_address[1]}/status (Prometheus: /metrics)")
+    return httpd
+
+# Phase Profiler Reference:
+#
+# --profile runs every call of a phase function (forms tree, theme code,
+# methods, workflows, Word document) under cProfile and tracemalloc and
+# writes into fluxx_profile_<timestamp>/, next to the documents:
+# - <phase>_<n>.pstats        for pstats, snakeviz and similar viewers
+# - <phase>_<n>.txt           the top functions by cumulative time
+# - <phase>_<n>_memory.txt    peak traced memory and the top allocation lines
+# One phase is profiled at a time: a phase that starts while another is being
+# profiled (the streaming renderer's thread) runs unprofiled, and the document
+# pool's worker processes are not included. tracemalloc slows the phases
+# down, so profiled timings are only comparable with each other. Phases ask
+# their confirmation questions through PHASE_PROFILER.ask(), which stops the
+# profiler and the clock while the tool waits for the user.
+
+class PhaseProfiler:
+    """Profile CPU time and allocations of each phase when --profile is on"""
+
+    def __init__(self, top=30):
+        self.enabled = False
+        self.top = top
+        self.directory = None
+        self.counts = {}  # phase -> calls profiled so far
+        self.lock = threading.Lock()
+        self.active = None  # Profiler of the phase being profiled
+        self.owner = None  # Thread running that phase
+        self.paused_seconds = 0.0
+
+    def enable(self, directory=None):
+        timestamp_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.directory = directory or f'fluxx_profile_{timestamp_str}'
+        os.makedirs(self.directory, exist_ok=True)
+        self.enabled = True
+
+    def run(self, phase, func, args, kwargs):
+        if not self.enabled or not self.lock.acquire(blocking=False):
+            return func(*args, **kwargs)
+        try:
+            self.counts[phase] = self.counts.get(phase, 0) + 1
+            base = os.path.join(self.directory, f"{phase}_{self.counts[phase]}")
+            profiler = cProfile.Profile()
+            self.active, self.owner, self.paused_seconds = profiler, threading.get_ident(), 0.0
+            tracemalloc.start()
+            start = time.perf_counter()
+            profiler.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.disable()
+                self.active = self.owner = None
+                elapsed = time.perf_counter() - start - self.paused_seconds
+                snapshot = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                self.save(phase, base, profiler, snapshot, peak, elapsed)
+        finally:
+            self.lock.release()
+
+    def ask(self, prompt):
+        """input() with the running profile paused, so time spent waiting for the user is left out"""
+        profiler = self.active
+        if profiler is None or self.owner != threading.get_ident():
+            return input(prompt)
+        profiler.disable()
+        start = time.perf_counter()
+        try:
+            return input(prompt)
+        finally:
+            self.paused_seconds += time.perf_counter() - start
+            profiler.enable()
+
+    def save(self, phase, base, profiler, snapshot, peak, elapsed):
+        """Write the pstats dump, its text summary and the allocation report"""
+        try:
+            profiler.dump_stats(base + '.pstats')
+            with open(base + '.txt', 'w', encoding='utf-8') as f:
+                pstats.Stats(profiler, stream=f).sort_stats('cumulative').print_stats(self.top)
+            snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),
+                                               tracemalloc.Filter(False, '<frozen importlib._bootstrap*>')))
+            with open(base + '_memory.txt', 'w', encoding='utf-8') as f:
+                f.write(f"Peak traced memory: {peak / (1024 * 1024):.1f} MB\n")
+                f.write(f"Top {self.top} allocation sites still held at the end of {phase}:\n")
+                for stat in snapshot.statistics('lineno')[:self.top]:
+                    f.write(f"{stat}\n")
+        except OSError as e:
+            print(f"Warning: Could not save the {phase} profile: {str(e)}")
+            return
+        print(f"\nProfiled {phase}: {elapsed:.1f}s, peak {peak / (1024 * 1024):.1f} MB traced -> {base}.pstats")
+
+PHASE_PROFILER = PhaseProfiler()
+
+def profiled_phase(phase):
+    """Run the decorated phase function under PHASE_PROFILER"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return PHASE_PROFILER.run(phase, func, args, kwargs)
+        return wrapper
+    return decorate
+
 def wait_for_dashboard(driver, timeout=60):
     """Wait for dashboard to load and verify we're logged in"""
     try:
@@ -324,21 +1115,21 @@ def navigate_to_forms(driver):
     """Navigate to Forms dashboard"""
     try:
         def nav_action():
-            wait = WebDriverWait(driver, 10)
+            wait = adaptive_wait(driver, 'navigate')
             forms_link = wait.until(
                 EC.element_to_be_clickable((By.CSS_SELECTOR, 'li.item a.to-dashboard[href*="/client_stores/"]'))
             )
             # Verify it's the Forms link by checking text content
             if forms_link.text.strip() == 'Forms':
                 forms_link.click()
-                time.sleep(2)  # Wait for dashboard to load
+                pause(2)  # Wait for dashboard to load
             else:
                 # If first link isn't Forms, find all dashboard links and click the Forms one
                 dashboard_links = driver.find_elements(By.CSS_SELECTOR, 'li.item a.to-dashboard[href*="/client_stores/"]')
                 for link in dashboard_links:
                     if link.text.strip() == 'Forms':
                         link.click()
-                        time.sleep(2)
+                        pause(2)
                         break
             
         wait_with_spinner("Navigating to Forms dashboard...", nav_action)
@@ -353,7 +1144,7 @@ def navigate_to_admin(driver):
     """Navigate to Admin Panel"""
     try:
         def nav_action():
-            wait = WebDriverWait(driver, 10)
+            wait = adaptive_wait(driver, 'navigate')
             admin_button = wait.until(
                 EC.element_to_be_clickable((By.CSS_SELECTOR, 'a.to-admin-panel[href="/?db=config"]'))
             )
@@ -375,21 +1166,21 @@ def navigate_to_workflows(driver):
     """Navigate to Workflow dashboard"""
     try:
         def nav_action():
-            wait = WebDriverWait(driver, 10)
+            wait = adaptive_wait(driver, 'navigate')
             workflow_link = wait.until(
                 EC.element_to_be_clickable((By.CSS_SELECTOR, 'li.item a.to-dashboard[href*="/client_stores/"]'))
             )
             # Verify it's the Workflow link by checking text content
             if workflow_link.text.strip() == 'Workflow':
                 workflow_link.click()
-                time.sleep(2)  # Wait for dashboard to load
+                pause(2)  # Wait for dashboard to load
             else:
                 # If first link isn't Workflow, find all dashboard links and click the Workflow one
                 dashboard_links = driver.find_elements(By.CSS_SELECTOR, 'li.item a.to-dashboard[href*="/client_stores/"]')
                 for link in dashboard_links:
                     if link.text.strip() == 'Workflow':
                         link.click()
-                        time.sleep(2)
+                        pause(2)
                         break
             
         wait_with_spinner("Navigating to Workflow dashboard...", nav_action)
@@ -400,1148 +1191,5594 @@ def navigate_to_workflows(driver):
         print(f"Error navigating to Workflow dashboard: {str(e)}")
         return False
 
-def scan_model_workflows(driver, models_data):
-    """Scan workflow states and actions for each model"""
-    try:
-        print("\n" + "=" * 80)
-        print("\n                     Scanning Model Workflows")
-        print("\n" + "=" * 80)
-        print("\nThis process will scan workflows from all models automatically.")
-        print("This may take several minutes to complete depending on the number of models.")
-        print("\nIMPORTANT:")
-        print("- You can stop the process at any time by pressing Ctrl+C")
-        print("- Please do not interact with the browser while the process is running")
-        print("- The browser will automatically handle all interactions")
-        print("\n" + "-" * 80)
-        verify = input("\nWould you like to proceed with scanning workflows? (y/n): ").strip().lower()
-        
-        if verify != 'y':
-            print("\nSkipping workflow scanning process.")
-            return models_data
-            
-        # First navigate to Workflow dashboard
-        if not navigate_to_workflows(driver):
-            print("\nError: Could not navigate to Workflow dashboard")
-            return models_data
-            
-        # Initialize counters for progress bar
-        total_models = len(models_data)
-        current_model = 0
+# Browser Session Recycling:
+#
+# One Chrome session opening hundreds of modals and detail panes keeps
+# growing. BrowserSession wraps the WebDriver so scan functions keep using it
+# as `driver` while the real browser underneath can be replaced:
+# - session_checkpoint() is called before each model; it checks the renderer's
+#   JS heap via CDP Performance.getMetrics and recycles when over the limit
+# - a watchdog thread enforces a deadline per model and kills a hung
+#   ChromeDriver and the Chrome processes it started (taskkill /T on Windows,
+#   the pgrep tree elsewhere), so the blocked call fails instead of hanging
+#   forever and no orphaned browser keeps its memory
+# - recycling restarts Chrome, restores the saved login cookies and returns
+#   to the dashboard the scan was on, so the loop continues with the next model
+
+SESSION_DIR = 'sessions'
+
+def create_chrome_driver(profile_dir=None, headless=False):
+    """Start Chrome with the scanner's standard options"""
+    driver_path = get_resource_path("chromedriver.exe")
+    if not os.path.exists(driver_path):
+        driver_path = None  # Outside the Windows build Selenium locates the driver itself
+    options = webdriver.ChromeOptions()
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--log-level=3')
+    if headless:
+        options.add_argument('--headless=new')
+    options.add_experimental_option('excludeSwitches', ['enable-logging', 'enable-automation'])
+    options.add_experimental_option('useAutomationExtension', False)
+    # Performance logging exposes DevTools network events for capture mode
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    
+    # Use a dedicated profile directory
+    if profile_dir:
+        if not os.path.exists(profile_dir):
+            os.makedirs(profile_dir)
+        options.add_argument(f'--user-data-dir={profile_dir}')
+    
+    service = Service(driver_path, log_path=os.devnull)  # Suppress ChromeDriver logs
+    return webdriver.Chrome(service=service, options=options)
+
+def session_cookie_path(url):
+    """Path of the saved login cookies for a tenant"""
+    host = urlparse(url).netloc or url
+    return os.path.join(SESSION_DIR, f"{host}.json")
+
+def save_session_cookies(driver, url, path=None):
+    """Save the browser's cookies so a new session can reuse the login"""
+    path = path or session_cookie_path(url)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'url': url, 'cookies': driver.get_cookies()}, f)
+    return path
+
+def restore_session_cookies(driver, url, path=None):
+    """Load saved cookies into the browser and reload the tenant URL"""
+    path = path or session_cookie_path(url)
+    with open(path, 'r', encoding='utf-8') as f:
+        saved = json.load(f)
+    driver.get(url)
+    driver.delete_all_cookies()
+    for cookie in saved.get('cookies', []):
+        cookie = {k: v for k, v in cookie.items()
+                  if k in ('name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'expiry')}
+        try:
+            driver.add_cookie(cookie)
+        except WebDriverException:
+            continue
+    driver.get(url)
+
+def process_tree(pid):
+    """Return a process and all of its descendants, parents first (POSIX)"""
+    pids = [pid]
+    for parent in pids:
+        try:
+            children = subprocess.run(['pgrep', '-P', str(parent)], capture_output=True, text=True,
+                                      timeout=10).stdout.split()
+        except (OSError, subprocess.SubprocessError):
+            children = []
+        pids.extend(int(child) for child in children)
+    return pids
+
+def kill_process_tree(pid):
+    """Kill a process and every process it started, e.g. ChromeDriver and its Chrome"""
+    if platform.system() == 'Windows':
+        subprocess.run(['taskkill', '/F', '/T', '/PID', str(pid)], capture_output=True, timeout=30)
+        return
+    # Collect the whole tree first; Chrome's children are re-parented once Chrome dies
+    for member in process_tree(pid):
+        try:
+            os.kill(member, signal.SIGKILL)
+        except OSError:
+            pass
+
+class Watchdog:
+    """Kill the browser when a scan operation runs past its deadline"""
+
+    def __init__(self, session, interval=1.0):
+        self.session = session
+        self.interval = interval
+        self.operation = None
+        self.deadline = None
+        self.tripped = False
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def begin(self, operation, seconds):
+        self.operation = operation
+        self.deadline = time.time() + seconds if seconds else None
+
+    def end(self):
+        self.operation = None
+        self.deadline = None
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            deadline = self.deadline
+            if deadline is None or time.time() < deadline:
+                continue
+            # Kill ChromeDriver so the blocked WebDriver call raises, and the Chrome it started
+            print(f"\nWatchdog: {self.operation} exceeded its deadline, restarting browser...")
+            self.tripped = True
+            self.deadline = None
+            self.session.kill_browser()
+
+    def stop(self):
+        self.stop_event.set()
+
+class BrowserSession:
+    """A restartable WebDriver that scan functions can use as their driver"""
+
+    def __init__(self, url, profile_root, memory_limit_mb=1536, model_deadline=300,
+                 max_models_per_session=None, headless=False, driver_factory=None):
+        self.url = url
+        self.driver_factory = driver_factory or create_chrome_driver
+        self.profile_root = profile_root
+        self.memory_limit_mb = memory_limit_mb
+        self.model_deadline = model_deadline
+        self.max_models_per_session = max_models_per_session
+        self.headless = headless
+        self.generation = 0
+        self.models_in_session = 0
+        self.recycles = 0
+        self.recycle_callbacks = []  # Called after each restart, e.g. to re-enable network capture
+        self.command_count = 0  # WebDriver commands sent, across restarts
+        self.cookie_path = None
+        self.driver = self.start()
+        self.watchdog = Watchdog(self)
+        RETRY_POLICY.watchdog = self.watchdog
+
+    def __getattr__(self, name):
+        # Everything else goes to the live WebDriver
+        driver = self.__dict__.get('driver')
+        if driver is None:
+            raise AttributeError(name)
+        return getattr(driver, name)
+
+    def start(self):
+        self.generation += 1
+        self.models_in_session = 0
+        profile_dir = os.path.join(self.profile_root, f"profile_{self.generation}")
+        driver = self.driver_factory(profile_dir, headless=self.headless)
+        if SESSION_TRACE.recording:
+            SESSION_TRACE.attach(driver)
+        # Elements send their commands through their driver's execute, so one wrapper counts them all
+        execute = driver.execute
         
-        # Clear screen and show initial progress
-        os.system('cls' if os.name == 'nt' else 'clear')
-        print("\n" + "=" * 80)
-        print("\n                     Scanning Model Workflows")
-        print("\nPress Ctrl+C to stop the process at any time")
-        print("Please wait while workflows are scanned from all models...")
-        print("\n" + "=" * 80 + "\n")
+        def counted_execute(driver_command, params=None):
+            self.command_count += 1
+            if not COMMAND_PROFILER.enabled:
+                return execute(driver_command, params)
+            start = time.perf_counter()
+            try:
+                return execute(driver_command, params)
+            finally:
+                COMMAND_PROFILER.record(driver_command, time.perf_counter() - start)
         
-        # Process each model
-        for model_name, model_data in models_data.items():
+        driver.execute = counted_execute
+        return driver
+
+    def save_cookies(self):
+        """Remember the current login so restarts can re-authenticate"""
+        self.cookie_path = save_session_cookies(self.driver, self.url)
+        return self.cookie_path
+
+    def memory_mb(self):
+        """JS heap used by the renderer in MB, or None if unavailable"""
+        try:
+            self.driver.execute_cdp_cmd('Performance.enable', {})
+            metrics = self.driver.execute_cdp_cmd('Performance.getMetrics', {}).get('metrics', [])
+        except Exception:
+            return None
+        for metric in metrics:
+            if metric.get('name') == 'JSHeapUsedSize':
+                return metric.get('value', 0) / (1024 * 1024)
+        return None
+
+    def checkpoint(self, dashboard, operation=None):
+        """Recycle the browser if needed, then start the deadline for the next operation"""
+        self.watchdog.end()
+        reason = None
+        if self.watchdog.tripped:
+            reason = "watchdog deadline exceeded"
+        elif self.max_models_per_session and self.models_in_session >= self.max_models_per_session:
+            reason = f"{self.models_in_session} models in this session"
+        else:
+            memory = self.memory_mb()
+            if memory is not None and memory > self.memory_limit_mb:
+                reason = f"renderer heap at {memory:.0f} MB"
+        if reason:
+            self.recycle(dashboard, reason)
+        self.models_in_session += 1
+        if operation:
+            self.watchdog.begin(operation, self.model_deadline)
+
+    def idle(self):
+        """Stop enforcing a deadline between phases"""
+        self.watchdog.end()
+
+    def kill_browser(self):
+        """Kill ChromeDriver and the whole Chrome process tree it started"""
+        try:
+            kill_process_tree(self.driver.service.process.pid)
+        except Exception:
+            pass
+
+    def recycle(self, dashboard, reason=""):
+        """Restart Chrome, restore the login and return to the given dashboard"""
+        print(f"\nRestarting browser ({reason})...")
+        # After a watchdog kill there is no ChromeDriver left to ask to quit
+        if not self.watchdog.tripped:
             try:
-                current_model += 1
-                progress = (current_model / total_models) * 100
-                
-                # Update progress bar
-                bar_length = 50
-                filled_length = int(bar_length * current_model // total_models)
-                bar = '=' * filled_length + '-' * (bar_length - filled_length)
-                
-                # Truncate model name if too long (limit to 20 chars)
-                truncated_name = model_name[:20] + '...' if len(model_name) > 20 else model_name
-                
-                sys.stdout.write('\r' + ' ' * 100)  # Clear line
-                sys.stdout.write('\rScanning Workflows: [{0}] {1:.1f}% ({2}/{3}) - {4}'.format(
-                    bar, progress, current_model, total_models, truncated_name
-                ))
-                sys.stdout.flush()
+                self.driver.quit()
+            except Exception:
+                self.kill_browser()
+        self.watchdog.tripped = False
+        self.driver = self.start()
+        self.recycles += 1
 
-                # Try different model name formats for the selector
-                possible_ids = [
-                    model_name,  # Original name
-                    model_name.replace(" ", ""),  # No spaces
-                    ''.join(word.capitalize() for word in model_name.split()),  # CamelCase
-                    f"MacModelTypeDyn{model_name.replace(' ', '')}",  # Dynamic model format
-                    model_name.replace(" ", "_")  # Underscores
-                ]
-                
-                model_element = None
-                for model_id in possible_ids:
-                    selector = f"div.link.is-admin[data-id='{model_id}']"
-                    elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                    if elements:
-                        model_element = elements[0]
-                        break
-                
-                if model_element:
-                    # Click the model
-                    driver.execute_script("arguments[0].click();", model_element)
-                    time.sleep(2)  # Wait for potential UI update
-                    
-                    # Get themes from the model data
-                    themes = model_data.get('themes', {})
-                    if not themes:
-                        models_data[model_name]['workflow'] = {'themes': {}}
-                        continue
-                    
-                    workflow_data = {'themes': {}}
-                    
-                    # Find all theme links excluding "New Theme" and "Retired Themes"
-                    theme_links = driver.find_elements(By.CSS_SELECTOR, 
-                        "li.icon:not(.new-theme):not(.retired-themes) > a.link[title]")
-                    
-                    for theme_link in theme_links:
-                        try:
-                            theme_name = theme_link.get_attribute('title')
-                            if not theme_name or theme_name not in themes:
-                                continue
-                                
-                            # Click the theme
-                            driver.execute_script("arguments[0].click();", theme_link)
-                            time.sleep(2)  # Wait for theme to load
-                            
+        if self.cookie_path:
+            restore_session_cookies(self.driver, self.url, self.cookie_path)
+        else:
+            self.driver.get(self.url)
+        adaptive_wait(self.driver, 'login', 30).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, 'a.to-admin-panel[href="/?db=config"]'))
+        )
+
+        # navigate_to_admin lands on the Forms dashboard
+        navigate_to_admin(self)
+        if dashboard == 'Workflow':
+            navigate_to_workflows(self)
+        elif dashboard == 'Card Settings':
+            navigate_to_card_settings(self)
+
+        for callback in self.recycle_callbacks:
+            callback()
+        # Failures caused by the old browser must not keep the dashboard's circuit open
+        RETRY_POLICY.close_circuit(dashboard)
+
+    def quit(self):
+        self.watchdog.stop()
+        if RETRY_POLICY.watchdog is self.watchdog:
+            RETRY_POLICY.watchdog = None
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+def session_checkpoint(driver, dashboard, operation=None):
+    """Let a BrowserSession recycle between models; no-op for a plain WebDriver"""
+    checkpoint = getattr(driver, 'checkpoint', None)
+    if checkpoint:
+        checkpoint(dashboard, operation)
+
+def session_idle(driver):
+    """Clear the watchdog deadline at the end of a phase"""
+    idle = getattr(driver, 'idle', None)
+    if idle:
+        idle()
+
+def session_hung(driver):
+    """True when the watchdog has killed the browser and it has not been restarted yet"""
+    watchdog = getattr(driver, 'watchdog', None)
+    return bool(watchdog and watchdog.tripped)
+
+def scan_models(driver, models_data, dashboard):
+    """Yield (number, model name, model data); a model whose browser hung is scanned once more
+
+    When the watchdog kills the browser during a model, the browser is restarted
+    on the dashboard right away, the failures recorded since the model started
+    are dropped and the model is yielded again. A model that hangs twice keeps
+    its failures.
+    """
+    for number, (model_name, model_data) in enumerate(list(models_data.items()), start=1):
+        for attempt in (1, 2):
+            failures = len(RETRY_POLICY.failures)
+            yield number, model_name, model_data
+            if not session_hung(driver):
+                break
+            try:
+                driver.recycle(dashboard, "watchdog deadline exceeded")
+            except Exception as e:
+                print(f"\nCould not restart the browser: {str(e)}")
+                break
+            if attempt == 2:
+                break
+            del RETRY_POLICY.failures[failures:]
+            SCAN_METRICS.discard_model()
+            print(f"\nScanning {model_name} again after the browser restart...")
+
+# WebDriver Command Profiler Reference:
+#
+# With --profile-commands every WebDriver command a BrowserSession sends is
+# timed and attributed to the frames of this script that led to it: the
+# innermost one is the call site (function and line), the whole chain is the
+# flame stack. Helpers that only pass calls through (the counting wrapper,
+# AdaptiveWait.until, RetryPolicy.call, wait_with_spinner) are left out so the
+# scan function that asked for the command is what shows up. At exit the
+# hottest call sites and a flame tree are printed, and the stacks are saved in
+# folded format (fluxx_commands_<timestamp>.folded, milliseconds per stack)
+# for flamegraph tools, next to a JSON summary.
+
+SCRIPT_FILENAME = sys._getframe().f_code.co_filename
+PROFILER_PASS_THROUGH = {'counted_execute', 'until', 'call', 'wait_with_spinner'}
+
+class CommandProfiler:
+    """Count and time WebDriver commands by the scan code that sent them"""
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.sites = {}  # (function, line, command) -> [count, seconds]
+        self.stacks = {}  # (function, ..., command) outermost first -> [count, seconds]
+
+    def enable(self):
+        self.enabled = True
+
+    def caller_stack(self):
+        """Return [(function, line)] of this script's frames, outermost first"""
+        frames = []
+        frame = sys._getframe(2)  # Skip this method and record()
+        while frame is not None:
+            code = frame.f_code
+            if code.co_filename == SCRIPT_FILENAME and code.co_name not in PROFILER_PASS_THROUGH:
+                frames.append((code.co_name, frame.f_lineno))
+            frame = frame.f_back
+        frames.reverse()
+        return frames or [('?', 0)]
+
+    def record(self, command, seconds):
+        stack = self.caller_stack()
+        function, line = stack[-1]
+        path = tuple(name for name, _ in stack) + (command,)
+        with self.lock:
+            for table, key in ((self.sites, (function, line, command)), (self.stacks, path)):
+                entry = table.setdefault(key, [0, 0.0])
+                entry[0] += 1
+                entry[1] += seconds
+
+    def flame_tree(self):
+        """Merge the stacks into {name: [count, seconds, children]}"""
+        tree = {}
+        for path, (count, seconds) in self.stacks.items():
+            level = tree
+            for name in path:
+                node = level.setdefault(name, [0, 0.0, {}])
+                node[0] += count
+                node[1] += seconds
+                level = node[2]
+        return tree
+
+    def report(self, top=20, min_share=0.01):
+        """Print the hottest call sites and the flame tree, save the stacks, return the folded filename"""
+        with self.lock:
+            sites = dict(self.sites)
+            stacks = dict(self.stacks)
+        if not sites:
+            print("\nNo WebDriver commands were recorded.")
+            return None
+        total_count = sum(count for count, _ in sites.values())
+        total_seconds = sum(seconds for _, seconds in sites.values())
+        print_divider()
+        print(f"WebDriver commands: {total_count:,} in {total_seconds:.1f}s "
+              f"({total_seconds / total_count * 1000:.1f} ms each)")
+        print(f"\n{'Count':>8} {'Total s':>9} {'Mean ms':>8}  Call site")
+        for (function, line, command), (count, seconds) in heapq.nlargest(
+                top, sites.items(), key=lambda item: item[1][1]):
+            print(f"{count:>8,} {seconds:>9.2f} {seconds / count * 1000:>8.1f}  {function}:{line} {command}")
+        
+        print("\nFlame tree (share of command time):")
+        
+        def show(level, depth):
+            for name, (count, seconds, children) in sorted(level.items(), key=lambda item: -item[1][1]):
+                if total_seconds and seconds / total_seconds < min_share:
+                    continue
+                share = seconds / total_seconds * 100 if total_seconds else 0
+                print(f"{share:>5.1f}% {'  ' * depth}{name} ({count:,} commands, {seconds:.1f}s)")
+                show(children, depth + 1)
+        
+        show(self.flame_tree(), 0)
+        
+        timestamp_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f'fluxx_commands_{timestamp_str}.folded'
+        try:
+            with open(filename, 'w', encoding='utf-8') as f:
+                for path, (_, seconds) in sorted(stacks.items()):
+                    f.write(f"{';'.join(path)} {max(1, round(seconds * 1000))}\n")
+            with open(f'fluxx_commands_{timestamp_str}.json', 'w', encoding='utf-8') as f:
+                json.dump({
+                    'commands': total_count,
+                    'seconds': round(total_seconds, 3),
+                    'sites': [{'function': function, 'line': line, 'command': command, 'count': count,
+                               'seconds': round(seconds, 3)}
+                              for (function, line, command), (count, seconds) in
+                              sorted(sites.items(), key=lambda item: -item[1][1])],
+                }, f, indent=2)
+        except OSError as e:
+            print(f"Warning: Could not save the command profile: {str(e)}")
+            return None
+        print(f"\nCommand stacks saved to: {filename}")
+        return filename
+
+COMMAND_PROFILER = CommandProfiler()
+
+# Session Trace Reference:
+#
+# --record-trace writes every WebDriver command a BrowserSession sends and the
+# raw protocol response, one compact JSON line each (gzip when the name ends in
+# .gz), together with the detail pages HttpExtractor fetched and marks for the
+# scan steps that ran (open, forms, code, methods, workflow, capture, with the
+# model list for targeted rescans) and the extractor backend chosen per
+# entity. Elements stay protocol references ({"element-6066-...": id}), so no
+# browser is needed to read it. --redact replaces cookie values, typed text
+# and email addresses with placeholders. Each DevTools event in the
+# performance log is a JSON string of its own, so it is parsed and its
+# Cookie, Set-Cookie and Authorization headers, the cookies attached to
+# requests and the bodies of POSTs (the login form) are masked before it is
+# written back.
+#
+# --replay-trace runs the same steps against a ReplayDriver: a real Selenium
+# WebDriver whose command_executor answers from the trace in order, so the
+# scan code runs unchanged at memory speed. pause() skips the scan's fixed
+# sleeps and waits poll without delay while replaying. A command the trace
+# does not have next raises TraceMismatch, a TimeoutException, because the
+# usual cause is a wait that polled longer than it did when recorded. Paths
+# that depend on wall time (watchdog restarts, circuit cooldowns) can still
+# diverge; the first mismatches are reported.
+
+TRACE_SCHEMA = 'fluxx-session-trace'
+TRACE_EMAIL_PATTERN = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+TRACE_ELEMENT_KEYS = ('element-6066-11e4-a52e-4f735466cecf', 'shadow-6066-11e4-a52e-4f735466cecf')
+TRACE_SECRET_HEADERS = {'cookie', 'set-cookie', 'authorization', 'proxy-authorization', 'x-csrf-token'}
+# DevTools event fields that carry credentials, and what they are replaced with
+TRACE_SECRET_FIELDS = {'postData': '[redacted]', 'postDataEntries': [], 'associatedCookies': [],
+                       'blockedCookies': [], 'exemptedCookies': [], 'headersText': '[redacted]',
+                       'requestHeadersText': '[redacted]'}
+
+class TraceMismatch(TimeoutException):
+    """Raised while replaying when the scan sends a command the trace does not have next"""
+
+def redact_value(value):
+    """Replace email addresses in every string of a protocol value"""
+    if isinstance(value, str):
+        return TRACE_EMAIL_PATTERN.sub('[email]', value)
+    if isinstance(value, list):
+        return [redact_value(item) for item in value]
+    if isinstance(value, dict):
+        if any(key in value for key in TRACE_ELEMENT_KEYS):
+            return value
+        return {key: redact_value(item) for key, item in value.items()}
+    return value
+
+def redact_devtools_event(value):
+    """Mask the cookies, credential headers and POST bodies in a DevTools event"""
+    if isinstance(value, list):
+        return [redact_devtools_event(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    redacted = {}
+    for key, item in value.items():
+        if key in TRACE_SECRET_FIELDS:
+            redacted[key] = TRACE_SECRET_FIELDS[key]
+        elif key.lower() in TRACE_SECRET_HEADERS and isinstance(item, str):
+            redacted[key] = '[redacted]'
+        elif key == 'cookies' and isinstance(item, list):
+            redacted[key] = [dict(cookie, value='[redacted]') if isinstance(cookie, dict) else cookie for cookie in item]
+        else:
+            redacted[key] = redact_devtools_event(item)
+    return redacted
+
+def redact_log_entries(entries):
+    """Redact the DevTools event each performance log entry holds as a JSON string"""
+    redacted = []
+    for entry in entries:
+        if isinstance(entry, dict) and isinstance(entry.get('message'), str):
+            try:
+                message = json.loads(entry['message'])
+            except ValueError:
+                message = None
+            entry = dict(entry, message=json.dumps(redact_devtools_event(message)) if message is not None else '[redacted]')
+        redacted.append(entry)
+    return redacted
+
+class SessionTrace:
+    """Record WebDriver traffic to a trace file, or serve it back in place of a browser"""
+
+    def __init__(self):
+        self.recording = False
+        self.replaying = False
+        self.redact = False
+        self.filename = None
+        self.file = None
+        self.lock = threading.Lock()
+        self.header = None
+        self.records = []  # Replay: command and HTTP records in the order they were sent
+        self.position = 0
+        self.marks = []
+        self.extractors = {}  # entity -> backend chosen when the trace was recorded
+        self.mismatches = []
+
+    def start_recording(self, filename=None, redact=False):
+        timestamp_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.filename = filename or f'fluxx_trace_{timestamp_str}.jsonl.gz'
+        self.file = (gzip.open if self.filename.endswith('.gz') else open)(self.filename, 'wt', encoding='utf-8')
+        self.recording = True
+        self.redact = redact
+        self._write({'record': 'header', 'schema': TRACE_SCHEMA, 'redacted': redact,
+                     'created': datetime.datetime.now().isoformat(timespec='seconds')})
+
+    def _write(self, record):
+        with self.lock:
+            self.file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    def clean_params(self, command, params):
+        """Params as stored in the trace: JSON types, no session id, redacted if asked"""
+        params = json.loads(json.dumps({key: value for key, value in (params or {}).items() if key != 'sessionId'}))
+        if self.redact:
+            if command in ('sendKeysToElement', 'sendKeysToActiveElement'):
+                params = dict(params, text='[redacted]', value=['[redacted]'])
+            if isinstance(params.get('cookie'), dict):
+                params['cookie'] = dict(params['cookie'], value='[redacted]')
+            params = redact_value(params)
+        return params
+
+    def clean_response(self, command, response):
+        if not self.redact:
+            return response
+        value = response.get('value') if isinstance(response, dict) else None
+        if command in ('getCookies', 'getCookie') and value is not None:
+            cookies = value if isinstance(value, list) else [value]
+            cookies = [dict(cookie, value='[redacted]') for cookie in cookies if isinstance(cookie, dict)]
+            response = dict(response, value=cookies if isinstance(value, list) else (cookies or [None])[0])
+        elif command == 'getLog' and isinstance(value, list):
+            response = dict(response, value=redact_log_entries(value))
+        elif command == 'executeCdpCommand' and isinstance(value, dict):
+            response = dict(response, value=redact_devtools_event(value))
+        return redact_value(response)
+
+    def attach(self, driver):
+        """Log every command and response that passes through a driver's command executor"""
+        executor = driver.command_executor
+        execute = executor.execute
+        
+        def traced_execute(command, params=None):
+            start = time.perf_counter()
+            try:
+                response = execute(command, params)
+            except Exception as e:
+                self._write({'c': command, 'p': self.clean_params(command, params), 'e': f"{type(e).__name__}: {e}"[:500]})
+                raise
+            self._write({'c': command, 'p': self.clean_params(command, params),
+                         'r': self.clean_response(command, response),
+                         'ms': round((time.perf_counter() - start) * 1000, 1)})
+            return response
+        
+        executor.execute = traced_execute
+
+    def mark(self, step, **info):
+        """Note a scan step so replay can run the same steps"""
+        if self.recording:
+            self._write(dict({'m': step}, **info))
+
+    def extractor_choice(self, entity, backend_name):
+        """Record the backend a probe chose, or use the recorded one while replaying"""
+        if self.replaying:
+            return self.extractors.get(entity, backend_name)
+        self.mark('extractor', entity=entity, backend=backend_name)
+        return backend_name
+
+    def http_get(self, session, url):
+        """Fetch a page for HttpExtractor, returning (status, final URL, text)"""
+        if self.replaying:
+            record = self.next_record('http', url)
+            return record['s'], record['u'], record['t']
+        response = session.get(url, timeout=30)
+        if self.recording:
+            self._write({'h': url, 's': response.status_code, 'u': response.url,
+                         't': redact_value(response.text) if self.redact else response.text})
+        return response.status_code, response.url, response.text
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+            self.recording = False
+
+    def load(self, filename):
+        """Read a trace for replay"""
+        self.__init__()
+        with (gzip.open if filename.endswith('.gz') else open)(filename, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.get('record') == 'header':
+                    self.header = record
+                elif 'm' in record:
+                    if record['m'] == 'extractor':
+                        self.extractors[record['entity']] = record['backend']
+                    else:
+                        self.marks.append(record)
+                else:
+                    self.records.append(record)
+        if not self.header or self.header.get('schema') != TRACE_SCHEMA:
+            raise ValueError(f"{filename} is not a Fluxx session trace")
+        self.redact = self.header.get('redacted', False)
+        self.replaying = True
+
+    def next_record(self, command, params):
+        """Return the next record if it is this command, else raise TraceMismatch"""
+        key = 'h' if command == 'http' else 'c'
+        with self.lock:
+            record = self.records[self.position] if self.position < len(self.records) else None
+            if record is not None and record.get(key) == (params if key == 'h' else command) and (
+                    key == 'h' or record.get('p') == params):
+                self.position += 1
+                return record
+            expected = None if record is None else record.get('h') or record.get('c')
+            self.mismatches.append({'position': self.position, 'sent': command, 'params': params, 'expected': expected})
+        raise TraceMismatch(f"Scan sent {command} but the trace has {expected or 'no more commands'} next")
+
+    def next_response(self, command, params):
+        """Serve the recorded response for a WebDriver command"""
+        if command == 'newSession':
+            # Sessions start before the recorder is attached
+            return {'value': {'sessionId': 'replay', 'capabilities': {'browserName': 'chrome'}}}
+        upcoming = self.records[self.position] if self.position < len(self.records) else {}
+        if command == 'quit' and upcoming.get('c') != 'quit':
+            return {'value': None}  # Replay may end before the recording did
+        record = self.next_record(command, self.clean_params(command, params))
+        if 'e' in record:
+            raise WebDriverException(f"Recorded error: {record['e']}")
+        return record['r']
+
+SESSION_TRACE = SessionTrace()
+
+def pause(seconds):
+    """Sleep between browser steps; replayed pages never change, so replay skips it"""
+    if not SESSION_TRACE.replaying:
+        time.sleep(seconds)
+
+class ReplayCommandExecutor:
+    """A Selenium command executor that answers from a SessionTrace"""
+
+    def __init__(self, trace):
+        self.trace = trace
+
+    def execute(self, command, params):
+        return self.trace.next_response(command, params)
+
+    def close(self):
+        pass
+
+class ReplayDriver(webdriver.Remote):
+    """A WebDriver whose commands are answered from a recorded trace"""
+
+    def __init__(self, trace):
+        super().__init__(command_executor=ReplayCommandExecutor(trace), options=webdriver.ChromeOptions())
+
+    def get_log(self, log_type):
+        return self.execute('getLog', {'type': log_type})['value']
+
+# Network Capture Reference:
+#
+# The Workflow and Card Settings listings are fetched by the Fluxx UI via XHR
+# and returned as server-rendered HTML fragments:
+# - /machine_states?...     -> li.entry[data-model-id] (h2 "Display (internal)", ul.events actions)
+# - /machine_states/<id>    -> form.machine_state with validation/after enter textareas
+# - /machine_events/<id>    -> form.machine_event with to state select and guard textareas
+# - /model_methods?...      -> ul.list > li.entry (h2 method name, a.to-detail)
+# - /model_methods/<id>     -> method type select and dyn_method textareas
+#
+# With Chrome performance logging enabled the responses can be read from the
+# DevTools Network domain as soon as they land instead of waiting for the UI
+# to render them and reading each element back over WebDriver.
+
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+             'link', 'meta', 'param', 'source', 'track', 'wbr'}
+
+class HTMLNode:
+    """Lightweight element node used to query Fluxx HTML payloads"""
+    __slots__ = ('tag', 'attrs', 'children', 'parent')
+
+    def __init__(self, tag, attrs=None, parent=None):
+        self.tag = tag
+        self.attrs = attrs or {}
+        self.children = []
+        self.parent = parent
+
+    def classes(self):
+        return (self.attrs.get('class') or '').split()
+
+    def text(self):
+        """Return the text content of the node and all of its descendants"""
+        parts = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                parts.append(node)
+            else:
+                stack.extend(reversed(node.children))
+        return ''.join(parts)
+
+    def iter(self):
+        """Iterate over all descendant element nodes in document order"""
+        stack = list(reversed([c for c in self.children if not isinstance(c, str)]))
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed([c for c in node.children if not isinstance(c, str)]))
+
+    def matches(self, tag=None, cls=None, attrs=None):
+        if tag and self.tag != tag:
+            return False
+        if cls and cls not in self.classes():
+            return False
+        for key, value in (attrs or {}).items():
+            if key not in self.attrs:
+                return False
+            if value is not None and self.attrs[key] != value:
+                return False
+        return True
+
+    def find_all(self, tag=None, cls=None, attrs=None):
+        return [node for node in self.iter() if node.matches(tag, cls, attrs)]
+
+    def find(self, tag=None, cls=None, attrs=None):
+        for node in self.iter():
+            if node.matches(tag, cls, attrs):
+                return node
+        return None
+
+    def child_elements(self, tag=None, cls=None):
+        return [c for c in self.children
+                if not isinstance(c, str) and c.matches(tag, cls)]
+
+    def has_ancestor(self, tag=None, cls=None, stop=None):
+        node = self.parent
+        while node is not None and node is not stop:
+            if node.matches(tag, cls):
+                return True
+            node = node.parent
+        return False
+
+class _HTMLTreeBuilder(HTMLParser):
+    """Build an HTMLNode tree from an HTML document or fragment"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = HTMLNode('#root')
+        self.current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        node = HTMLNode(tag, {k: (v if v is not None else '') for k, v in attrs}, self.current)
+        self.current.children.append(node)
+        if tag not in VOID_TAGS:
+            self.current = node
+
+    def handle_startendtag(self, tag, attrs):
+        node = HTMLNode(tag, {k: (v if v is not None else '') for k, v in attrs}, self.current)
+        self.current.children.append(node)
+
+    def handle_endtag(self, tag):
+        # Walk up to the matching open tag, tolerating unclosed elements
+        node = self.current
+        while node is not None and node.tag != tag:
+            node = node.parent
+        if node is not None and node.parent is not None:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        self.current.children.append(data)
+
+def parse_html(markup):
+    """Parse HTML markup into an HTMLNode tree"""
+    builder = _HTMLTreeBuilder()
+    builder.feed(markup or '')
+    builder.close()
+    return builder.root
+
+def get_field_value(root, field_id):
+    """Get the value of a textarea/input/select by id from a parsed form"""
+    node = root.find(attrs={'id': field_id})
+    if node is None:
+        return None
+    if node.tag == 'textarea':
+        return node.text().strip()
+    if node.tag == 'select':
+        selected = node.find('option', attrs={'selected': None})
+        return selected.text().strip() if selected is not None else None
+    return (node.attrs.get('value') or '').strip()
+
+class NetworkCapture:
+    """Read Fluxx XHR responses through Chrome DevTools network events"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.enabled = False
+        self.pending = {}  # requestId -> URL of responses still loading
+        self.finished = []  # (requestId, URL) of responses ready to read
+
+    def start(self):
+        """Enable the DevTools Network domain and discard any logged backlog"""
+        try:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.get_log('performance')
+            self.enabled = True
+        except Exception as e:
+            print(f"Warning: Network capture unavailable, using page scanning instead: {str(e)}")
+            self.enabled = False
+        return self.enabled
+
+    def poll(self):
+        """Drain the performance log and track XHR responses"""
+        for entry in self.driver.get_log('performance'):
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+            method = message.get('method')
+            params = message.get('params', {})
+            if method == 'Network.responseReceived':
+                if params.get('type') in ('XHR', 'Fetch'):
+                    self.pending[params.get('requestId')] = params.get('response', {}).get('url', '')
+            elif method == 'Network.loadingFinished':
+                url = self.pending.pop(params.get('requestId'), None)
+                if url is not None:
+                    self.finished.append((params.get('requestId'), url))
+            elif method == 'Network.loadingFailed':
+                self.pending.pop(params.get('requestId'), None)
+
+    def reset(self):
+        """Forget responses seen so far so only new requests are matched"""
+        if not self.enabled:
+            return
+        try:
+            self.poll()
+        except Exception:
+            pass
+        self.pending.clear()
+        self.finished = []
+
+    def wait_for_response(self, path_pattern, timeout=10):
+        """Wait for an XHR whose URL path matches path_pattern and return its body"""
+        if not self.enabled:
+            return None
+        pattern = re.compile(path_pattern)
+        deadline = time.time() + timeout
+        while True:
+            try:
+                self.poll()
+            except TraceMismatch:
+                return None  # The recorded scan gave up waiting here
+            for index, (request_id, url) in enumerate(self.finished):
+                if pattern.search(urlparse(url).path):
+                    del self.finished[index]
+                    try:
+                        body = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+                    except Exception:
+                        return None
+                    if body.get('base64Encoded'):
+                        return base64.b64decode(body.get('body', '')).decode('utf-8', errors='replace')
+                    return body.get('body', '')
+            if time.time() >= deadline:
+                return None
+            pause(0.1)
+
+def click_by_selector(driver, selector):
+    """Click the first element matching a CSS selector in a single round trip"""
+    return driver.execute_script(
+        "var el = document.querySelector(arguments[0]);"
+        "if (el) { el.click(); return true; } return false;", selector)
+
+def parse_method_listing(payload):
+    """Parse a /model_methods listing payload into (name, detail href) pairs"""
+    root = parse_html(payload)
+    entries = []
+    for listing in root.find_all('ul', cls='list'):
+        for entry in listing.child_elements('li', cls='entry'):
+            header = entry.find('h2')
+            link = entry.find('a', cls='to-detail')
+            if header is None or link is None:
+                continue
+            entries.append((header.text().strip(), link.attrs.get('href', '')))
+    return entries
+
+def parse_method_detail(payload, method_name):
+    """Parse a /model_methods/<id> detail payload into method data"""
+    root = parse_html(payload)
+    return {
+        'name': method_name,
+        'type': get_field_value(root, 'model_method_method_type') or "",
+        'current_code': get_field_value(root, 'model_method_unsafe_dyn_method') or "",
+        'draft_code': get_field_value(root, 'model_method_draft_dyn_method') or ""
+    }
+
+def parse_state_listing(payload):
+    """Parse a /machine_states listing payload into workflow id and state entries"""
+    root = parse_html(payload)
+    workflow_id = None
+    for link in root.find_all('a', cls='new-event'):
+        match = re.search(r'machine_workflow_id=(\d+)', link.attrs.get('href', ''))
+        if match:
+            workflow_id = match.group(1)
+            break
+
+    states = []
+    for entry in root.find_all('li', cls='entry', attrs={'data-model-id': None}):
+        header = entry.find('h2')
+        if header is None:
+            continue
+        state_link = None
+        for link in entry.find_all('a', cls='to-detail'):
+            if not link.has_ancestor('ul', cls='events', stop=entry):
+                state_link = link
+                break
+        actions = []
+        for events in entry.find_all('ul', cls='events'):
+            items = events.child_elements('li')
+            for item in items[:-1]:  # The last item is the "+" new event link
+                for link in item.child_elements('a', cls='to-detail'):
+                    actions.append((link.text().strip(), link.attrs.get('href', '')))
+        states.append({
+            'header': header.text().strip(),
+            'href': state_link.attrs.get('href', '') if state_link is not None else '',
+            'actions': actions
+        })
+    return workflow_id, states
+
+def parse_state_detail(payload):
+    """Parse a /machine_states/<id> detail payload into validation blocks"""
+    root = parse_html(payload)
+    validation_blocks = {}
+    fields = [
+        ('current_before_validation', 'machine_state_unsafe_before_validation_enter'),
+        ('draft_before_validation', 'machine_state_draft_before_validation_enter'),
+        ('current_after_enter', 'machine_state_unsafe_after_enter'),
+        ('draft_after_enter', 'machine_state_draft_after_enter')
+    ]
+    for key, field_id in fields:
+        value = get_field_value(root, field_id)
+        if value:
+            validation_blocks[key] = value
+    return validation_blocks
+
+def parse_action_detail(payload, action_name):
+    """Parse a /machine_events/<id> detail payload into action data"""
+    root = parse_html(payload)
+    return {
+        'name': action_name,
+        'to_state': get_field_value(root, 'machine_event_to_state_id') or None,
+        'guard_instructions': get_field_value(root, 'machine_event_unsafe_guard') or None,
+        'draft_guard': get_field_value(root, 'machine_event_draft_guard') or None
+    }
+
+def capture_detail(driver, capture, href, timeout=10):
+    """Open a detail pane by its href and return the XHR payload behind it"""
+    path = urlparse(href).path
+    if not path:
+        return None
+    capture.reset()
+    if not click_by_selector(driver, f"a.to-detail[href='{css_string(href)}']"):
+        return None
+    return capture.wait_for_response(re.escape(path) + r'$', timeout)
+
+def capture_model_methods(driver, capture, timeout=10):
+    """Read a model's methods from captured /model_methods responses
+
+    Must be called right after the Methods tab is clicked. Returns None when
+    the listing response was not seen so the caller can fall back to DOM scanning.
+    """
+    payload = capture.wait_for_response(r'/model_methods/?$', timeout)
+    if payload is None:
+        return None
+
+    model_methods = []
+    for method_name, href in parse_method_listing(payload):
+        detail = capture_detail(driver, capture, href, timeout)
+        if detail is None:
+            model_methods.append({'name': method_name, 'type': "", 'current_code': "", 'draft_code': ""})
+            continue
+        model_methods.append(parse_method_detail(detail, method_name))
+    return model_methods
+
+def capture_workflow_states(driver, capture, timeout=10):
+    """Read a theme's workflow from captured /machine_states responses
+
+    Must be called right after the theme is clicked. Returns None when the
+    listing response was not seen so the caller can fall back to DOM scanning.
+    """
+    payload = capture.wait_for_response(r'/machine_states/?$', timeout)
+    if payload is None:
+        return None
+
+    workflow_id, states = parse_state_listing(payload)
+    if not states:
+        return {'workflow_id': None, 'states': []}
+
+    theme_states = []
+    for state in states:
+        match = re.match(r'(.*?)\s*\((.*?)\)', state['header'])
+        if match:
+            display_name, internal_name = match.groups()
+        else:
+            display_name = internal_name = state['header']
+
+        validation_blocks = {}
+        detail = capture_detail(driver, capture, state['href'], timeout)
+        if detail is not None:
+            validation_blocks = parse_state_detail(detail)
+
+        actions = []
+        for action_name, href in state['actions']:
+            if not action_name or action_name == '+':
+                continue
+            detail = capture_detail(driver, capture, href, timeout)
+            if detail is None:
+                actions.append({'name': action_name, 'to_state': None,
+                                'guard_instructions': None, 'draft_guard': None})
+                continue
+            actions.append(parse_action_detail(detail, action_name))
+
+        theme_states.append({
+            'display_name': display_name.strip(),
+            'internal_name': internal_name.strip(),
+            'validation_blocks': validation_blocks,
+            'actions': actions
+        })
+    return {'workflow_id': workflow_id, 'states': theme_states}
+
+# Extractor Backends:
+#
+# Each entity the scan reads has interchangeable extractor backends:
+# - dom:    WebDriver find_element/get_attribute per field (the original approach)
+# - js:     a single execute_script call returning every field at once
+# - source: parse driver.page_source with the HTML payload parser
+# - http:   GET the detail URL with the browser's cookies (no pane needs to open)
+#
+# ExtractorSelector probes every backend on the first few entities of each
+# kind, checks their results against the dom backend and then uses the fastest
+# correct backend for the rest of the run.
+
+THEME_NAME_EXCLUDES = ['New Theme', 'Retired Themes', 'Export', 'Filter', 'Visualizations']
+
+# Form fields read for each detail entity: key -> (element id, how to read it)
+EXTRACTOR_FIELDS = {
+    'theme_code': {
+        'container': "div.modal.new-modal.area",
+        'container_match': ('div', ['modal', 'new-modal', 'area']),
+        'fields': {
+            'current_before_new': ('model_theme_unsafe_before_new_block', 'value'),
+            'draft_before_new': ('model_theme_draft_before_new_block', 'value'),
+            'current_after_create': ('model_theme_unsafe_after_create_block', 'value'),
+            'draft_after_create': ('model_theme_draft_after_create_block', 'value')
+        }
+    },
+    'method': {
+        'container': "div.detail.area[data-type='detail']",
+        'container_match': ('div', ['detail', 'area']),
+        'fields': {
+            'type': ('model_method_method_type', 'selected'),
+            'current_code': ('model_method_unsafe_dyn_method', 'value'),
+            'draft_code': ('model_method_draft_dyn_method', 'value')
+        }
+    },
+    'workflow_state': {
+        'container': "form.machine_state",
+        'container_match': ('form', ['machine_state']),
+        'fields': {
+            'current_before_validation': ('machine_state_unsafe_before_validation_enter', 'value'),
+            'draft_before_validation': ('machine_state_draft_before_validation_enter', 'value'),
+            'current_after_enter': ('machine_state_unsafe_after_enter', 'value'),
+            'draft_after_enter': ('machine_state_draft_after_enter', 'value')
+        }
+    },
+    'workflow_action': {
+        'container': "form.machine_event",
+        'container_match': ('form', ['machine_event']),
+        'fields': {
+            'to_state': ('machine_event_to_state_id', 'selected'),
+            'guard_instructions': ('machine_event_unsafe_guard', 'value'),
+            'draft_guard': ('machine_event_draft_guard', 'value')
+        }
+    }
+}
+
+def build_model_entry(model_type, themes):
+    """Build a models_data entry from a model type and (theme, views) pairs"""
+    entry = {
+        'type': model_type,
+        'is_dynamic': bool(model_type and model_type.startswith('MacModelTypeDyn')),
+        'themes': {}
+    }
+    for theme_name, views in themes:
+        theme_name = (theme_name or '').strip()
+        if not theme_name or theme_name in THEME_NAME_EXCLUDES:
+            continue
+        entry['themes'][theme_name] = {
+            'views': [v.strip() for v in views if v and v.strip() and v.strip() != 'New View']
+        }
+    return entry
+
+def normalize_model_result(raw):
+    """Turn a raw model tree extraction into {'id', 'type', 'is_dynamic', 'themes'}"""
+    if not raw or not raw.get('id'):
+        return None
+    result = {'id': raw['id']}
+    result.update(build_model_entry(raw.get('type'), raw.get('themes', [])))
+    return result
+
+def parse_model_type(href):
+    """Extract the model type from a New Theme link href"""
+    match = re.search(r'model_theme(?:\[|%5B)model_type(?:\]|%5D)=(\w+)', href or '')
+    return match.group(1) if match else None
+
+class ExtractorBackend(ABC):
+    """Base class for extractor backends"""
+    name = None
+    needs_render = True  # Whether the detail pane has to be open to extract
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    @abstractmethod
+    def extract(self, entity, context):
+        """Return the extracted fields for an entity, or None if unsupported"""
+
+    def reset(self):
+        """Forget anything cached from the page or browser so far"""
+
+class DomExtractor(ExtractorBackend):
+    """Read each field with its own WebDriver round trips"""
+    name = 'dom'
+
+    def extract(self, entity, context):
+        if entity == 'model_tree':
+            return normalize_model_result(self.extract_model(context['element']))
+        spec = EXTRACTOR_FIELDS[entity]
+        result = {}
+        for key, (field_id, mode) in spec['fields'].items():
+            try:
+                element = self.driver.find_element(By.CSS_SELECTOR, f"{spec['container']} #{field_id}")
+                if mode == 'selected':
+                    value = element.find_element(By.CSS_SELECTOR, "option[selected]").text
+                else:
+                    value = element.get_attribute("value")
+                result[key] = (value or '').strip()
+            except Exception:
+                result[key] = ''
+        return result
+
+    def extract_model(self, model_ul):
+        model_id = model_ul.get_attribute("id")
+        if not model_id:
+            return None
+
+        # Try multiple selectors to find the New Theme link holding the model type
+        model_type = None
+        for selector in ["a.link.to-modal[href*='model_theme[model_type]']",
+                         "a.link[href*='model_theme[model_type]']",
+                         "a[href*='model_theme[model_type]']"]:
+            try:
+                model_type = parse_model_type(model_ul.find_element(By.CSS_SELECTOR, selector).get_attribute("href"))
+                if model_type:
+                    break
+            except Exception:
+                continue
+
+        themes = []
+        for theme in model_ul.find_elements(By.CSS_SELECTOR, "li.icon[data-card-uid]"):
+            try:
+                theme_name = theme.find_element(By.CSS_SELECTOR,
+                    "a.link.scroll-to-card span.label").get_attribute("textContent")
+            except Exception:
+                continue
+            views = []
+            try:
+                listing_div = theme.find_element(By.CSS_SELECTOR,
+                    "div.listing[data-type='listing'][data-src='/stencils']")
+                for label_div in listing_div.find_elements(By.CSS_SELECTOR,
+                        "ul.list > li.entry:not(.non-entry) > a.to-detail > div.label"):
+                    views.append(label_div.get_attribute("textContent") or '')
+            except Exception:
+                pass
+            themes.append((theme_name, views))
+        return {'id': model_id, 'type': model_type, 'themes': themes}
+
+class ScriptExtractor(ExtractorBackend):
+    """Read every field of an entity with a single execute_script call"""
+    name = 'js'
+
+    FIELDS_SCRIPT = """
+        var container = document.querySelector(arguments[0]);
+        var fields = arguments[1], result = {};
+        for (var key in fields) {
+            var el = container ? container.querySelector('#' + fields[key][0]) : null;
+            if (!el) { result[key] = ''; continue; }
+            if (fields[key][1] === 'selected') {
+                var opt = el.querySelector('option[selected]');
+                result[key] = opt ? opt.textContent : '';
+            } else {
+                result[key] = el.value || '';
+            }
+        }
+        return result;
+    """
+
+    MODEL_SCRIPT = """
+        var ul = arguments[0];
+        var link = ul.querySelector("a[href*='model_theme[model_type]']");
+        var result = {id: ul.id, href: link ? link.getAttribute('href') : null, themes: []};
+        ul.querySelectorAll('li.icon[data-card-uid]').forEach(function (theme) {
+            var label = theme.querySelector('a.link.scroll-to-card span.label');
+            if (!label) { return; }
+            var views = [];
+            var listing = theme.querySelector("div.listing[data-type='listing'][data-src='/stencils']");
+            if (listing) {
+                listing.querySelectorAll('ul.list > li.entry:not(.non-entry) > a.to-detail > div.label')
+                    .forEach(function (view) { views.push(view.textContent); });
+            }
+            result.themes.push([label.textContent, views]);
+        });
+        return result;
+    """
+
+    def extract(self, entity, context):
+        if entity == 'model_tree':
+            raw = self.driver.execute_script(self.MODEL_SCRIPT, context['element'])
+            if not raw:
+                return None
+            return normalize_model_result({'id': raw.get('id'), 'type': parse_model_type(raw.get('href')),
+                                           'themes': raw.get('themes', [])})
+        spec = EXTRACTOR_FIELDS[entity]
+        raw = self.driver.execute_script(self.FIELDS_SCRIPT, spec['container'], spec['fields'])
+        return {key: (raw.get(key) or '').strip() for key in spec['fields']}
+
+class PageSourceExtractor(ExtractorBackend):
+    """Parse driver.page_source locally instead of querying elements"""
+    name = 'source'
+
+    def __init__(self, driver):
+        super().__init__(driver)
+        self.model_tree_root = None  # Forms tree is static while it is parsed
+
+    def reset(self):
+        self.model_tree_root = None
+
+    def extract(self, entity, context):
+        if entity == 'model_tree':
+            if self.model_tree_root is None:
+                self.model_tree_root = parse_html(self.driver.page_source)
+            model_id = context['element'].get_attribute("id")
+            model_ul = self.model_tree_root.find('ul', attrs={'id': model_id})
+            if model_ul is None:
+                return None
+            return normalize_model_result(extract_model_from_html(model_ul))
+        return extract_fields_from_html(entity, parse_html(self.driver.page_source), container=True)
+
+class HttpExtractor(ExtractorBackend):
+    """Fetch detail panes directly over HTTP with the browser session cookies"""
+    name = 'http'
+    needs_render = False
+
+    def __init__(self, driver):
+        super().__init__(driver)
+        self.session = None
+
+    def reset(self):
+        # A restarted browser has new session cookies
+        self.session = None
+
+    def get_session(self):
+        if self.session is None:
+            self.session = requests.Session()
+            self.session.headers['X-Requested-With'] = 'XMLHttpRequest'
+            for cookie in self.driver.get_cookies():
+                self.session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'))
+        return self.session
+
+    def extract(self, entity, context):
+        href = context.get('href')
+        if entity == 'model_tree' or not href or href.startswith(('#', 'javascript')):
+            return None
+        base = urlparse(self.driver.current_url)
+        url = href if href.startswith('http') else f"{base.scheme}://{base.netloc}{href}"
+        status, final_url, text = SESSION_TRACE.http_get(self.get_session(), url)
+        if status != 200 or 'login' in urlparse(final_url).path:
+            return None
+        return extract_fields_from_html(entity, parse_html(text), container=False)
+
+def extract_fields_from_html(entity, root, container=True):
+    """Read an entity's form fields from a parsed HTML tree"""
+    spec = EXTRACTOR_FIELDS[entity]
+    if container:
+        # Narrow to the rendered pane so stale forms elsewhere on the page are ignored
+        tag, classes = spec['container_match']
+        for node in root.find_all(tag, cls=classes[0]):
+            if all(c in node.classes() for c in classes):
+                root = node
+                break
+        else:
+            return None
+    return {key: get_field_value(root, field_id) or '' for key, (field_id, mode) in spec['fields'].items()}
+
+def extract_model_from_html(model_ul):
+    """Read a model's type, themes and views from a parsed #iconList ul"""
+    model_type = None
+    for link in model_ul.find_all('a'):
+        model_type = parse_model_type(link.attrs.get('href'))
+        if model_type:
+            break
+    themes = []
+    for theme in model_ul.find_all('li', cls='icon', attrs={'data-card-uid': None}):
+        label = None
+        for link in theme.find_all('a', cls='scroll-to-card'):
+            if 'link' in link.classes():
+                label = link.find('span', cls='label')
+                if label is not None:
+                    break
+        if label is None:
+            continue
+        views = []
+        listing = theme.find('div', cls='listing', attrs={'data-type': 'listing', 'data-src': '/stencils'})
+        if listing is not None:
+            for view_list in listing.find_all('ul', cls='list'):
+                for entry in view_list.child_elements('li', cls='entry'):
+                    if 'non-entry' in entry.classes():
+                        continue
+                    for link in entry.child_elements('a', cls='to-detail'):
+                        for label_div in link.child_elements('div', cls='label'):
+                            views.append(label_div.text())
+        themes.append((label.text(), views))
+    return {'id': model_ul.attrs.get('id'), 'type': model_type, 'themes': themes}
+
+EXTRACTOR_BACKENDS = [DomExtractor, ScriptExtractor, PageSourceExtractor, HttpExtractor]
+
+class ExtractorSelector:
+    """Choose the fastest correct extractor backend per entity by probing"""
+
+    def __init__(self, driver, backends=None, probe_count=3):
+        self.backends = [backend(driver) for backend in (backends or EXTRACTOR_BACKENDS)]
+        self.reference = self.backends[0]  # dom results define correctness
+        self.probe_count = probe_count
+        self.samples = {}  # entity -> {backend name: [cost, ...] or None if incorrect}
+        self.chosen = {}  # entity -> backend
+        # A restarted browser has a new page and new cookies
+        recycle_callbacks = getattr(driver, 'recycle_callbacks', None)
+        if isinstance(recycle_callbacks, list):
+            recycle_callbacks.append(self.reset)
+
+    def reset(self):
+        """Drop every backend's cached page state, e.g. before the Forms tree is parsed again"""
+        for backend in self.backends:
+            backend.reset()
+
+    def extract(self, entity, context):
+        """Extract an entity with the chosen backend, probing first if needed
+
+        context holds 'element' (model tree), 'href' (detail URL) and 'open',
+        a callable that opens the detail pane and returns True on success.
+        """
+        context.setdefault('opened', False)
+        backend = self.chosen.get(entity)
+        if backend is None:
+            return self.probe(entity, context)
+
+        if backend.needs_render and not self.open(context):
+            return None
+        try:
+            result = backend.extract(entity, context)
+        except Exception:
+            result = None
+        if result is None and backend is not self.reference:
+            # Fall back to the reference backend for this entity only
+            if not self.open(context):
+                return None
+            result = self.reference.extract(entity, context)
+        return result
+
+    def open(self, context):
+        if context['opened']:
+            return True
+        opener = context.get('open')
+        start = time.perf_counter()
+        context['opened'] = opener() if opener else True
+        context['open_cost'] = time.perf_counter() - start
+        return context['opened']
+
+    def probe(self, entity, context):
+        """Run every backend on this entity, time them and return the reference result"""
+        samples = self.samples.setdefault(entity, {b.name: [] for b in self.backends})
+        timings = {}
+        results = {}
+
+        # Backends that don't need the pane open run first so their timing is honest
+        for backend in sorted(self.backends, key=lambda b: b.needs_render):
+            if backend.needs_render and not self.open(context):
+                break
+            start = time.perf_counter()
+            try:
+                results[backend.name] = backend.extract(entity, context)
+            except Exception:
+                results[backend.name] = None
+            cost = time.perf_counter() - start
+            if backend.needs_render:
+                cost += context.get('open_cost', 0)
+            timings[backend.name] = cost
+
+        reference = results.get(self.reference.name)
+        if reference is None:
+            return None
+
+        for backend in self.backends:
+            if samples[backend.name] is None:
+                continue
+            if results.get(backend.name) != reference:
+                samples[backend.name] = None  # Wrong once means never chosen
+            else:
+                samples[backend.name].append(timings[backend.name])
+
+        if len(samples[self.reference.name]) >= self.probe_count:
+            eligible = {name: sum(costs) / len(costs) for name, costs in samples.items() if costs}
+            fastest = SESSION_TRACE.extractor_choice(entity, min(eligible, key=eligible.get))
+            self.chosen[entity] = next(b for b in self.backends if b.name == fastest)
+        return reference
+
+    def summary(self):
+        """Return the chosen backend name per entity"""
+        return {entity: backend.name for entity, backend in self.chosen.items()}
+
+@profiled_phase('workflow')
+def scan_model_workflows(driver, models_data, capture=None, extractors=None, on_model_done=None, confirm=True):
+    """Scan workflow states and actions for each model
+
+    When a started NetworkCapture is given, states and actions are parsed from
+    the /machine_states XHR payloads instead of the rendered workflow listing.
+    on_model_done(model_name) is called as each model finishes. confirm=False
+    skips the prompt (benchmark runs).
+    """
+    extractors = extractors or ExtractorSelector(driver)
+    try:
+        print("\n" + "=" * 80)
+        print("\n                     Scanning Model Workflows")
+        print("\n" + "=" * 80)
+        print("\nThis process will scan workflows from all models automatically.")
+        print("This may take several minutes to complete depending on the number of models.")
+        print("\nIMPORTANT:")
+        print("- You can stop the process at any time by pressing Ctrl+C")
+        print("- Please do not interact with the browser while the process is running")
+        print("- The browser will automatically handle all interactions")
+        print("\n" + "-" * 80)
+        verify = PHASE_PROFILER.ask("\nWould you like to proceed with scanning workflows? (y/n): ").strip().lower() if confirm else 'y'
+        
+        if verify != 'y':
+            print("\nSkipping workflow scanning process.")
+            return models_data
+        # First navigate to Workflow dashboard
+        if not navigate_to_workflows(driver):
+            print("\nError: Could not navigate to Workflow dashboard")
+            return models_data
+        SCAN_METRICS.begin_phase('workflow', len(models_data))
+            
+        # Initialize counters for progress bar
+        total_models = len(models_data)
+        
+        # Clear screen and show initial progress
+        os.system('cls' if os.name == 'nt' else 'clear')
+        print("\n" + "=" * 80)
+        print("\n                     Scanning Model Workflows")
+        print("\nPress Ctrl+C to stop the process at any time")
+        print("Please wait while workflows are scanned from all models...")
+        print("\n" + "=" * 80 + "\n")
+        
+        # Process each model
+        for current_model, model_name, model_data in scan_models(driver, models_data, 'Workflow'):
+            try:
+                progress = (current_model / total_models) * 100
+                
+                # Update progress bar
+                bar_length = 50
+                filled_length = int(bar_length * current_model // total_models)
+                bar = '=' * filled_length + '-' * (bar_length - filled_length)
+                
+                # Truncate model name if too long (limit to 20 chars)
+                truncated_name = model_name[:20] + '...' if len(model_name) > 20 else model_name
+                
+                sys.stdout.write('\r' + ' ' * 100)  # Clear line
+                sys.stdout.write('\rScanning Workflows: [{0}] {1:.1f}% ({2}/{3}) - {4}'.format(
+                    bar, progress, current_model, total_models, truncated_name
+                ))
+                sys.stdout.flush()
+                
+                # Restart the browser here if it has grown too large or hung
+                SCAN_METRICS.begin_model(model_name)
+                session_checkpoint(driver, 'Workflow', f"workflows for {model_name}")
+
+                # Try different model name formats for the selector
+                possible_ids = [
+                    model_name,  # Original name
+                    model_name.replace(" ", ""),  # No spaces
+                    ''.join(word.capitalize() for word in model_name.split()),  # CamelCase
+                    f"MacModelTypeDyn{model_name.replace(' ', '')}",  # Dynamic model format
+                    model_name.replace(" ", "_")  # Underscores
+                ]
+                
+                model_element = None
+                for model_id in possible_ids:
+                    selector = f"div.link.is-admin[data-id='{css_string(model_id)}']"
+                    elements = driver.find_elements(By.CSS_SELECTOR, selector)
+                    if elements:
+                        model_element = elements[0]
+                        break
+                
+                if model_element:
+                    # Click the model
+                    driver.execute_script("arguments[0].click();", model_element)
+                    pause(2)  # Wait for potential UI update
+                    
+                    # Get themes from the model data
+                    themes = model_data.get('themes', {})
+                    if not themes:
+                        models_data[model_name]['workflow'] = {'themes': {}}
+                        continue
+                    
+                    workflow_data = {'themes': {}}
+                    
+                    # Find all theme links excluding "New Theme" and "Retired Themes"
+                    theme_link_selector = "li.icon:not(.new-theme):not(.retired-themes) > a.link"
+                    theme_titles = [link.get_attribute('title') for link in
+                                    driver.find_elements(By.CSS_SELECTOR, theme_link_selector + "[title]")]
+                    
+                    for theme_name in theme_titles:
+                        if not theme_name or theme_name not in themes:
+                            continue
+                        theme_entity = {'model': model_name, 'theme': theme_name}
+                        
+                        def open_theme():
+                            # Re-resolve the theme link by its title on every attempt
+                            theme_link = find_by_stable_key(driver, theme_link_selector, "title", theme_name)
+                            
+                            # Click the theme
+                            if capture:
+                                capture.reset()
+                            driver.execute_script("arguments[0].click();", theme_link)
+                            
+                            # Parse the workflow straight from the network response if possible
+                            if capture and capture.enabled:
+                                theme_workflow = capture_workflow_states(driver, capture)
+                                if theme_workflow is not None:
+                                    return theme_workflow, None
+                            
+                            pause(2)  # Wait for theme to load
+                            
                             try:
                                 # Wait for workflow container
-                                wait = WebDriverWait(driver, 10)
-                                workflow_container = wait.until(
+                                workflow_container = adaptive_wait(driver, 'workflow_listing').until(
                                     EC.presence_of_element_located((By.CSS_SELECTOR, "div.listing[data-type='listing'][data-src='/machine_states']"))
                                 )
+                            except TimeoutException:
+                                # Themes without a workflow have no states listing
+                                return {'workflow_id': None, 'states': []}, None
+                            
+                            # Find all states in the workflow container
+                            states = workflow_container.find_elements(By.CSS_SELECTOR, "li.entry[data-model-id]")
+                            if not states:
+                                return {'workflow_id': None, 'states': []}, None
+                            
+                            # Get workflow ID from any new event link
+                            workflow_id = None
+                            new_event_links = workflow_container.find_elements(By.CSS_SELECTOR, "a.new-event")
+                            if new_event_links:
+                                href = new_event_links[0].get_attribute('href')
+                                match = re.search(r'machine_workflow_id=(\d+)', href)
+                                if match:
+                                    workflow_id = match.group(1)
+                            
+                            # State ids are the stable keys used to re-resolve stale states
+                            return {'workflow_id': workflow_id, 'states': []}, \
+                                [state.get_attribute('data-model-id') for state in states]
+                        
+                        theme_result = RETRY_POLICY.call(open_theme, 'Workflow', theme_entity)
+                        if theme_result is None:
+                            continue
+                        theme_workflow, state_keys = theme_result
+                        workflow_data['themes'][theme_name] = theme_workflow
+                        
+                        # Process each state
+                        for state_key in (state_keys or []):
+                            state_entity = dict(theme_entity, state=state_key)
+                            
+                            def resolve_state():
+                                return find_by_stable_key(driver,
+                                    "div.listing[data-src='/machine_states'] li.entry", "data-model-id", state_key)
+                            
+                            def fetch_state():
+                                state = resolve_state()
+                                
+                                # Get state header with both display and internal names
+                                state_header = state.find_element(By.CSS_SELECTOR, "h2").text.strip()
+                                state_entity['state'] = state_header
+                                
+                                # Parse display and internal names
+                                match = re.match(r'(.*?)\s*\((.*?)\)', state_header)
+                                if match:
+                                    display_name, internal_name = match.groups()
+                                else:
+                                    display_name = internal_name = state_header
+                                    
+                                # Click state to get validation blocks
+                                state_link = state.find_element(By.CSS_SELECTOR, "a.to-detail")
+                                
+                                def open_state():
+                                    driver.execute_script("arguments[0].click();", state_link)
+                                    pause(1)
+                                    
+                                    # Wait for state details
+                                    adaptive_wait(driver, 'workflow_state_detail').until(
+                                        EC.presence_of_element_located((By.CSS_SELECTOR, "form.machine_state")))
+                                    return True
+                                
+                                # Get all validation blocks
+                                fields = extractors.extract('workflow_state', {
+                                    'href': state_link.get_attribute("href"),
+                                    'open': open_state
+                                })
+                                validation_blocks = {key: value for key, value in (fields or {}).items() if value}
+                                
+                                # Action hrefs are the stable keys used to re-resolve stale actions
+                                action_links = [(action.text.strip(), action.get_dom_attribute("href"))
+                                                for action in state.find_elements(By.CSS_SELECTOR,
+                                                    "ul.events > li:not(:last-child) > a.to-detail")]
+                                
+                                return {
+                                    'display_name': display_name.strip(),
+                                    'internal_name': internal_name.strip(),
+                                    'validation_blocks': validation_blocks,
+                                    'actions': []
+                                }, action_links
+                            
+                            state_result = RETRY_POLICY.call(fetch_state, 'Workflow', state_entity)
+                            if state_result is None:
+                                continue
+                            state_data, action_links = state_result
+                            
+                            # Get actions for this state
+                            for action_name, action_href in action_links:
+                                if not action_name or action_name == '+':
+                                    continue
+                                
+                                def fetch_action():
+                                    action = find_by_stable_key(resolve_state(), "ul.events a.to-detail", "href", action_href)
+                                    
+                                    def open_action():
+                                        # Click action to get details
+                                        driver.execute_script("arguments[0].click();", action)
+                                        pause(1)
+                                        
+                                        # Wait for action details
+                                        adaptive_wait(driver, 'workflow_action_detail').until(
+                                            EC.presence_of_element_located((By.CSS_SELECTOR, "form.machine_event")))
+                                        return True
+                                    
+                                    # Get to state and current/draft guard instructions
+                                    fields = extractors.extract('workflow_action', {
+                                        'href': action.get_attribute("href"),
+                                        'open': open_action
+                                    })
+                                    if fields is None:
+                                        raise NoSuchElementException(f"Details not found for action {action_name}")
+                                    
+                                    return {
+                                        'name': action_name,
+                                        'to_state': fields.get('to_state') or None,
+                                        'guard_instructions': fields.get('guard_instructions') or None,
+                                        'draft_guard': fields.get('draft_guard') or None
+                                    }
+                                
+                                action_data = RETRY_POLICY.call(fetch_action, 'Workflow',
+                                    dict(state_entity, action=action_name))
+                                if action_data:
+                                    state_data['actions'].append(action_data)
+                            
+                            theme_workflow['states'].append(state_data)
+                    
+                    # Store workflow data in model dictionary
+                    models_data[model_name]['workflow'] = workflow_data
+                else:
+                    # Initialize empty workflow data structure for models without workflows
+                    models_data[model_name]['workflow'] = {'themes': {}}
+                    
+            except Exception as e:
+                RETRY_POLICY.record('Workflow', {'model': model_name}, e, 1)
+                models_data[model_name]['workflow'] = {'themes': {}}
+                continue
+            finally:
+                # The final scan phase hands each finished model to the streaming renderer
+                if on_model_done and not session_hung(driver):
+                    on_model_done(model_name)
+                
+        session_idle(driver)
+        
+        # Show completion
+        sys.stdout.write('\r' + ' ' * 100)  # Clear line
+        sys.stdout.write('\rWorkflow scanning complete!')
+        sys.stdout.flush()
+        print("\n" + "=" * 80)
+        
+        return models_data
+        
+    except Exception as e:
+        print(f"\nError during workflow scanning: {str(e)}")
+        return models_data
+    finally:
+        # Close the phase however it ends, so it is not reported as running
+        SCAN_METRICS.end_phase()
+
+def navigate_to_card_settings(driver):
+    """Navigate to Card Settings section"""
+    try:
+        def nav_action():
+            wait = adaptive_wait(driver, 'navigate')
+            
+            # First find and click the dashboard picker combo if needed
+            try:
+                combo = driver.find_element(By.CSS_SELECTOR, "li.combo")
+                driver.execute_script("arguments[0].click();", combo)
+                pause(1)  # Wait for dropdown to open
+            except:
+                pass
+            
+            # Find and click the Card Settings link
+            card_settings_link = wait.until(
+                EC.element_to_be_clickable((By.CSS_SELECTOR, 'li.item a.to-dashboard[href*="/client_stores/"][data-updated="NaN/NaN/NaN"]'))
+            )
+            
+            # Make sure it's the Card Settings link
+            links = driver.find_elements(By.CSS_SELECTOR, 'li.item a.to-dashboard[href*="/client_stores/"]')
+            for link in links:
+                if link.text.strip() == "Card Settings":
+                    driver.execute_script("arguments[0].click();", link)
+                    pause(2)  # Wait for page to load
+                    return
+                    
+            raise Exception("Could not find Card Settings link")
+            
+        wait_with_spinner("Navigating to Card Settings...", nav_action)
+        print("Successfully navigated to Card Settings")
+        return True
+        
+    except Exception as e:
+        print(f"Error navigating to Card Settings: {str(e)}")
+        return False
+
+@profiled_phase('methods')
+def scan_methods(driver, models_data, capture=None, extractors=None, on_model_done=None, confirm=True):
+    """Scan methods from all models
+
+    When a started NetworkCapture is given, methods are parsed from the
+    /model_methods XHR payloads instead of the rendered methods listing.
+    on_model_done(model_name) is called as each model finishes. confirm=False
+    skips the prompt (benchmark runs).
+    """
+    extractors = extractors or ExtractorSelector(driver)
+    try:
+        print("\n" + "=" * 80)
+        print("\n                     Scanning Model Methods")
+        print("\n" + "=" * 80)
+        print("\nThis process will scan methods from all models automatically.")
+        print("This may take several minutes to complete depending on the number of models.")
+        print("\nIMPORTANT:")
+        print("- You can stop the process at any time by pressing Ctrl+C")
+        print("- Please do not interact with the browser while the process is running")
+        print("- The browser will automatically handle all interactions")
+        print("\n" + "-" * 80)
+        verify = PHASE_PROFILER.ask("\nWould you like to proceed with scanning methods? (y/n): ").strip().lower() if confirm else 'y'
+        
+        if verify != 'y':
+            print("\nSkipping method scanning process.")
+            return models_data
+        # First navigate to Card Settings
+        if not navigate_to_card_settings(driver):
+            print("\nError: Could not navigate to Card Settings")
+            return models_data
+        SCAN_METRICS.begin_phase('methods', len(models_data))
+            
+        # Initialize counters for progress bar
+        total_models = len(models_data)
+        
+        # Clear screen and show initial progress
+        os.system('cls' if os.name == 'nt' else 'clear')
+        print("\n" + "=" * 80)
+        print("\n                     Scanning Model Methods")
+        print("\nPress Ctrl+C to stop the process at any time")
+        print("Please wait while methods are scanned from all models...")
+        print("\n" + "=" * 80 + "\n")
+        
+        # Process each model
+        for current_model, model_name, model_data in scan_models(driver, models_data, 'Card Settings'):
+            try:
+                progress = (current_model / total_models) * 100
+                
+                # Update progress bar with model name
+                bar_length = 50
+                filled_length = int(bar_length * current_model // total_models)
+                bar = '=' * filled_length + '-' * (bar_length - filled_length)
+                
+                status_text = f"Scanning Methods: [{bar}] {progress:.1f}% ({current_model}/{total_models}) - {model_name}"
+                
+                # Clear line and write status
+                sys.stdout.write('\r' + ' ' * 100)  # Clear line
+                sys.stdout.write('\r' + status_text)
+                sys.stdout.flush()
+                
+                # Restart the browser here if it has grown too large or hung
+                SCAN_METRICS.begin_model(model_name)
+                session_checkpoint(driver, 'Card Settings', f"methods for {model_name}")
+
+                # Try different model name formats for the selector
+                possible_ids = [
+                    model_name,  # Original name
+                    model_name.replace(" ", ""),  # No spaces
+                    ''.join(word.capitalize() for word in model_name.split()),  # CamelCase
+                    f"MacModelTypeDyn{model_name.replace(' ', '')}",  # Dynamic model format
+                    model_name.replace(" ", "_")  # Underscores
+                ]
+                
+                model_element = None
+                for model_id in possible_ids:
+                    selector = f"div.link.is-admin[data-id='{css_string(model_id)}']"
+                    elements = driver.find_elements(By.CSS_SELECTOR, selector)
+                    if elements:
+                        model_element = elements[0]
+                        break
+                
+                if model_element:
+                    # Click the model
+                    driver.execute_script("arguments[0].click();", model_element)
+                    pause(2)  # Wait for potential UI update
+                    
+                    # First check if Methods tab exists
+                    methods_tab = None
+                    try:
+                        # Try finding the Methods tab by text content first
+                        tabs = driver.find_elements(By.CSS_SELECTOR, "ul.dock-tabs li a.ui-tabs-anchor")
+                        for tab in tabs:
+                            if tab.text.strip() == "Methods":
+                                methods_tab = tab
+                                break
+                                
+                        if not methods_tab:
+                            # Try alternate selector
+                            methods_tab = driver.find_element(By.CSS_SELECTOR, "ul.dock-tabs li a[href*='fluxx-card'][id*='ui-id']")
+                            
+                    except:
+                        pass
+                            
+                    if not methods_tab:
+                        models_data[model_name]['methods'] = []
+                        continue
+
+                    # Click the Methods tab
+                    if capture:
+                        capture.reset()
+                    driver.execute_script("arguments[0].click();", methods_tab)
+
+                    # Parse the methods straight from the network response if possible
+                    if capture and capture.enabled:
+                        model_methods = capture_model_methods(driver, capture)
+                        if model_methods is not None:
+                            models_data[model_name]['methods'] = model_methods
+                            continue
+
+                    pause(1)  # Wait for tab content to load
+                    
+                    # Wait for methods container with updated selector
+                    try:
+                        methods_container = adaptive_wait(driver, 'method_listing').until(
+                            EC.presence_of_element_located((By.CSS_SELECTOR, "div.listing.area[data-type='listing'][data-src='/model_methods']"))
+                        )
+                        
+                        # Find all method entries in the list
+                        method_entries = methods_container.find_elements(By.CSS_SELECTOR, "ul.list > li.entry")
+                        
+                        if not method_entries:
+                            models_data[model_name]['methods'] = []
+                            continue
+                        
+                        # Method ids are the stable keys used to re-resolve stale entries
+                        method_keys = [entry.get_attribute("data-model-id") for entry in method_entries]
+                        
+                        model_methods = []
+                        for index, method_key in enumerate(method_keys):
+                            entity = {'model': model_name, 'method': method_key or index}
+                            
+                            def fetch_method():
+                                if method_key:
+                                    method_entry = find_by_stable_key(driver,
+                                        "div.listing[data-src='/model_methods'] ul.list > li.entry", "data-model-id", method_key)
+                                else:
+                                    method_entry = driver.find_elements(By.CSS_SELECTOR,
+                                        "div.listing[data-src='/model_methods'] ul.list > li.entry")[index]
                                 
-                                # Find all states in the workflow container
-                                states = workflow_container.find_elements(By.CSS_SELECTOR, "li.entry[data-model-id]")
+                                # Get method name from the h2 in the list entry
+                                method_name = method_entry.find_element(By.CSS_SELECTOR, "h2").text.strip()
+                                entity['method'] = method_name
                                 
-                                if not states:
-                                    workflow_data['themes'][theme_name] = {
-                                        'workflow_id': None,
-                                        'states': []
-                                    }
-                                    continue
+                                # Find the method link that opens the details
+                                method_link = method_entry.find_element(By.CSS_SELECTOR, "a.to-detail")
                                 
-                                # Get workflow ID from any new event link
-                                workflow_id = None
-                                new_event_links = workflow_container.find_elements(By.CSS_SELECTOR, "a.new-event")
-                                if new_event_links:
-                                    href = new_event_links[0].get_attribute('href')
-                                    match = re.search(r'machine_workflow_id=(\d+)', href)
-                                    if match:
-                                        workflow_id = match.group(1)
+                                def open_detail():
+                                    driver.execute_script("arguments[0].click();", method_link)
+                                    pause(1)  # Wait for details to load
+                                    
+                                    # Wait for detail area to be visible and loaded
+                                    adaptive_wait(driver, 'method_detail').until(
+                                        EC.presence_of_element_located((By.CSS_SELECTOR, "div.detail.area[data-type='detail']"))
+                                    )
+                                    return True
                                 
-                                # Process each state
-                                theme_states = []
-                                for state in states:
-                                    try:
-                                        # Get state header with both display and internal names
-                                        state_header = state.find_element(By.CSS_SELECTOR, "h2").text.strip()
-                                        
-                                        # Parse display and internal names
-                                        match = re.match(r'(.*?)\s*\((.*?)\)', state_header)
-                                        if match:
-                                            display_name, internal_name = match.groups()
-                                        else:
-                                            display_name = internal_name = state_header
-                                            
-                                        # Click state to get validation blocks
-                                        state_link = state.find_element(By.CSS_SELECTOR, "a.to-detail")
-                                        driver.execute_script("arguments[0].click();", state_link)
-                                        time.sleep(1)
-                                        
-                                        # Wait for state details
-                                        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "form.machine_state")))
-                                        
-                                        # Get all validation blocks
-                                        validation_blocks = {}
-                                        try:
-                                            current_before = driver.find_element(By.CSS_SELECTOR, 
-                                                "#machine_state_unsafe_before_validation_enter").get_attribute("value")
-                                            if current_before and current_before.strip():
-                                                validation_blocks['current_before_validation'] = current_before.strip()
-                                                
-                                            draft_before = driver.find_element(By.CSS_SELECTOR,
-                                                "#machine_state_draft_before_validation_enter").get_attribute("value")
-                                            if draft_before and draft_before.strip():
-                                                validation_blocks['draft_before_validation'] = draft_before.strip()
-                                                
-                                            current_after = driver.find_element(By.CSS_SELECTOR,
-                                                "#machine_state_unsafe_after_enter").get_attribute("value")
-                                            if current_after and current_after.strip():
-                                                validation_blocks['current_after_enter'] = current_after.strip()
-                                                
-                                            draft_after = driver.find_element(By.CSS_SELECTOR,
-                                                "#machine_state_draft_after_enter").get_attribute("value")
-                                            if draft_after and draft_after.strip():
-                                                validation_blocks['draft_after_enter'] = draft_after.strip()
-                                        except Exception as e:
-                                            print(f"Error getting validation blocks: {str(e)}")
-                                        
-                                        # Get actions for this state
-                                        actions = []
-                                        action_elements = state.find_elements(By.CSS_SELECTOR, 
-                                            "ul.events > li:not(:last-child) > a.to-detail")
-                                        
-                                        for action in action_elements:
-                                            try:
-                                                action_name = action.text.strip()
-                                                if action_name and not action_name == '+':
-                                                    # Click action to get details
-                                                    driver.execute_script("arguments[0].click();", action)
-                                                    time.sleep(1)
-                                                    
-                                                    # Wait for action details
-                                                    wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "form.machine_event")))
-                                                    
-                                                    # Get to state
-                                                    to_state = None
-                                                    try:
-                                                        to_state_select = driver.find_element(By.CSS_SELECTOR, "#machine_event_to_state_id")
-                                                        to_state = to_state_select.find_element(By.CSS_SELECTOR, "option[selected]").text.strip()
-                                                    except:
-                                                        pass
-                                                    
-                                                    # Get guard instructions
-                                                    guard_instructions = None
-                                                    try:
-                                                        guard = driver.find_element(By.CSS_SELECTOR,
-                                                            "#machine_event_unsafe_guard").get_attribute("value")
-                                                        if guard and guard.strip():
-                                                            guard_instructions = guard.strip()
-                                                    except:
-                                                        pass
-                                                    
-                                                    # Get draft guard instructions
-                                                    draft_guard = None
-                                                    try:
-                                                        draft = driver.find_element(By.CSS_SELECTOR,
-                                                            "#machine_event_draft_guard").get_attribute("value")
-                                                        if draft and draft.strip():
-                                                            draft_guard = draft.strip()
-                                                    except:
-                                                        pass
-                                                    
-                                                    action_data = {
-                                                        'name': action_name,
-                                                        'to_state': to_state,
-                                                        'guard_instructions': guard_instructions,
-                                                        'draft_guard': draft_guard
-                                                    }
-                                                    actions.append(action_data)
-                                            except Exception as e:
-                                                print(f"Error processing action {action_name}: {str(e)}")
-                                                continue
-                                        
-                                        state_data = {
-                                            'display_name': display_name.strip(),
-                                            'internal_name': internal_name.strip(),
-                                            'validation_blocks': validation_blocks,
-                                            'actions': actions
-                                        }
-                                        theme_states.append(state_data)
-                                            
-                                    except Exception as e:
-                                        print(f"\nError processing state: {str(e)}")
-                                        continue
+                                # Get method type and current/draft dynamic method code
+                                fields = extractors.extract('method', {
+                                    'href': method_link.get_attribute("href"),
+                                    'open': open_detail
+                                })
+                                if fields is None:
+                                    raise NoSuchElementException(f"Details not found for method {method_name}")
                                 
-                                workflow_data['themes'][theme_name] = {
-                                    'workflow_id': workflow_id,
-                                    'states': theme_states
-                                }
-
-                            except TimeoutException:
-                                print(f"Workflow container not found for theme: {theme_name}")
-                                workflow_data['themes'][theme_name] = {
-                                    'workflow_id': None,
-                                    'states': []
+                                return {
+                                    'name': method_name,
+                                    'type': fields['type'],
+                                    'current_code': fields['current_code'],
+                                    'draft_code': fields['draft_code']
                                 }
-                                continue
-                                
-                        except Exception as e:
-                            print(f"\nError processing theme {theme_name}: {str(e)}")
-                            continue
-                    
-                    # Store workflow data in model dictionary
-                    models_data[model_name]['workflow'] = workflow_data
+                            
+                            method_data = RETRY_POLICY.call(fetch_method, 'Card Settings', entity)
+                            if method_data:
+                                model_methods.append(method_data)
+                        
+                        # Store methods directly in model data
+                        models_data[model_name]['methods'] = model_methods
+                        
+                    except TimeoutException:
+                        models_data[model_name]['methods'] = []
+                        continue
+                            
                 else:
-                    # Initialize empty workflow data structure for models without workflows
-                    models_data[model_name]['workflow'] = {'themes': {}}
+                    # Initialize empty methods list for models without methods
+                    models_data[model_name]['methods'] = []
                     
             except Exception as e:
-                print(f"\nError processing model {model_name}: {str(e)}")
-                models_data[model_name]['workflow'] = {'themes': {}}
+                RETRY_POLICY.record('Card Settings', {'model': model_name}, e, 1)
+                models_data[model_name]['methods'] = []
+                continue
+            finally:
+                # The final scan phase hands each finished model to the streaming renderer
+                if on_model_done and not session_hung(driver):
+                    on_model_done(model_name)
+        
+        session_idle(driver)
+        
+        # Show completion
+        sys.stdout.write('\r' + ' ' * 100)
+        sys.stdout.write('\rMethod scanning complete!')
+        sys.stdout.flush()
+        print("\n" + "=" * 80)
+        
+        return models_data
+        
+    except Exception as e:
+        print(f"\nError during method scanning: {str(e)}")
+        return models_data
+    finally:
+        # Close the phase however it ends, so it is not reported as running
+        SCAN_METRICS.end_phase()
+
+# HTML Structure Reference for Forms Section:
+#
+# Models:
+# - Located in: #iconList > ul
+# - Model name from: ul[id] attribute (replace _ with space, title case)
+# Example: <ul id="custom_ui_enhancements" class="toggle-class open" data-click-when-opened=".scroll-to-card">
+#
+# Themes:
+# - Located in: ul > li.icon[data-card-uid]
+# - Theme name from: li.icon > a.link.scroll-to-card > span.label[role='menuitem']
+# Example:
+# <li class="icon" data-card-uid="19980">
+#   <a class="link scroll-to-card" href="#fluxx-card-26">
+#     <span class="label" role="menuitem">Animation Examples</span>
+#
+# Views:
+# - Container: li.icon > div.listing[data-type='listing'][data-src='/stencils']
+# - View items: div.listing > ul.list > li.entry:not(.non-entry)
+# - View name from: li.entry > a.to-detail > div.label
+# Example:
+# <div class="listing" data-type="listing" data-src="/stencils" ...>
+#   <ul class="list">
+#     <li class="active entry selected" data-model-id="35727">
+#       <a class="to-detail" href="/stencils/35727">
+#         <div class="label">Gallery</div>
+
+def forms_model_name(model_id):
+    """Model name shown in the documents for a Forms tree ul id (grant_request -> Grant Request)"""
+    return model_id.replace('_', ' ').title()
+
+@profiled_phase('forms')
+def wait_for_forms_and_parse(driver, max_retries=3, extractors=None, confirm=True, only=None):
+    """Wait for Forms section to load and parse content with retry logic; confirm=False accepts the model count
+
+    only limits the scan to the models with these names (a re-scan of Forms failures).
+    """
+    extractors = extractors or ExtractorSelector(driver)
+    # A re-run scan must not reuse the Forms tree parsed by the previous one
+    extractors.reset()
+    try:
+        # Clear screen and show header
+        os.system('cls' if os.name == 'nt' else 'clear')
+        print("\n" + "=" * 80)
+        print("\n                     Scanning Models and Themes")
+        print("\n" + "=" * 80)
+        
+        wait = adaptive_wait(driver, 'forms_tree')
+        
+        # First verify Forms section exists
+        wait.until(EC.presence_of_element_located(
+            (By.CSS_SELECTOR, "#iconList")
+        ))
+        
+        # Wait for at least one model to be loaded
+        try:
+            wait.until(lambda d: len(d.find_elements(By.CSS_SELECTOR, "#iconList > ul[id]")) > 0)
+        except TimeoutException:
+            wait = adaptive_wait(driver, 'forms_tree_slow', 30)
+            wait.until(lambda d: len(d.find_elements(By.CSS_SELECTOR, "#iconList > ul[id]")) > 0)
+            pause(2)
+        
+        while True:
+            model_list = driver.find_elements(By.CSS_SELECTOR, "#iconList > ul[id]")
+            model_list = [model for model in model_list if model.get_attribute("id")]
+            model_count = len(model_list)
+            
+            # Get the height of the iconList container
+            icon_list = driver.find_element(By.CSS_SELECTOR, "#iconList")
+            list_height = driver.execute_script("return arguments[0].scrollHeight", icon_list)
+            
+            # Scroll through the list to ensure all models are loaded
+            current_scroll = 0
+            scroll_step = 500
+            
+            while current_scroll < list_height:
+                driver.execute_script(f"arguments[0].scrollTop = {current_scroll}", icon_list)
+                pause(0.5)
+                current_scroll += scroll_step
+            
+            driver.execute_script("arguments[0].scrollTop = 0", icon_list)
+            
+            model_list = driver.find_elements(By.CSS_SELECTOR, "#iconList > ul[id]")
+            model_list = [model for model in model_list if model.get_attribute("id")]
+            new_count = len(model_list)
+            
+            if new_count > model_count:
+                model_count = new_count
                 continue
+            
+            print(f"\nFound {model_count} models.")
+            verify = PHASE_PROFILER.ask("Does this count appear correct? (y/n): ").strip().lower() if confirm else 'y'
+            
+            if verify == 'y':
+                break
+            print("\nWaiting for more models to load...")
+            pause(3)
+                
+        # Model ids are the stable keys used to re-resolve stale model elements
+        model_ids = [model.get_attribute("id") for model in model_list]
+        scan_list = [(model_ul, model_id) for model_ul, model_id in zip(model_list, model_ids)
+                     if only is None or forms_model_name(model_id) in only]
+        SCAN_METRICS.begin_phase('forms', len(scan_list))
+        
+        # Initialize dictionary to store model data
+        models = {}
+        current_model = 0
+        total_models = len(scan_list)
+        
+        # Print initial progress bar
+        sys.stdout.write("\rScanning Models: [--------------------------------------------------] 0.0% (0/{})".format(total_models))
+        sys.stdout.flush()
+        
+        # Process each model
+        for model_ul, model_id in scan_list:
+            model_name = forms_model_name(model_id)
+            try:
+                current_model += 1
+                progress = (current_model / total_models) * 100
+                
+                # Create progress bar
+                bar_length = 50
+                filled_length = int(bar_length * current_model // total_models)
+                bar = '=' * filled_length + '-' * (bar_length - filled_length)
+                
+                # Update progress bar
+                sys.stdout.write('\r' + ' ' * 100)
+                sys.stdout.write('\rScanning Models: [{0}] {1:.1f}% ({2}/{3})'.format(
+                    bar, progress, current_model, total_models
+                ))
+                sys.stdout.flush()
+                
+                SCAN_METRICS.begin_model(model_name)
+                scope = {'model_ul': model_ul}
+                
+                def resolve_model():
+                    scope['model_ul'] = find_by_stable_key(driver, "#iconList > ul", "id", model_id)
+                
+                def extract_model():
+                    return extractors.extract('model_tree', {'element': scope['model_ul']})
                 
+                # Extract the model type, themes and views with the selected backend
+                # Failures carry the display name, which re-scans of failed models look up
+                model_entry = RETRY_POLICY.call(extract_model, 'Forms', {'model': model_name}, resolve=resolve_model)
+                if not model_entry:
+                    continue
+
+                # Model name comes from the UL id attribute
+                model_entry.pop('id')
+                models[model_name] = model_entry
+                        
+            except Exception as e:
+                RETRY_POLICY.record('Forms', {'model': model_name}, e, 1)
+                continue
+        
         # Show completion
-        sys.stdout.write('\r' + ' ' * 100)  # Clear line
-        sys.stdout.write('\rWorkflow scanning complete!')
+        sys.stdout.write('\r' + ' ' * 100)
+        sys.stdout.write('\rModel scanning complete!')
         sys.stdout.flush()
         print("\n" + "=" * 80)
         
-        return models_data
+        return models
+        
+    except Exception as e:
+        print(f"\nError parsing Forms section: {str(e)}")
+        return None
+    finally:
+        # Close the phase however it ends, so it is not reported as running
+        SCAN_METRICS.end_phase()
+
+WORD_ENGINES = ('fast', 'docx')
+
+# Document variants rendered from the same scan. The customer-facing copy leaves
+# out draft code, which is work in progress and not part of the live build.
+DOC_VARIANTS = {
+    'internal': {'drafts': True},
+    'customer': {'drafts': False},
+}
+
+# Below this many models starting worker processes costs more than it saves
+PARALLEL_MIN_MODELS = 20
+
+# Code blocks longer than this many lines can be moved to a bookmarked appendix
+APPENDIX_MIN_LINES = 40
+
+# Size split: start a new volume once the models' scanned data passes this size
+VOLUME_MAX_BYTES = 2 * 1024 * 1024
+
+VOLUME_SPLITS = ('group', 'size')
+
+# Run formats shared by both Word engines. The python-docx engine applies them
+# as direct run properties; the fast engine registers each one as a character
+# style so a run only carries a style reference.
+RUN_FORMATS = {
+    'plain': {},
+    'bold': {'bold': True},
+    'italic': {'italic': True},
+    'bold_italic': {'bold': True, 'italic': True},
+    'label': {'bold': True, 'font': 'Calibri'},
+    'header': {'bold': True, 'size': 14, 'font': 'Calibri'},
+    'code': {'font': 'Consolas', 'size': 9, 'color': (128, 128, 128)},
+    'action': {'italic': True, 'size': 9, 'color': (128, 128, 128)},
+    'link': {'underline': True, 'color': (5, 99, 193)},
+}
+
+FAST_CHARACTER_STYLES = {
+    'label': 'Fluxx Label',
+    'header': 'Fluxx Model Header',
+    'code': 'Fluxx Code',
+    'action': 'Fluxx Action',
+    'link': 'Fluxx Link',
+}
+
+FAST_COMPACT_STYLE = 'Fluxx Compact'
+
+ROW_TITLES = {
+    1: 'Themes:',
+    2: 'Workflow:',
+    4: 'Method:',
+    5: 'Before New / After Create:',
+    6: 'Before Validation / After Enter / Guard Instructions:',
+    7: 'Documents:',
+    8: 'Embedded Cards / Dynamic Relationships:'
+}
+
+THEME_BLOCK_ORDER = [
+    ('current_before_new', 'Current Before New Block'),
+    ('draft_before_new', 'Draft Before New Block'),
+    ('current_after_create', 'Current After Create Block'),
+    ('draft_after_create', 'Draft After Create Block')
+]
+
+VALIDATION_BLOCK_ORDER = [
+    ('current_before_validation', 'Current Before Validation'),
+    ('draft_before_validation', 'Draft Before Validation'),
+    ('current_after_enter', 'Current After Enter'),
+    ('draft_after_enter', 'Draft After Enter')
+]
+
+def doc_paragraph(text=None, fmt='plain', compact=False, before=None, center=False, link=None):
+    """Build a document paragraph holding a single run (or none when text is None)
+
+    link names a bookmark the paragraph's runs jump to (fast engine only).
+    """
+    runs = [] if text is None else [(text, fmt)]
+    return {'runs': runs, 'compact': compact, 'before': before, 'center': center, 'link': link}
+
+def doc_text_cell(text):
+    """Build a cell holding a single line of plain text"""
+    return [doc_paragraph(text)]
+
+def doc_lines_cell(lines):
+    """Build a cell of compact (text, format) lines below a blank lead paragraph"""
+    return [doc_paragraph('')] + [doc_paragraph(text, fmt, compact=True) for text, fmt in lines]
+
+def build_themes_cell(model_data):
+    """Build the Themes row: theme count followed by each theme and its views"""
+    themes = model_data.get('themes', {})
+    theme_text = [f"{len(themes)} Themes Built"]
+    for theme_name, theme_data in themes.items():
+        theme_line = [f"\n{theme_name}"]
+        for view in theme_data.get('views', []):
+            theme_line.append(f"- {view}")
+        theme_text.append('\n'.join(theme_line))
+    return doc_text_cell('\n'.join(theme_text))
+
+def build_workflow_cell(workflow_data, model_data=None, include_drafts=True):
+    """Build the Workflow row: states and their actions per theme"""
+    if not isinstance(workflow_data, dict):
+        return doc_text_cell("No workflow configuration")
+    themes = workflow_data.get('themes', {})
+    if not themes:
+        return doc_text_cell("No workflow states configured")
+    lines = []
+    for theme_name, theme_data in themes.items():
+        if not isinstance(theme_data, dict) or not theme_data.get('states'):
+            continue
+        lines.append((f"Theme: {theme_name}", 'bold'))
+        for state in theme_data['states']:
+            if not isinstance(state, dict):
+                continue
+            lines.append((f"• {state.get('display_name', '')} ({state.get('internal_name', '')})", 'plain'))
+            sources = referenced_by(model_data or {}, 'state', state.get('internal_name'), include_drafts)
+            if sources:
+                lines.append((f"    Referenced by: {sources}", 'action'))
+            for action in state.get('actions', []):
+                if isinstance(action, dict):
+                    action_text = f"  - {action.get('name', '')}"
+                    if action.get('to_state'):
+                        action_text += f" [To State -> {action['to_state']}]"
+                    lines.append((action_text, 'action'))
+        lines.extend(workflow_graph_lines(workflow_graph(theme_data['states'])))
+    if not lines:
+        return [doc_paragraph('')]
+    return doc_lines_cell(lines)
+
+def build_methods_cell(methods, include_drafts=True, model_data=None):
+    """Build the Method row: each method with its current and draft code"""
+    if not methods:
+        return doc_text_cell("No methods found")
+    cell = [doc_paragraph(''), doc_paragraph(f"{len(methods)} Methods Found", 'bold')]
+    for method in methods:
+        if not isinstance(method, dict):
+            continue
+        name_para = doc_paragraph(f"\n{method.get('name', '')}", 'bold', before=12)
+        if method.get('type'):
+            name_para['runs'].append((f" ({method.get('type')})", 'italic'))
+        cell.append(name_para)
+        sources = referenced_by(model_data or {}, 'method', method.get('name'), include_drafts)
+        if sources:
+            cell.append(doc_paragraph(f"Called by: {sources}", 'action'))
+        for key, label in (('current_code', 'Current Code:'), ('draft_code', 'Draft Code:')):
+            if method.get(key) and (include_drafts or key != 'draft_code'):
+                cell.append(doc_paragraph(label, 'italic', before=6))
+                cell.append(doc_paragraph(method[key], 'code'))
+    return cell
+
+def build_theme_code_cell(model_data, include_drafts=True):
+    """Build the Before New / After Create row from each theme's code blocks"""
+    themes = model_data.get('themes', {})
+    if not themes:
+        return doc_lines_cell([("No themes configured", 'italic')])
+    lines = []
+    for theme_name, theme_data in themes.items():
+        if not isinstance(theme_data, dict):
+            continue
+        theme_code = theme_data.get('code', {})
+        blocks = [(label, theme_code[key]) for key, label in THEME_BLOCK_ORDER
+                  if theme_code.get(key) and theme_code[key] != "N/A"
+                  and (include_drafts or not key.startswith('draft_'))]
+        if blocks:
+            lines.append((f"Theme: {theme_name}", 'bold'))
+            for label, code in blocks:
+                lines.append((f"\n{label}:", 'italic'))
+                lines.append((code, 'code'))
+    if not lines:
+        lines = [("No Before New or After Create blocks configured", 'italic')]
+    return doc_lines_cell(lines)
+
+def build_validation_cell(workflow_data, include_drafts=True):
+    """Build the Before Validation / After Enter / Guard Instructions row"""
+    if not isinstance(workflow_data, dict) or not workflow_data.get('themes'):
+        return doc_text_cell("No workflow configuration")
+    themes = workflow_data['themes']
+    validation_lines = []
+    guard_lines = []
+    for theme_name, theme_data in themes.items():
+        if not isinstance(theme_data, dict):
+            continue
+        theme_validation = []
+        theme_guards = []
+        for state in theme_data.get('states', []):
+            if not isinstance(state, dict):
+                continue
+            state_label = f"{state.get('display_name', '')} ({state.get('internal_name', '')})"
+            validation_blocks = state.get('validation_blocks', {})
+            if not include_drafts:
+                validation_blocks = {key: code for key, code in validation_blocks.items()
+                                     if not key.startswith('draft_')}
+            if any(validation_blocks.values()):
+                theme_validation.append((f"\nState: {state_label}", 'bold_italic'))
+                for key, label in VALIDATION_BLOCK_ORDER:
+                    if validation_blocks.get(key) and (include_drafts or not key.startswith('draft_')):
+                        theme_validation.append((f"\n{label}:", 'italic'))
+                        theme_validation.append((validation_blocks[key], 'code'))
+            for action in state.get('actions', []):
+                if not isinstance(action, dict):
+                    continue
+                action_name = action.get('name', '')
+                if action.get('guard_instructions'):
+                    theme_guards.append((f"\nGuard Instructions for {action_name} in {state_label}:", 'italic'))
+                    theme_guards.append((action['guard_instructions'], 'code'))
+                if action.get('draft_guard') and include_drafts:
+                    theme_guards.append((f"\nDraft Guard Instructions for {action_name} in {state_label}:", 'italic'))
+                    theme_guards.append((action['draft_guard'], 'code'))
+        if theme_validation:
+            validation_lines.append((f"Theme: {theme_name}", 'bold'))
+            validation_lines.extend(theme_validation)
+        if theme_guards:
+            guard_lines.append((f"Theme: {theme_name}", 'bold'))
+            guard_lines.extend(theme_guards)
+    if not validation_lines and not guard_lines:
+        return doc_text_cell("No validation blocks or guard instructions configured")
+    lines = [("VALIDATION BLOCKS:", 'bold')] + validation_lines
+    if guard_lines:
+        lines.append(("\nGUARD INSTRUCTIONS:", 'bold'))
+        lines.extend(guard_lines)
+    return doc_lines_cell(lines)
+
+def build_model_section(model_name, model_data, variant='internal'):
+    """Build the engine-neutral layout of one model's documentation table"""
+    include_drafts = DOC_VARIANTS[variant]['drafts']
+    header_text = model_name
+    if model_data.get('type'):
+        header_text += f" ({model_data['type']})"
+    if model_data.get('is_dynamic', False):
+        header_text += " - Dynamic Model"
+    workflow_data = model_data.get('workflow', {})
+    cells = {
+        1: build_themes_cell(model_data),
+        2: build_workflow_cell(workflow_data, model_data, include_drafts),
+        4: build_methods_cell(model_data.get('methods', []), include_drafts, model_data),
+        5: build_theme_code_cell(model_data, include_drafts),
+        6: build_validation_cell(workflow_data, include_drafts),
+        7: [doc_paragraph('')],
+        8: [doc_paragraph('')],
+    }
+    rows = []
+    for row_idx in range(1, 9):
+        if row_idx in ROW_TITLES:
+            rows.append(([doc_paragraph(ROW_TITLES[row_idx], 'label')], cells[row_idx]))
+        else:
+            # Left empty for the consultant to fill in
+            rows.append(([doc_paragraph()], [doc_paragraph()]))
+    return {'header': [doc_paragraph(header_text, 'header', center=True)], 'rows': rows}
+
+def create_document_shell(site_url=None, volume_title=None):
+    """Create the document with page setup, styles and the title page"""
+    doc = Document()
+    
+    # Set standard margins (1 inch = 1440 twips)
+    for section in doc.sections:
+        section.left_margin = int(1.25 * 1440)  # 1.25 inch left margin
+        section.right_margin = int(1.25 * 1440)  # 1.25 inch right margin
+        section.top_margin = int(1.25 * 1440)  # 1.25 inch top margin
+        section.bottom_margin = int(1.25 * 1440)  # 1.25 inch bottom margin
+        # Set page dimensions
+        section.page_width = Pt(8.5 * 72)  # 8.5 inches
+        section.page_height = Pt(11 * 72)  # 11 inches
+    
+    # Set default font and paragraph styles
+    style = doc.styles['Normal']
+    style.font.name = 'Calibri'
+    style.font.size = Pt(11)
+    style.paragraph_format.space_before = Pt(12)  # Space before paragraphs
+    style.paragraph_format.space_after = Pt(12)   # Space after paragraphs
+    style.paragraph_format.line_spacing = 1.15    # Line spacing
+    
+    # Update heading styles
+    heading1 = doc.styles['Heading 1']
+    heading1.font.name = 'Calibri'
+    heading1.font.size = Pt(16)
+    heading1.font.bold = True
+    heading1.paragraph_format.space_before = Pt(24)  # Extra space before H1
+    heading1.paragraph_format.space_after = Pt(12)
+    
+    heading2 = doc.styles['Heading 2']
+    heading2.font.name = 'Calibri'
+    heading2.font.size = Pt(14)
+    heading2.font.bold = True
+    heading2.paragraph_format.space_before = Pt(18)  # Space before H2
+    heading2.paragraph_format.space_after = Pt(12)
+    
+    # Add title with proper spacing
+    title = doc.add_heading('Fluxx Build Documentation', 0)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    title.paragraph_format.space_before = Pt(36)  # Extra space at top
+    title.paragraph_format.space_after = Pt(24)
+    
+    # Name the volume when the output is split into several documents
+    if volume_title:
+        volume = doc.add_paragraph()
+        volume.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        volume_text = volume.add_run(volume_title)
+        volume_text.font.size = Pt(14)
+        volume_text.font.bold = True
+        volume_text.font.name = 'Calibri'
+    
+    # Add subtitle with URL if provided
+    if site_url:
+        subtitle = doc.add_paragraph()
+        subtitle.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        subtitle.paragraph_format.space_before = Pt(12)
+        subtitle.paragraph_format.space_after = Pt(24)
+        subtitle_text = subtitle.add_run(f"Generated for: {site_url}")
+        subtitle_text.font.size = Pt(12)
+        subtitle_text.font.name = 'Calibri'
+        
+    # Add generation timestamp
+    timestamp = doc.add_paragraph()
+    timestamp.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    timestamp.paragraph_format.space_before = Pt(12)
+    timestamp.paragraph_format.space_after = Pt(36)  # Extra space after header
+    timestamp_text = timestamp.add_run(f"Generated on: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    timestamp_text.font.size = Pt(10)
+    timestamp_text.font.name = 'Calibri'
+    
+    doc.add_page_break()
+    return doc
+
+def table_widths(doc):
+    """Return (grid column, label column, content column) widths in twips"""
+    section = doc.sections[0]
+    available_width = section.page_width - (section.left_margin + section.right_margin)
+    # Table takes 90% of the page width, split 30% labels / 70% content
+    table_width = int(available_width * 0.9)
+    grid_width = Emu(available_width // 2).twips
+    return grid_width, Emu(int(table_width * 0.3)).twips, Emu(int(table_width * 0.7)).twips
+
+def apply_run_format(run, fmt):
+    """Apply a RUN_FORMATS entry to a python-docx run or character style"""
+    spec = RUN_FORMATS[fmt]
+    if spec.get('bold'):
+        run.font.bold = True
+    if spec.get('italic'):
+        run.font.italic = True
+    if spec.get('underline'):
+        run.font.underline = True
+    if spec.get('font'):
+        run.font.name = spec['font']
+    if spec.get('size'):
+        run.font.size = Pt(spec['size'])
+    if spec.get('color'):
+        run.font.color.rgb = RGBColor(*spec['color'])
+
+def fill_cell_docx(cell, paragraphs):
+    """Write layout paragraphs into a python-docx table cell"""
+    for i, para_spec in enumerate(paragraphs):
+        para = cell.paragraphs[0] if i == 0 else cell.add_paragraph()
+        if para_spec['center']:
+            para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        for text, fmt in para_spec['runs']:
+            apply_run_format(para.add_run(text), fmt)
+        if para_spec['compact']:
+            para.paragraph_format.space_after = Pt(0)
+            para.paragraph_format.space_before = Pt(0)
+        elif para_spec['before'] is not None:
+            para.paragraph_format.space_before = Pt(para_spec['before'])
+
+def render_section_docx(doc, section):
+    """Append one model section to the document through python-docx"""
+    # Add spacing before model section
+    doc.add_paragraph().paragraph_format.space_before = Pt(24)
+    
+    table = doc.add_table(rows=9, cols=2)
+    table.style = 'Table Grid'
+    table.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    
+    _, label_width, content_width = table_widths(doc)
+    for i, width in enumerate([label_width, content_width]):
+        for cell in table.columns[i].cells:
+            cell.width = Twips(width)
+    
+    header_row = table.rows[0]
+    header_cell = header_row.cells[0].merge(header_row.cells[1])
+    fill_cell_docx(header_cell, section['header'])
+    for row_idx, (title_cell, content_cell) in enumerate(section['rows'], start=1):
+        fill_cell_docx(table.rows[row_idx].cells[0], title_cell)
+        fill_cell_docx(table.rows[row_idx].cells[1], content_cell)
+    
+    # Add spacing after table
+    doc.add_paragraph().paragraph_format.space_after = Pt(24)
+
+def add_fast_styles(doc):
+    """Register the character and paragraph styles used by the fast engine"""
+    style_ids = {}
+    for fmt, style_name in FAST_CHARACTER_STYLES.items():
+        style = doc.styles.add_style(style_name, WD_STYLE_TYPE.CHARACTER)
+        apply_run_format(style, fmt)
+        style_ids[fmt] = style.style_id
+    compact = doc.styles.add_style(FAST_COMPACT_STYLE, WD_STYLE_TYPE.PARAGRAPH)
+    compact.base_style = doc.styles['Normal']
+    compact.paragraph_format.space_before = Pt(0)
+    compact.paragraph_format.space_after = Pt(0)
+    style_ids['compact'] = compact.style_id
+    return style_ids
+
+XML_INVALID_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+XML_RUN_BREAKS = re.compile(r'([\t\n\r])')
+
+def run_xml(text, fmt, style_ids):
+    """Serialize one run, turning tabs and line breaks into their OOXML elements"""
+    if fmt in style_ids:
+        props = f'<w:rPr><w:rStyle w:val="{style_ids[fmt]}"/></w:rPr>'
+    else:
+        spec = RUN_FORMATS[fmt]
+        props = ('<w:b/>' if spec.get('bold') else '') + ('<w:i/>' if spec.get('italic') else '')
+        props = f'<w:rPr>{props}</w:rPr>' if props else ''
+    parts = []
+    for piece in XML_RUN_BREAKS.split(XML_INVALID_CHARS.sub('', text)):
+        if piece == '\t':
+            parts.append('<w:tab/>')
+        elif piece in ('\n', '\r'):
+            parts.append('<w:br/>')
+        elif piece:
+            parts.append(f'<w:t xml:space="preserve">{xml_escape(piece)}</w:t>')
+    return f'<w:r>{props}{"".join(parts)}</w:r>'
+
+def paragraph_xml(para_spec, style_ids):
+    """Serialize one layout paragraph"""
+    props = ''
+    if para_spec['compact']:
+        props += f'<w:pStyle w:val="{style_ids["compact"]}"/>'
+    elif para_spec['before'] is not None:
+        props += f'<w:spacing w:before="{int(para_spec["before"] * 20)}"/>'
+    if para_spec['center']:
+        props += '<w:jc w:val="center"/>'
+    props = f'<w:pPr>{props}</w:pPr>' if props else ''
+    runs = ''.join(run_xml(text, fmt, style_ids) for text, fmt in para_spec['runs'])
+    if para_spec.get('link'):
+        runs = f'<w:hyperlink w:anchor="{para_spec["link"]}" w:history="1">{runs}</w:hyperlink>'
+    return f'<w:p>{props}{runs}</w:p>'
+
+def cell_xml(paragraphs, width, style_ids, span=1):
+    """Serialize one table cell"""
+    span_xml = f'<w:gridSpan w:val="{span}"/>' if span > 1 else ''
+    body = ''.join(paragraph_xml(para_spec, style_ids) for para_spec in paragraphs)
+    return f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{width}"/>{span_xml}</w:tcPr>{body}</w:tc>'
+
+def section_xml(section, widths, style_ids):
+    """Serialize one model section: spacer, table and trailing spacer"""
+    grid_width, label_width, content_width = widths
+    parts = ['<w:p><w:pPr><w:spacing w:before="480"/></w:pPr></w:p>',
+             '<w:tbl><w:tblPr><w:tblStyle w:val="TableGrid"/><w:tblW w:type="auto" w:w="0"/>'
+             '<w:jc w:val="center"/><w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" '
+             'w:lastRow="0" w:noHBand="0" w:noVBand="1" w:val="04A0"/></w:tblPr>'
+             f'<w:tblGrid><w:gridCol w:w="{grid_width}"/><w:gridCol w:w="{grid_width}"/></w:tblGrid>',
+             f'<w:tr>{cell_xml(section["header"], label_width + content_width, style_ids, span=2)}</w:tr>']
+    for title_cell, content_cell in section['rows']:
+        parts.append(f'<w:tr>{cell_xml(title_cell, label_width, style_ids)}'
+                     f'{cell_xml(content_cell, content_width, style_ids)}</w:tr>')
+    parts.append('</w:tbl><w:p><w:pPr><w:spacing w:after="480"/></w:pPr></w:p>')
+    return ''.join(parts)
+
+PAGE_BREAK_XML = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+
+def move_code_to_appendix(section, model_name, number, min_lines):
+    """Replace long code paragraphs with links and return them as appendix entries
+
+    Entries are (bookmark, title, code). Bookmarks are numbered from the model's
+    position in the document, so they come out the same whichever process renders it.
+    """
+    entries = []
+    for _, cell in section['rows']:
+        heading = state = label = ''
+        for i, para_spec in enumerate(cell):
+            if not para_spec['runs']:
+                continue
+            text, fmt = para_spec['runs'][0]
+            if fmt == 'bold':
+                heading, state, label = text.strip(), '', ''
+            elif fmt == 'bold_italic':
+                state, label = text.strip(), ''
+            elif fmt == 'italic':
+                label = text.strip().rstrip(':')
+            elif fmt == 'code':
+                line_count = text.count('\n') + 1
+                if line_count < min_lines:
+                    continue
+                ref = f"{number}.{len(entries) + 1}"
+                bookmark = f"FluxxCode_{number}_{len(entries) + 1}"
+                title = ' / '.join(part for part in (model_name, heading, state, label) if part)
+                entries.append((bookmark, f"A.{ref} {title}", text))
+                cell[i] = doc_paragraph(f"See Appendix A.{ref} ({line_count} lines)", 'link',
+                                        compact=para_spec['compact'], link=bookmark)
+    return entries
+
+def appendix_xml(entries, style_ids):
+    """Serialize the code appendix: a heading, then each bookmarked code block"""
+    parts = [PAGE_BREAK_XML, '<w:p><w:pPr><w:pStyle w:val="Heading1"/></w:pPr><w:r><w:t>Code Appendix</w:t></w:r></w:p>']
+    for bookmark_id, (bookmark, title, code) in enumerate(entries, start=1):
+        parts.append(f'<w:p><w:pPr><w:pStyle w:val="Heading2"/></w:pPr>'
+                     f'<w:bookmarkStart w:id="{bookmark_id}" w:name="{bookmark}"/>'
+                     f'{run_xml(title, "plain", style_ids)}<w:bookmarkEnd w:id="{bookmark_id}"/></w:p>')
+        parts.append(paragraph_xml(doc_paragraph(code, 'code', compact=True), style_ids))
+    return ''.join(parts)
+
+def render_section_fragment(task):
+    """Render one model section to XML; runs in a worker process when pooled
+
+    Returns (model_name, fragment, error, appendix entries).
+    """
+    model_name, model_data, variant, last, widths, style_ids, appendix = task
+    entries = []
+    try:
+        section = build_model_section(model_name, model_data, variant)
+        if appendix:
+            number, min_lines = appendix
+            entries = move_code_to_appendix(section, model_name, number, min_lines)
+        fragment = section_xml(section, widths, style_ids)
+    except Exception as e:
+        return model_name, None, str(e), []
+    if not last:
+        fragment += PAGE_BREAK_XML
+    return model_name, fragment, None, entries
+
+class FastDocumentWriter:
+    """Write the shell package, then stream model fragments into document.xml"""
+    
+    def __init__(self, doc, filename, appendix_lines=None):
+        self.filename = filename
+        self.appendix_lines = appendix_lines
+        self.appendix = []
+        self.count = 0
+        self.style_ids = add_fast_styles(doc)
+        self.widths = table_widths(doc)
+        shell = io.BytesIO()
+        doc.save(shell)
+        shell.seek(0)
+        self.target = zipfile.ZipFile(filename, 'w', zipfile.ZIP_DEFLATED)
+        # Copy every other part first; only one zip member can be open for writing
+        with zipfile.ZipFile(shell) as source:
+            for item in source.infolist():
+                if item.filename == 'word/document.xml':
+                    document_xml = source.read(item.filename).decode('utf-8')
+                else:
+                    self.target.writestr(item, source.read(item.filename))
+        # The body-level sectPr closes the body; model sections go right before it
+        split_at = document_xml.rindex('<w:sectPr')
+        self.tail = document_xml[split_at:]
+        self.out = self.target.open('word/document.xml', 'w')
+        self.out.write(document_xml[:split_at].encode('utf-8'))
+    
+    def task(self, model_name, model_data, variant, last):
+        """Build the render_section_fragment argument for one model"""
+        self.count += 1
+        appendix = (self.count, self.appendix_lines) if self.appendix_lines else None
+        return model_name, model_data, variant, last, self.widths, self.style_ids, appendix
+    
+    def write(self, result):
+        """Append one render_section_fragment result to the body"""
+        model_name, fragment, error, entries = result
+        if error is not None:
+            print(f"\nError processing model {model_name}: {error}")
+            return
+        self.out.write(fragment.encode('utf-8'))
+        self.appendix.extend(entries)
+    
+    def close(self):
+        """Write the code appendix if anything was moved there, then close the package"""
+        if self.appendix:
+            self.out.write(appendix_xml(self.appendix, self.style_ids).encode('utf-8'))
+        self.out.write(self.tail.encode('utf-8'))
+        self.out.close()
+        self.target.close()
+
+def write_fast_document(doc, models_data, filename, variant='internal', pool=None, appendix_lines=None):
+    """Save the shell document, streaming each model's table XML into document.xml"""
+    writer = FastDocumentWriter(doc, filename, appendix_lines)
+    total = len(models_data)
+    tasks = (writer.task(model_name, model_data, variant, index == total)
+             for index, (model_name, model_data) in enumerate(models_data.items(), start=1))
+    try:
+        if pool is not None:
+            # map() hands results back in submission order, so the merge is deterministic
+            chunksize = max(1, total // ((os.cpu_count() or 1) * 4))
+            fragments = pool.map(render_section_fragment, tasks, chunksize=chunksize)
+        else:
+            fragments = map(render_section_fragment, tasks)
+        for result in fragments:
+            writer.write(result)
+    finally:
+        writer.close()
+
+@profiled_phase('document')
+def generate_word_document(models_data, site_url=None, engine='fast', variant='internal', pool=None,
+                           appendix=False, volume=None, timestamp_str=None, changes=None):
+    """Generate a Word document using the Social Edge template format
+
+    appendix moves code blocks of APPENDIX_MIN_LINES or more into a bookmarked
+    appendix (fast engine only). volume is a (number, title) pair when the
+    document is one of several volumes. changes is a scan diff report shown as
+    a "Changes since" section before the models.
+    """
+    try:
+        if engine not in WORD_ENGINES:
+            raise ValueError(f"Unknown Word engine '{engine}' (expected one of: {', '.join(WORD_ENGINES)})")
+        if variant not in DOC_VARIANTS:
+            raise ValueError(f"Unknown document variant '{variant}' (expected one of: {', '.join(DOC_VARIANTS)})")
+        doc = create_document_shell(site_url, f"Volume {volume[0]}: {volume[1]}" if volume else None)
+        if changes:
+            add_changes_section(doc, changes, DOC_VARIANTS[variant]['drafts'])
+        
+        timestamp_str = timestamp_str or datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        suffix = '' if variant == 'internal' else f'_{variant}'
+        if volume:
+            suffix += f'_vol{volume[0]}'
+        filename = f'fluxx_documentation_{timestamp_str}{suffix}.docx'
+        
+        if engine == 'fast':
+            write_fast_document(doc, models_data, filename, variant, pool,
+                                APPENDIX_MIN_LINES if appendix else None)
+        else:
+            total = len(models_data)
+            for index, (model_name, model_data) in enumerate(models_data.items(), start=1):
+                try:
+                    render_section_docx(doc, build_model_section(model_name, model_data, variant))
+                    # Add page break between models
+                    if index < total:
+                        doc.add_page_break()
+                except Exception as e:
+                    print(f"\nError processing model {model_name}: {str(e)}")
+                    continue
+            doc.save(filename)
+        
+        print(f"\nWord document saved as: {filename}")
+        return filename
         
     except Exception as e:
-        print(f"\nError during workflow scanning: {str(e)}")
-        return models_data
+        print(f"\nError generating Word document: {str(e)}")
+        return None
 
-def navigate_to_card_settings(driver):
-    """Navigate to Card Settings section"""
+def plan_volumes(models_data, split, max_bytes=VOLUME_MAX_BYTES):
+    """Group model names into volumes, returning (title, model names) pairs
+
+    'group' separates core models from dynamic models; 'size' fills each volume
+    until the models' scanned data reaches max_bytes.
+    """
+    if split == 'group':
+        core = [name for name, data in models_data.items() if not data.get('is_dynamic')]
+        dynamic = [name for name, data in models_data.items() if data.get('is_dynamic')]
+        return [(title, names) for title, names in (('Core Models', core), ('Dynamic Models', dynamic)) if names]
+    if split != 'size':
+        raise ValueError(f"Unknown volume split '{split}' (expected one of: {', '.join(VOLUME_SPLITS)})")
+    volumes = []
+    current = []
+    current_bytes = 0
+    for model_name, model_data in models_data.items():
+        model_bytes = len(json.dumps(model_data, ensure_ascii=False))
+        if current and current_bytes + model_bytes > max_bytes:
+            volumes.append(current)
+            current, current_bytes = [], 0
+        current.append(model_name)
+        current_bytes += model_bytes
+    if current:
+        volumes.append(current)
+    return [(f"{names[0]} to {names[-1]}", names) for names in volumes]
+
+def write_volume_index(models_data, volumes, site_url=None, variant='internal', timestamp_str=None, changes=None):
+    """Write a small index document listing each volume's file and models"""
+    doc = create_document_shell(site_url, "Index of Volumes")
+    if changes:
+        add_changes_section(doc, changes, DOC_VARIANTS[variant]['drafts'])
+    for (number, title, names), filename in volumes:
+        doc.add_heading(f"Volume {number}: {title}", 2)
+        para = doc.add_paragraph()
+        para.add_run("File: ").bold = True
+        para.add_run(os.path.basename(filename) if filename else "(not generated)")
+        for model_name in names:
+            model_type = models_data[model_name].get('type', '')
+            item = doc.add_paragraph(f"{model_name} ({model_type})" if model_type else model_name, style='List Bullet')
+            item.paragraph_format.space_before = Pt(0)
+            item.paragraph_format.space_after = Pt(0)
+    timestamp_str = timestamp_str or datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    suffix = '' if variant == 'internal' else f'_{variant}'
+    filename = f'fluxx_documentation_{timestamp_str}{suffix}_index.docx'
+    doc.save(filename)
+    print(f"\nIndex document saved as: {filename}")
+    return filename
+
+def generate_word_volumes(models_data, site_url=None, split='size', variant='internal', pool=None, appendix=False,
+                          changes=None):
+    """Generate the documentation as several volumes plus an index document"""
     try:
-        def nav_action():
-            wait = WebDriverWait(driver, 10)
-            
-            # First find and click the dashboard picker combo if needed
+        # All volumes of one run share a timestamp so their filenames sort together
+        timestamp_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        volumes = []
+        for number, (title, names) in enumerate(plan_volumes(models_data, split), start=1):
+            subset = {name: models_data[name] for name in names}
+            filename = generate_word_document(subset, site_url, variant=variant, pool=pool, appendix=appendix,
+                                              volume=(number, title), timestamp_str=timestamp_str)
+            volumes.append(((number, title, names), filename))
+        index_filename = write_volume_index(models_data, volumes, site_url, variant, timestamp_str, changes)
+        return [index_filename] + [filename for _, filename in volumes]
+    except Exception as e:
+        print(f"\nError generating Word volumes: {str(e)}")
+        return []
+
+def generate_word_variants(models_data, site_url=None, variants=('internal',), workers=None,
+                           split=None, appendix=False, changes=None):
+    """Generate one document (or set of volumes) per variant, sharing one worker pool"""
+    def generate(pool):
+        filenames = []
+        for variant in variants:
+            if split:
+                filenames.extend(generate_word_volumes(models_data, site_url, split, variant, pool, appendix,
+                                                       changes))
+            else:
+                filenames.append(generate_word_document(models_data, site_url, variant=variant, pool=pool,
+                                                        appendix=appendix, changes=changes))
+        return filenames
+    
+    workers = workers or os.cpu_count() or 1
+    if workers < 2 or len(models_data) < PARALLEL_MIN_MODELS:
+        return generate(None)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return generate(pool)
+
+def choose_variants():
+    """Ask which document variants to generate"""
+    print("\nWhich version of the document would you like?")
+    print("1. Internal (includes draft code)")
+    print("2. Customer-facing (current code only)")
+    print("3. Both")
+    choice = input("\nEnter your choice (1-3): ").strip()
+    return {'2': ('customer',), '3': ('internal', 'customer')}.get(choice, ('internal',))
+
+def choose_layout():
+    """Ask how to lay out the output for large tenants; returns (split, appendix)"""
+    print("\nHow should the documentation be split?")
+    print("1. Single document")
+    print("2. Separate volumes for core and dynamic models")
+    print("3. Volumes by size")
+    split = {'2': 'group', '3': 'size'}.get(input("\nEnter your choice (1-3): ").strip())
+    print(f"\nMove code blocks of {APPENDIX_MIN_LINES}+ lines to a linked appendix?")
+    appendix = input("Use code appendix? (y/n): ").strip().lower() == 'y'
+    return split, appendix
+
+class DocumentStreamer:
+    """Render the document on a background thread while the scan is still running
+
+    The final scan phase reports each finished model through model_done(). Models
+    are queued to the renderer through a bounded queue, so a slow renderer holds
+    the scan back instead of piling up pages in memory. Sections are written in
+    the original model order; models that were never reported are rendered when
+    finish() is called. abort() stops a streamer whose scan failed and deletes
+    its partial documents.
+    """
+    
+    def __init__(self, models_data, site_url=None, variants=('internal',), queue_size=8):
+        self.models_data = models_data
+        self.site_url = site_url
+        self.variants = variants
+        self.order = list(models_data)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.writers = []
+        self.thread = None
+        self.error = None
+        self.closed = False
+        self.aborted = False
+    
+    def start(self):
+        """Write the title page of each variant and start the render thread"""
+        timestamp_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        for variant in self.variants:
+            suffix = '' if variant == 'internal' else f'_{variant}'
+            doc = create_document_shell(self.site_url)
+            writer = FastDocumentWriter(doc, f'fluxx_documentation_{timestamp_str}{suffix}.docx')
+            self.writers.append((variant, writer))
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def model_done(self, model_name):
+        """Hand a model whose data is complete to the renderer"""
+        if self.error is None:
+            self.queue.put(model_name)
+    
+    def _render(self, index):
+        model_name = self.order[index]
+        last = index == len(self.order) - 1
+        for variant, writer in self.writers:
+            writer.write(render_section_fragment(
+                writer.task(model_name, self.models_data[model_name], variant, last)))
+    
+    def _run(self):
+        done = set()
+        next_index = 0
+        try:
+            while True:
+                model_name = self.queue.get()
+                if model_name is None:
+                    break
+                done.add(model_name)
+                # Hold back out-of-order models until everything before them is written
+                while next_index < len(self.order) and self.order[next_index] in done and not self.aborted:
+                    self._render(next_index)
+                    next_index += 1
+            while next_index < len(self.order) and not self.aborted:
+                self._render(next_index)
+                next_index += 1
+        except Exception as e:
+            self.error = e
+            # Keep draining so the scan is never blocked on a full queue
+            while self.queue.get() is not None:
+                pass
+    
+    def finish(self):
+        """Render any remaining models, close the documents and return their filenames"""
+        self.queue.put(None)
+        self.thread.join()
+        self.closed = True
+        filenames = []
+        for variant, writer in self.writers:
+            writer.close()
+            if self.error is None:
+                print(f"\nWord document saved as: {writer.filename}")
+                filenames.append(writer.filename)
+        if self.error is not None:
+            print(f"\nError generating Word document: {str(self.error)}")
+        return filenames
+    
+    def abort(self):
+        """Stop rendering and delete the unfinished documents; does nothing after finish()"""
+        if self.closed:
+            return
+        self.closed = True
+        self.aborted = True
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+        for variant, writer in self.writers:
             try:
-                combo = driver.find_element(By.CSS_SELECTOR, "li.combo")
-                driver.execute_script("arguments[0].click();", combo)
-                time.sleep(1)  # Wait for dropdown to open
-            except:
+                writer.close()
+            except Exception:
+                pass
+            try:
+                os.remove(writer.filename)
+            except OSError:
                 pass
-            
-            # Find and click the Card Settings link
-            card_settings_link = wait.until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, 'li.item a.to-dashboard[href*="/client_stores/"][data-updated="NaN/NaN/NaN"]'))
-            )
-            
-            # Make sure it's the Card Settings link
-            links = driver.find_elements(By.CSS_SELECTOR, 'li.item a.to-dashboard[href*="/client_stores/"]')
-            for link in links:
-                if link.text.strip() == "Card Settings":
-                    driver.execute_script("arguments[0].click();", link)
-                    time.sleep(2)  # Wait for page to load
-                    return
-                    
-            raise Exception("Could not find Card Settings link")
-            
-        wait_with_spinner("Navigating to Card Settings...", nav_action)
-        print("Successfully navigated to Card Settings")
-        return True
-        
-    except Exception as e:
-        print(f"Error navigating to Card Settings: {str(e)}")
-        return False
 
-def scan_methods(driver, models_data):
-    """Scan methods from all models"""
-    try:
-        print("\n" + "=" * 80)
-        print("\n                     Scanning Model Methods")
-        print("\n" + "=" * 80)
-        print("\nThis process will scan methods from all models automatically.")
-        print("This may take several minutes to complete depending on the number of models.")
-        print("\nIMPORTANT:")
-        print("- You can stop the process at any time by pressing Ctrl+C")
-        print("- Please do not interact with the browser while the process is running")
-        print("- The browser will automatically handle all interactions")
-        print("\n" + "-" * 80)
-        verify = input("\nWould you like to proceed with scanning methods? (y/n): ").strip().lower()
-        
-        if verify != 'y':
-            print("\nSkipping method scanning process.")
-            return models_data
-            
-        # Initialize WebDriverWait
-        wait = WebDriverWait(driver, 10)
+# Scan Export Reference:
+#
+# A scan is written to fluxx_scan_<timestamp>.jsonl as it runs so the Word
+# document (or any other tool) can be produced later without scanning again.
+# One JSON object per line:
+# - {"record": "header", "schema": "fluxx-scan", "version": 1, "site_url": ..., "created": ...}
+# - {"record": "model", "phase": <phase>, "name": <model name>, "data": <model record>}
+# - {"record": "phase", "phase": <phase>, "models": <count>, "completed": ...}
+# - {"record": "references", "name": <model name>, "references": {...}}
+# - {"record": "shard", "manifest": ..., "shard": ..., ...} (shard scans only,
+#   see the Sharded Scan Reference)
+# Model records are appended for every model at the end of each phase, so a
+# later record for the same model supersedes the earlier one. Phases are
+# forms, code, methods, workflow, rescan and merge. References records (see
+# the Cross-reference Reference) follow the last phase.
+#
+# Model record (version 1):
+#   type, is_dynamic,
+#   themes: {theme: {views: [...], code: {current_before_new, draft_before_new,
+#                                         current_after_create, draft_after_create}}},
+#   methods: [{name, type, current_code, draft_code}],
+#   workflow: {themes: {theme: {workflow_id, states: [{display_name, internal_name,
+#              validation_blocks: {...}, actions: [{name, to_state, guard_instructions,
+#              draft_guard}]}], graph: {...}}}}
+# graph is the state machine analysis described in the Workflow Graph Reference;
+# readers of this tool ignore it and rebuild it from the states.
+# Keys that were not scanned are null.
 
-        # First navigate to Card Settings
-        if not navigate_to_card_settings(driver):
-            print("\nError: Could not navigate to Card Settings")
-            return models_data
-            
-        # Initialize counters for progress bar
-        total_models = len(models_data)
-        current_model = 0
-        
-        # Clear screen and show initial progress
-        os.system('cls' if os.name == 'nt' else 'clear')
-        print("\n" + "=" * 80)
-        print("\n                     Scanning Model Methods")
-        print("\nPress Ctrl+C to stop the process at any time")
-        print("Please wait while methods are scanned from all models...")
-        print("\n" + "=" * 80 + "\n")
-        
-        # Process each model
+SCAN_SCHEMA = 'fluxx-scan'
+SCAN_SCHEMA_VERSION = 1
+
+def export_model_record(model_data):
+    """Return a model in the stable export schema, filling keys that were not scanned"""
+    themes = {}
+    for theme_name, theme_data in model_data.get('themes', {}).items():
+        code = theme_data.get('code')
+        themes[theme_name] = {
+            'views': list(theme_data.get('views', [])),
+            # The scan marks empty blocks "N/A"; the export uses null instead
+            'code': ({key: code.get(key) if code.get(key) not in ('N/A', '') else None
+                      for key, _ in THEME_BLOCK_ORDER} if isinstance(code, dict) else None),
+        }
+    methods = model_data.get('methods')
+    if methods is not None:
+        methods = [{key: method.get(key) for key in ('name', 'type', 'current_code', 'draft_code')}
+                   for method in methods if isinstance(method, dict)]
+    workflow = model_data.get('workflow')
+    if isinstance(workflow, dict):
+        workflow = {'themes': {
+            theme_name: {
+                'workflow_id': theme_data.get('workflow_id'),
+                'states': [{
+                    'display_name': state.get('display_name'),
+                    'internal_name': state.get('internal_name'),
+                    'validation_blocks': {key: state.get('validation_blocks', {}).get(key)
+                                          for key, _ in VALIDATION_BLOCK_ORDER},
+                    'actions': [{key: action.get(key) for key in ('name', 'to_state', 'guard_instructions', 'draft_guard')}
+                                for action in state.get('actions', []) if isinstance(action, dict)],
+                } for state in theme_data.get('states', []) if isinstance(state, dict)],
+                'graph': workflow_graph(theme_data.get('states')),
+            } for theme_name, theme_data in workflow.get('themes', {}).items() if isinstance(theme_data, dict)
+        }}
+    return {
+        'type': model_data.get('type'),
+        'is_dynamic': bool(model_data.get('is_dynamic', False)),
+        'themes': themes,
+        'methods': methods,
+        'workflow': workflow,
+    }
+
+def import_model_record(record):
+    """Turn an export record back into the models_data shape the renderers expect"""
+    model_data = {
+        'type': record.get('type') or '',
+        'is_dynamic': record.get('is_dynamic', False),
+        'themes': {},
+    }
+    for theme_name, theme_data in (record.get('themes') or {}).items():
+        model_data['themes'][theme_name] = {'views': theme_data.get('views') or []}
+        if theme_data.get('code') is not None:
+            model_data['themes'][theme_name]['code'] = {key: code or 'N/A' for key, code in theme_data['code'].items()}
+    if record.get('methods') is not None:
+        model_data['methods'] = record['methods']
+    if record.get('workflow') is not None:
+        workflow = record['workflow']
+        for theme_data in workflow.get('themes', {}).values():
+            # The graph is derived from the states and rebuilt when rendering
+            theme_data.pop('graph', None)
+            for state in theme_data.get('states', []):
+                state['validation_blocks'] = {key: code for key, code in state.get('validation_blocks', {}).items() if code}
+        model_data['workflow'] = workflow
+    return model_data
+
+class ScanExporter:
+    """Append scan results to a JSONL file as each phase finishes"""
+    
+    def __init__(self, site_url=None, filename=None):
+        timestamp_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.filename = filename or f'fluxx_scan_{timestamp_str}.jsonl'
+        self.file = open(self.filename, 'w', encoding='utf-8')
+        self._write({
+            'record': 'header',
+            'schema': SCAN_SCHEMA,
+            'version': SCAN_SCHEMA_VERSION,
+            'site_url': site_url,
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        })
+        self.file.flush()
+    
+    def _write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+    
+    def write_phase(self, phase, models_data):
+        """Write one record per model for a finished phase and flush it to disk"""
         for model_name, model_data in models_data.items():
-            try:
-                current_model += 1
-                progress = (current_model / total_models) * 100
-                
-                # Update progress bar with model name
-                bar_length = 50
-                filled_length = int(bar_length * current_model // total_models)
-                bar = '=' * filled_length + '-' * (bar_length - filled_length)
-                
-                status_text = f"Scanning Methods: [{bar}] {progress:.1f}% ({current_model}/{total_models}) - {model_name}"
-                
-                # Clear line and write status
-                sys.stdout.write('\r' + ' ' * 100)  # Clear line
-                sys.stdout.write('\r' + status_text)
-                sys.stdout.flush()
+            self._write({'record': 'model', 'phase': phase, 'name': model_name,
+                         'data': export_model_record(model_data)})
+        self._write({'record': 'phase', 'phase': phase, 'models': len(models_data),
+                     'completed': datetime.datetime.now().isoformat(timespec='seconds')})
+        self.file.flush()
+        os.fsync(self.file.fileno())
+    
+    def write_references(self, models_data):
+        """Write each model's cross-references and flush them to disk"""
+        for model_name, model_data in models_data.items():
+            if 'references' in model_data:
+                self._write({'record': 'references', 'name': model_name, 'references': model_data['references']})
+        self.file.flush()
+        os.fsync(self.file.fileno())
+    
+    def write_shard(self, shard_info):
+        """Write the record that marks this export as a finished shard of a manifest"""
+        self._write(dict({'record': 'shard'}, **shard_info))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+    
+    def close(self):
+        self.file.close()
 
-                # Try different model name formats for the selector
-                possible_ids = [
-                    model_name,  # Original name
-                    model_name.replace(" ", ""),  # No spaces
-                    ''.join(word.capitalize() for word in model_name.split()),  # CamelCase
-                    f"MacModelTypeDyn{model_name.replace(' ', '')}",  # Dynamic model format
-                    model_name.replace(" ", "_")  # Underscores
-                ]
-                
-                model_element = None
-                for model_id in possible_ids:
-                    selector = f"div.link.is-admin[data-id='{model_id}']"
-                    elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                    if elements:
-                        model_element = elements[0]
-                        break
-                
-                if model_element:
-                    # Click the model
-                    driver.execute_script("arguments[0].click();", model_element)
-                    time.sleep(2)  # Wait for potential UI update
-                    
-                    # First check if Methods tab exists
-                    methods_tab = None
-                    try:
-                        # Try finding the Methods tab by text content first
-                        tabs = driver.find_elements(By.CSS_SELECTOR, "ul.dock-tabs li a.ui-tabs-anchor")
-                        for tab in tabs:
-                            if tab.text.strip() == "Methods":
-                                methods_tab = tab
-                                break
-                                
-                        if not methods_tab:
-                            # Try alternate selector
-                            methods_tab = driver.find_element(By.CSS_SELECTOR, "ul.dock-tabs li a[href*='fluxx-card'][id*='ui-id']")
-                            
-                    except:
-                        pass
-                            
-                    if not methods_tab:
-                        models_data[model_name]['methods'] = []
-                        continue
+def load_scan_export(filename):
+    """Load a scan export, returning (models_data, header)
 
-                    # Click the Methods tab
-                    driver.execute_script("arguments[0].click();", methods_tab)
-                    time.sleep(1)  # Wait for tab content to load
-                    
-                    # Wait for methods container with updated selector
-                    try:
-                        methods_container = wait.until(
-                            EC.presence_of_element_located((By.CSS_SELECTOR, "div.listing.area[data-type='listing'][data-src='/model_methods']"))
-                        )
-                        
-                        # Find all method entries in the list
-                        method_entries = methods_container.find_elements(By.CSS_SELECTOR, "ul.list > li.entry")
-                        
-                        if not method_entries:
-                            models_data[model_name]['methods'] = []
-                            continue
-                        
-                        model_methods = []
-                        for method_entry in method_entries:
-                            try:
-                                # Get method name from the h2 in the list entry
-                                method_name = method_entry.find_element(By.CSS_SELECTOR, "h2").text.strip()
-                                
-                                # Find and click the method link to open details
-                                method_link = method_entry.find_element(By.CSS_SELECTOR, "a.to-detail")
-                                driver.execute_script("arguments[0].click();", method_link)
-                                time.sleep(1)  # Wait for details to load
-                                
-                                # Wait for detail area to be visible and loaded
-                                detail_area = wait.until(
-                                    EC.presence_of_element_located((By.CSS_SELECTOR, "div.detail.area[data-type='detail']"))
-                                )
-                                
-                                # Get method type from select dropdown
-                                method_type = ""
-                                try:
-                                    type_select = detail_area.find_element(By.CSS_SELECTOR, "#model_method_method_type")
-                                    selected_option = type_select.find_element(By.CSS_SELECTOR, "option[selected]")
-                                    method_type = selected_option.text.strip()
-                                except:
-                                    pass
-                                
-                                # Get current dynamic method code
-                                current_code = ""
-                                try:
-                                    code_element = detail_area.find_element(By.CSS_SELECTOR, "#model_method_unsafe_dyn_method")
-                                    current_code = code_element.get_attribute("value").strip()
-                                except:
-                                    pass
-                                
-                                # Get draft dynamic method code
-                                draft_code = ""
-                                try:
-                                    draft_element = detail_area.find_element(By.CSS_SELECTOR, "#model_method_draft_dyn_method")
-                                    draft_code = draft_element.get_attribute("value").strip()
-                                except:
-                                    pass
-                                
-                                method_data = {
-                                    'name': method_name,
-                                    'type': method_type,
-                                    'current_code': current_code,
-                                    'draft_code': draft_code
-                                }
-                                model_methods.append(method_data)
-                                    
-                            except Exception:
-                                continue
-                        
-                        # Store methods directly in model data
-                        models_data[model_name]['methods'] = model_methods
-                        
-                    except TimeoutException:
-                        models_data[model_name]['methods'] = []
-                        continue
-                            
-                else:
-                    # Initialize empty methods list for models without methods
-                    models_data[model_name]['methods'] = []
-                    
-            except Exception as e:
-                print(f"\nError processing model {model_name}: {str(e)}")
-                models_data[model_name]['methods'] = []
+    Later records for a model replace earlier ones; models keep the order in
+    which they were first seen.
+    """
+    models_data = {}
+    header = None
+    with open(filename, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if header is None:
+                if record.get('record') != 'header' or record.get('schema') != SCAN_SCHEMA:
+                    raise ValueError(f"{filename} is not a Fluxx scan export")
+                if record.get('version', 0) > SCAN_SCHEMA_VERSION:
+                    raise ValueError(f"{filename} uses schema version {record['version']}; "
+                                     f"this tool reads up to version {SCAN_SCHEMA_VERSION}")
+                header = record
+            elif record.get('record') == 'model':
+                models_data[record['name']] = import_model_record(record['data'])
+            elif record.get('record') == 'references' and record.get('name') in models_data:
+                models_data[record['name']]['references'] = record['references']
+    if header is None:
+        raise ValueError(f"{filename} is empty")
+    return models_data, header
+
+# Static Site Reference:
+#
+# generate_static_site() writes one folder per run:
+#   index.(html|md)               model list with links to each model and workflow page
+#   models/<slug>.(html|md)       themes, views, theme code and methods for one model
+#   workflows/<slug>.(html|md)    states, actions, validation blocks and guards
+#   search-index.json             inverted index for tools and the search box
+#   search-index.js, search.js, style.css   browser search (HTML only)
+#
+# Every anchored heading on a page is one search document. The index stores
+# documents as [title, href] and each term as a delta-encoded list of
+# document ids. Terms are lowercase names and code identifiers; snake_case
+# identifiers are also indexed by their parts so "amount" finds
+# amount_requested. search-index.js carries the same JSON for pages opened
+# from disk, where browsers block fetch().
+
+SITE_FORMATS = ('html', 'md')
+
+SEARCH_TOKEN_PATTERN = re.compile(r'[A-Za-z_][A-Za-z0-9_]*|\d+')
+
+SITE_STYLE = """body{font-family:Calibri,Arial,sans-serif;margin:0;color:#222}
+header{background:#1f3b57;color:#fff;padding:12px 24px}
+header a{color:#fff;text-decoration:none;font-weight:bold}
+main{max-width:1000px;margin:0 auto;padding:16px 24px}
+pre{background:#f5f5f5;color:#555;padding:8px;overflow-x:auto;font-size:12px}
+h2,h3,h4{margin-top:1.4em}
+#search{width:100%;padding:6px;font-size:14px;box-sizing:border-box}
+#results{list-style:none;padding:0;margin:4px 0 16px}
+#results li{padding:2px 0}
+.meta{color:#666}
+"""
+
+SITE_SEARCH_SCRIPT = """(function(){
+var index=window.FLUXX_SEARCH,root=document.body.getAttribute('data-root')||'';
+var box=document.getElementById('search'),list=document.getElementById('results');
+if(!index||!box)return;
+var terms=Object.keys(index.terms).sort();
+function postings(term){var ids=[],id=0,d=index.terms[term];for(var i=0;i<d.length;i++){id+=d[i];ids.push(id);}return ids;}
+function lookup(token,prefix){var hits={};terms.forEach(function(t){if(t===token||(prefix&&t.indexOf(token)===0)){postings(t).forEach(function(id){hits[id]=1;});}});return hits;}
+box.addEventListener('input',function(){
+var tokens=box.value.toLowerCase().match(/[a-z0-9_]+/g)||[];list.innerHTML='';if(!tokens.length)return;
+var found=null;tokens.forEach(function(tok,i){var hits=lookup(tok,i===tokens.length-1);
+if(found===null){found=hits;}else{Object.keys(found).forEach(function(id){if(!hits[id])delete found[id];});}});
+Object.keys(found).slice(0,100).forEach(function(id){var doc=index.docs[id],li=document.createElement('li'),a=document.createElement('a');
+a.href=root+doc[1];a.textContent=doc[0];li.appendChild(a);list.appendChild(li);});
+if(!list.children.length){list.innerHTML='<li class="meta">No matches</li>';}
+});
+})();
+"""
+
+def site_slug(text, used):
+    """Make a filesystem and anchor friendly slug that is unique within used"""
+    base = re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-') or 'item'
+    slug = base
+    counter = 2
+    while slug in used:
+        slug = f"{base}-{counter}"
+        counter += 1
+    used.add(slug)
+    return slug
+
+def search_tokens(text):
+    """Return the index terms for a name or code block"""
+    tokens = set()
+    for token in SEARCH_TOKEN_PATTERN.findall(text or ''):
+        token = token.lower()
+        if len(token) > 1:
+            tokens.add(token)
+        if '_' in token:
+            tokens.update(part for part in token.split('_') if len(part) > 1)
+    return tokens
+
+def build_model_pages(model_name, model_data, slug, include_drafts=True):
+    """Build the model page and workflow page as lists of blocks
+
+    Blocks are ('heading', level, text, anchor), ('text', text),
+    ('links', [(text, href)]), ('list', [text]) and ('code', text).
+    """
+    anchors = set()
+    header = model_name
+    if model_data.get('type'):
+        header += f" ({model_data['type']})"
+    model_page = [('heading', 1, header, site_slug('model', anchors))]
+    if model_data.get('is_dynamic'):
+        model_page.append(('text', 'Dynamic Model'))
+    model_page.append(('links', [('Workflow', f'../workflows/{slug}')]))
+    
+    themes = model_data.get('themes', {})
+    model_page.append(('heading', 2, f"{len(themes)} Themes Built", site_slug('themes', anchors)))
+    for theme_name, theme_data in themes.items():
+        model_page.append(('heading', 3, theme_name, site_slug(f'theme-{theme_name}', anchors)))
+        if theme_data.get('views'):
+            model_page.append(('list', list(theme_data['views'])))
+        theme_code = theme_data.get('code') or {}
+        for key, label in THEME_BLOCK_ORDER:
+            code = theme_code.get(key)
+            if code and code != "N/A" and (include_drafts or not key.startswith('draft_')):
+                model_page.append(('heading', 4, f"{theme_name}: {label}", site_slug(f'{theme_name}-{key}', anchors)))
+                model_page.append(('code', code))
+    
+    methods = [method for method in model_data.get('methods') or [] if isinstance(method, dict)]
+    model_page.append(('heading', 2, f"{len(methods)} Methods Found", site_slug('methods', anchors)))
+    for method in methods:
+        title = method.get('name', '')
+        if method.get('type'):
+            title += f" ({method['type']})"
+        model_page.append(('heading', 3, title, site_slug(f"method-{method.get('name', '')}", anchors)))
+        for key, label in (('current_code', 'Current Code'), ('draft_code', 'Draft Code')):
+            if method.get(key) and (include_drafts or key != 'draft_code'):
+                model_page.append(('text', f"{label}:"))
+                model_page.append(('code', method[key]))
+    
+    references = model_data.get('references') or {}
+    calls = [f"{entry['location']} → {entry['kind']} {entry['model']} › {entry['name']}"
+             for entry in references.get('calls', []) if include_drafts or not entry['draft']]
+    called_by = [f"{entry['kind']} {entry['name']} ← {entry['model']} › {entry['location']}"
+                 for entry in references.get('called_by', []) if include_drafts or not entry['draft']]
+    if calls or called_by:
+        model_page.append(('heading', 2, 'References', site_slug('references', anchors)))
+        if calls:
+            model_page.extend([('text', 'Calls:'), ('list', calls)])
+        if called_by:
+            model_page.extend([('text', 'Called by:'), ('list', called_by)])
+    
+    anchors = set()
+    workflow_page = [('heading', 1, f"{model_name} Workflow", site_slug('workflow', anchors)),
+                     ('links', [('Model', f'../models/{slug}')])]
+    workflow = model_data.get('workflow')
+    workflow_themes = workflow.get('themes', {}) if isinstance(workflow, dict) else {}
+    if not workflow_themes:
+        workflow_page.append(('text', 'No workflow states configured'))
+    for theme_name, theme_data in workflow_themes.items():
+        if not isinstance(theme_data, dict):
+            continue
+        workflow_page.append(('heading', 2, f"Theme: {theme_name}", site_slug(f'theme-{theme_name}', anchors)))
+        graph_lines = workflow_graph_lines(workflow_graph(theme_data.get('states')))
+        if graph_lines:
+            workflow_page.append(('text', graph_lines[0][0]))
+        if len(graph_lines) > 1:
+            workflow_page.append(('list', [text.strip() for text, _ in graph_lines[1:]]))
+        for state in theme_data.get('states', []):
+            if not isinstance(state, dict):
+                continue
+            state_label = f"{state.get('display_name', '')} ({state.get('internal_name', '')})"
+            workflow_page.append(('heading', 3, state_label,
+                                  site_slug(f"{theme_name}-{state.get('internal_name', '')}", anchors)))
+            actions = [action for action in state.get('actions', []) if isinstance(action, dict)]
+            if actions:
+                workflow_page.append(('list', [
+                    action.get('name', '') + (f" → {action['to_state']}" if action.get('to_state') else '')
+                    for action in actions]))
+            for key, label in VALIDATION_BLOCK_ORDER:
+                code = (state.get('validation_blocks') or {}).get(key)
+                if code and (include_drafts or not key.startswith('draft_')):
+                    workflow_page.append(('heading', 4, f"{state_label}: {label}",
+                                          site_slug(f"{theme_name}-{state.get('internal_name', '')}-{key}", anchors)))
+                    workflow_page.append(('code', code))
+            for action in actions:
+                for key, label in (('guard_instructions', 'Guard Instructions'), ('draft_guard', 'Draft Guard Instructions')):
+                    if action.get(key) and (include_drafts or key != 'draft_guard'):
+                        workflow_page.append(('heading', 4, f"{label} for {action.get('name', '')} in {state_label}",
+                                              site_slug(f"{theme_name}-{state.get('internal_name', '')}-"
+                                                        f"{action.get('name', '')}-{key}", anchors)))
+                        workflow_page.append(('code', action[key]))
+    return model_page, workflow_page
+
+def render_page_html(title, blocks, root, ext, site_url=None):
+    """Render a list of blocks as a standalone HTML page"""
+    parts = [f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{html_escape(title)}</title>',
+             f'<link rel="stylesheet" href="{root}style.css"></head><body data-root="{root}">',
+             f'<header><a href="{root}index.html">Fluxx Build Documentation</a>',
+             f' <span class="meta">{html_escape(site_url or "")}</span></header><main>',
+             '<input id="search" type="search" placeholder="Search names, fields and code..." autocomplete="off">',
+             '<ul id="results"></ul>']
+    for block in blocks:
+        kind = block[0]
+        if kind == 'heading':
+            _, level, text, anchor = block
+            parts.append(f'<h{level} id="{anchor}">{html_escape(text)}</h{level}>')
+        elif kind == 'text':
+            parts.append(f'<p>{html_escape(block[1])}</p>')
+        elif kind == 'links':
+            parts.append('<p>' + ' | '.join(f'<a href="{href}.{ext}">{html_escape(text)}</a>'
+                                            for text, href in block[1]) + '</p>')
+        elif kind == 'list':
+            parts.append('<ul>' + ''.join(f'<li>{html_escape(item)}</li>' for item in block[1]) + '</ul>')
+        elif kind == 'code':
+            parts.append(f'<pre><code>{html_escape(block[1])}</code></pre>')
+    parts.append(f'</main><script src="{root}search-index.js"></script><script src="{root}search.js"></script>'
+                 '</body></html>')
+    return '\n'.join(parts)
+
+def render_page_markdown(title, blocks, root, ext, site_url=None):
+    """Render a list of blocks as a Markdown page"""
+    parts = [f'[Fluxx Build Documentation]({root}index.{ext})' + (f' · {site_url}' if site_url else ''), '']
+    for block in blocks:
+        kind = block[0]
+        if kind == 'heading':
+            _, level, text, anchor = block
+            parts.extend([f'<a id="{anchor}"></a>', '', f"{'#' * level} {text}", ''])
+        elif kind == 'text':
+            parts.extend([block[1], ''])
+        elif kind == 'links':
+            parts.extend([' | '.join(f'[{text}]({href}.{ext})' for text, href in block[1]), ''])
+        elif kind == 'list':
+            parts.extend([f'- {item}' for item in block[1]] + [''])
+        elif kind == 'code':
+            fence = '````' if '```' in block[1] else '```'
+            parts.extend([f'{fence}ruby', block[1], fence, ''])
+    return '\n'.join(parts)
+
+class SearchIndexBuilder:
+    """Collect an inverted index over page sections"""
+    
+    def __init__(self):
+        self.docs = []
+        self.terms = {}
+    
+    def add_page(self, href, blocks):
+        """Index a page; each anchored heading starts a new document"""
+        page_title = blocks[0][2]
+        doc_id = None
+        for block in blocks:
+            if block[0] == 'heading':
+                _, level, text, anchor = block
+                doc_id = len(self.docs)
+                self.docs.append([text if level == 1 else f"{page_title} › {text}", f'{href}#{anchor}'])
+                tokens = search_tokens(text)
+            elif doc_id is None:
+                continue
+            elif block[0] == 'list':
+                tokens = set().union(*(search_tokens(item) for item in block[1]))
+            elif block[0] in ('text', 'code'):
+                tokens = search_tokens(block[1])
+            else:
                 continue
+            for token in tokens:
+                postings = self.terms.setdefault(token, [])
+                if not postings or postings[-1] != doc_id:
+                    postings.append(doc_id)
+    
+    def to_json(self):
+        """Serialize with delta-encoded postings and no whitespace"""
+        terms = {}
+        for token in sorted(self.terms):
+            postings = self.terms[token]
+            terms[token] = [postings[0]] + [b - a for a, b in zip(postings, postings[1:])]
+        return json.dumps({'version': 1, 'docs': self.docs, 'terms': terms},
+                          ensure_ascii=False, separators=(',', ':'))
+
+def generate_static_site(models_data, site_url=None, fmt='html', variant='internal', output_dir=None):
+    """Write the scan as a static HTML or Markdown site with a search index"""
+    try:
+        if fmt not in SITE_FORMATS:
+            raise ValueError(f"Unknown site format '{fmt}' (expected one of: {', '.join(SITE_FORMATS)})")
+        include_drafts = DOC_VARIANTS[variant]['drafts']
+        timestamp_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        suffix = '' if variant == 'internal' else f'_{variant}'
+        output_dir = output_dir or f'fluxx_site_{timestamp_str}{suffix}'
+        for folder in ('models', 'workflows'):
+            os.makedirs(os.path.join(output_dir, folder), exist_ok=True)
+        render = render_page_html if fmt == 'html' else render_page_markdown
         
-        # Show completion
-        sys.stdout.write('\r' + ' ' * 100)
-        sys.stdout.write('\rMethod scanning complete!')
-        sys.stdout.flush()
-        print("\n" + "=" * 80)
+        def write(path, content):
+            with open(os.path.join(output_dir, path), 'w', encoding='utf-8') as f:
+                f.write(content)
         
-        return models_data
+        search_index = SearchIndexBuilder()
+        slugs = set()
+        index_items = []
+        for model_name, model_data in models_data.items():
+            try:
+                slug = site_slug(model_name, slugs)
+                model_page, workflow_page = build_model_pages(model_name, model_data, slug, include_drafts)
+                for folder, page in (('models', model_page), ('workflows', workflow_page)):
+                    href = f'{folder}/{slug}.{fmt}'
+                    write(href, render(page[0][2], page, '../', fmt, site_url))
+                    search_index.add_page(href, page)
+                label = model_name + (' (Dynamic)' if model_data.get('is_dynamic') else '')
+                index_items.append(('links', [(label, f'models/{slug}'), ('workflow', f'workflows/{slug}')]))
+            except Exception as e:
+                print(f"\nError processing model {model_name}: {str(e)}")
+                continue
         
+        index_page = [('heading', 1, 'Fluxx Build Documentation', 'top'),
+                      ('text', f"{len(index_items)} models" + (f" scanned from {site_url}" if site_url else ''))]
+        write(f'index.{fmt}', render('Fluxx Build Documentation', index_page + index_items, '', fmt, site_url))
+        index_json = search_index.to_json()
+        write('search-index.json', index_json)
+        if fmt == 'html':
+            write('search-index.js', f'window.FLUXX_SEARCH={index_json};\n')
+            write('search.js', SITE_SEARCH_SCRIPT)
+            write('style.css', SITE_STYLE)
+        print(f"\nStatic site saved to: {output_dir}")
+        return output_dir
     except Exception as e:
-        print(f"\nError during method scanning: {str(e)}")
-        return models_data
+        print(f"\nError generating static site: {str(e)}")
+        return None
 
-# HTML Structure Reference for Forms Section:
+def choose_site_format():
+    """Ask whether to also build a static site; returns a SITE_FORMATS entry or None"""
+    print("\nWould you like a searchable static site as well?")
+    print("1. No")
+    print("2. HTML site")
+    print("3. Markdown pages")
+    return {'2': 'html', '3': 'md'}.get(input("\nEnter your choice (1-3): ").strip())
+
+# Code Index Reference:
 #
-# Models:
-# - Located in: #iconList > ul
-# - Model name from: ul[id] attribute (replace _ with space, title case)
-# Example: <ul id="custom_ui_enhancements" class="toggle-class open" data-click-when-opened=".scroll-to-card">
+# Every scan adds its code blocks to fluxx_code_index.sqlite, which holds all
+# tenants and scans:
+#   scans(id, tenant, scan, created, models)
+#   blocks(id, scan_id, model, location, kind, code)
+#   code_fts(tokens, writes, calls)    FTS5, rowid = blocks.id
+# tokens are the identifiers in the block (snake_case parts included), writes
+# are identifiers assigned or updated, calls are method names invoked. Queries
+# look at the latest scan of each tenant unless all scans are asked for.
+
+CODE_INDEX_FILE = 'fluxx_code_index.sqlite'
+
+CODE_ASSIGNMENT_PATTERN = re.compile(r'\b([A-Za-z_]\w*)\s*(?:\|\||&&|[-+*/])?=(?![=~>])')
+CODE_INDEX_WRITE_PATTERN = re.compile(r'\[\s*[:\'"]([A-Za-z_]\w*)[\'"]?\s*\]\s*(?:\|\||[-+*/])?=(?![=~>])')
+CODE_ATTRIBUTE_WRITE_PATTERN = re.compile(
+    r'\b(?:write_attribute|update_attribute|update_column)\s*\(?\s*[:\'"]([A-Za-z_]\w*)')
+CODE_HASH_WRITE_CALLS = re.compile(r'\b(?:update|update_attributes|update_columns|assign_attributes)\b')
+CODE_HASH_KEY_PATTERN = re.compile(r':([A-Za-z_]\w*)\s*=>|\b([A-Za-z_]\w*):(?!:)\s')
+CODE_CALL_PATTERN = re.compile(r'\.([A-Za-z_]\w*[?!]?)|\b([A-Za-z_]\w*[?!]?)\(')
+
+def iter_code_blocks(models_data):
+    """Yield (model, location, kind, code, is_draft) for every scraped code block"""
+    for model_name, model_data in models_data.items():
+        for theme_name, theme_data in model_data.get('themes', {}).items():
+            theme_code = theme_data.get('code') or {}
+            for key, label in THEME_BLOCK_ORDER:
+                code = theme_code.get(key)
+                if code and code != "N/A":
+                    yield model_name, f"Theme {theme_name} / {label}", 'theme_code', code, key.startswith('draft_')
+        for method in model_data.get('methods') or []:
+            if not isinstance(method, dict):
+                continue
+            for key, label in (('current_code', 'Current Code'), ('draft_code', 'Draft Code')):
+                if method.get(key):
+                    yield (model_name, f"Method {method.get('name', '')} / {label}", 'method', method[key],
+                           key == 'draft_code')
+        workflow = model_data.get('workflow')
+        for theme_name, theme_data in (workflow.get('themes', {}) if isinstance(workflow, dict) else {}).items():
+            if not isinstance(theme_data, dict):
+                continue
+            for state in theme_data.get('states', []):
+                if not isinstance(state, dict):
+                    continue
+                state_label = f"{state.get('display_name', '')} ({state.get('internal_name', '')})"
+                for key, label in VALIDATION_BLOCK_ORDER:
+                    code = (state.get('validation_blocks') or {}).get(key)
+                    if code:
+                        yield (model_name, f"Workflow {theme_name} / {state_label} / {label}", 'validation', code,
+                               key.startswith('draft_'))
+                for action in state.get('actions', []):
+                    if not isinstance(action, dict):
+                        continue
+                    for key, label in (('guard_instructions', 'Guard'), ('draft_guard', 'Draft Guard')):
+                        if action.get(key):
+                            yield (model_name, f"Workflow {theme_name} / {state_label} / "
+                                   f"{action.get('name', '')} {label}", 'guard', action[key], key == 'draft_guard')
+
+def code_writes(line):
+    """Return the identifiers a line of Ruby/Liquid assigns or updates"""
+    names = set(CODE_ASSIGNMENT_PATTERN.findall(line))
+    names.update(CODE_INDEX_WRITE_PATTERN.findall(line))
+    names.update(CODE_ATTRIBUTE_WRITE_PATTERN.findall(line))
+    if CODE_HASH_WRITE_CALLS.search(line):
+        names.update(a or b for a, b in CODE_HASH_KEY_PATTERN.findall(line))
+    return {name.lower() for name in names}
+
+def code_calls(line):
+    """Return the method names a line of Ruby/Liquid calls"""
+    return {(a or b).lower() for a, b in CODE_CALL_PATTERN.findall(line)}
+
+def open_code_index(path=CODE_INDEX_FILE):
+    """Open (creating if needed) the SQLite code index"""
+    # Batch workers index their scans at the same time, so wait for the write lock
+    connection = sqlite3.connect(path, timeout=60)
+    try:
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS scans(id INTEGER PRIMARY KEY, tenant TEXT, scan TEXT UNIQUE,
+                                             created TEXT, models INTEGER);
+            CREATE TABLE IF NOT EXISTS blocks(id INTEGER PRIMARY KEY, scan_id INTEGER, model TEXT,
+                                              location TEXT, kind TEXT, code TEXT);
+            CREATE INDEX IF NOT EXISTS blocks_scan ON blocks(scan_id);
+            CREATE VIRTUAL TABLE IF NOT EXISTS code_fts USING fts5(
+                tokens, writes, calls, tokenize="unicode61 tokenchars '_'");
+        """)
+    except sqlite3.OperationalError as e:
+        connection.close()
+        raise RuntimeError(f"This Python's SQLite build cannot create the code index: {str(e)}")
+    return connection
+
+def index_scan(models_data, site_url, scan, created=None, path=CODE_INDEX_FILE):
+    """Add (or replace) one scan's code blocks in the code index; returns the block count"""
+    tenant = urlparse(site_url).netloc or site_url if site_url else 'unknown'
+    created = created or datetime.datetime.now().isoformat(timespec='seconds')
+    connection = open_code_index(path)
+    try:
+        with connection:
+            row = connection.execute("SELECT id FROM scans WHERE scan = ?", (scan,)).fetchone()
+            if row:
+                connection.execute("DELETE FROM code_fts WHERE rowid IN (SELECT id FROM blocks WHERE scan_id = ?)", row)
+                connection.execute("DELETE FROM blocks WHERE scan_id = ?", row)
+                connection.execute("UPDATE scans SET tenant = ?, created = ?, models = ? WHERE id = ?",
+                                   (tenant, created, len(models_data), row[0]))
+                scan_id = row[0]
+            else:
+                scan_id = connection.execute("INSERT INTO scans(tenant, scan, created, models) VALUES (?, ?, ?, ?)",
+                                             (tenant, scan, created, len(models_data))).lastrowid
+            count = 0
+            for model_name, location, kind, code, _ in iter_code_blocks(models_data):
+                block_id = connection.execute(
+                    "INSERT INTO blocks(scan_id, model, location, kind, code) VALUES (?, ?, ?, ?, ?)",
+                    (scan_id, model_name, location, kind, code)).lastrowid
+                writes = set()
+                calls = set()
+                for line in code.splitlines():
+                    writes |= code_writes(line)
+                    calls |= code_calls(line)
+                connection.execute("INSERT INTO code_fts(rowid, tokens, writes, calls) VALUES (?, ?, ?, ?)",
+                                   (block_id, ' '.join(sorted(search_tokens(code))),
+                                    ' '.join(sorted(writes)), ' '.join(sorted(calls))))
+                count += 1
+        return count
+    finally:
+        connection.close()
+
+def query_code_index(terms, mode='tokens', tenant=None, all_scans=False, limit=50, path=CODE_INDEX_FILE):
+    """Search the code index
+
+    mode is 'tokens' (every term appears; the last one may be a prefix),
+    'writes' (where an identifier is assigned) or 'calls' (where a method is
+    called). Returns dicts with tenant, scan, model, location, kind and the
+    matching (line number, line) pairs.
+    """
+    words = [word.lower() for word in re.findall(r'[A-Za-z0-9_?!]+', ' '.join(terms))]
+    if not words:
+        return []
+    if mode == 'tokens':
+        match = ' AND '.join(f'"{word}"' for word in words[:-1]) + (' AND ' if len(words) > 1 else '') + f'"{words[-1]}"*'
+        match = f'tokens: ({match})'
+    else:
+        match = f'{mode}: (' + ' OR '.join(f'"{word.rstrip("?!")}"' for word in words) + ')'
+    sql = ("SELECT scans.tenant, scans.scan, blocks.model, blocks.location, blocks.kind, blocks.code "
+           "FROM code_fts JOIN blocks ON blocks.id = code_fts.rowid JOIN scans ON scans.id = blocks.scan_id "
+           "WHERE code_fts MATCH ?")
+    params = [match]
+    if tenant:
+        sql += " AND scans.tenant = ?"
+        params.append(tenant)
+    if not all_scans:
+        # Latest by scan time, not by when it was indexed: --index-scan may add an older export later
+        sql += (" AND scans.id = (SELECT latest.id FROM scans AS latest WHERE latest.tenant = scans.tenant "
+                "ORDER BY latest.created DESC, latest.id DESC LIMIT 1)")
+    sql += " ORDER BY scans.tenant, blocks.id LIMIT ?"
+    params.append(limit)
+    connection = open_code_index(path)
+    try:
+        rows = connection.execute(sql, params).fetchall()
+    finally:
+        connection.close()
+    results = []
+    for tenant_name, scan, model_name, location, kind, code in rows:
+        lines = []
+        for line_number, line in enumerate(code.splitlines(), start=1):
+            if mode == 'writes':
+                hit = any(word in code_writes(line) for word in words)
+            elif mode == 'calls':
+                hit = any(word.rstrip('?!') in {call.rstrip('?!') for call in code_calls(line)} for word in words)
+            else:
+                hit = any(token.startswith(words[-1]) for token in search_tokens(line)) or \
+                      any(word in search_tokens(line) for word in words[:-1])
+            if hit:
+                lines.append((line_number, line.strip()))
+        results.append({'tenant': tenant_name, 'scan': scan, 'model': model_name, 'location': location,
+                        'kind': kind, 'lines': lines})
+    return results
+
+def update_code_index(models_data, site_url, scan, path=CODE_INDEX_FILE):
+    """Index a finished scan, reporting rather than raising on failure"""
+    try:
+        count = index_scan(models_data, site_url, os.path.basename(scan), path=path)
+        print(f"\nCode index updated with {count} code blocks ({path})")
+    except Exception as e:
+        print(f"\nWarning: Could not update the code index: {str(e)}")
+
+def run_code_query(args):
+    """Handle the code index command line options"""
+    for filename in args.index_scan or []:
+        models_data, header = load_scan_export(filename)
+        count = index_scan(models_data, header.get('site_url'), os.path.basename(filename),
+                           header.get('created'), args.index)
+        print(f"Indexed {count} code blocks from {filename}")
+    for mode, terms in (('tokens', args.query), ('writes', args.written), ('calls', args.called)):
+        if not terms:
+            continue
+        started = time.perf_counter()
+        results = query_code_index(terms, mode, args.tenant, args.all_scans, args.limit, args.index)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for result in results:
+            print(f"\n{result['tenant']} | {result['model']} | {result['location']}")
+            for line_number, line in result['lines']:
+                print(f"    {line_number:>4}: {line}")
+        print(f"\n{len(results)} blocks found in {elapsed_ms:.1f} ms")
+
+# Cross-reference Reference:
 #
-# Themes:
-# - Located in: ul > li.icon[data-card-uid]
-# - Theme name from: li.icon > a.link.scroll-to-card > span.label[role='menuitem']
-# Example:
-# <li class="icon" data-card-uid="19980">
-#   <a class="link scroll-to-card" href="#fluxx-card-26">
-#     <span class="label" role="menuitem">Animation Examples</span>
+# link_references() matches every code block against the known method names,
+# workflow state internal names and model type names in one pass: every name is
+# an identifier, so each block is tokenized once and each token is looked up.
+# The edges are stored on each model:
+#   references: {'calls':     [{location, kind, model, name, count, draft}],
+#                'called_by': [{kind, name, model, location, count, draft}]}
+# calls are edges out of this model's code blocks (model/name are the target),
+# called_by are edges into this model's methods, states and type (model/location
+# are the source). kind is 'method', 'state' or 'model'. Methods match as whole
+# identifiers, preferring the calling model's own method of that name; states
+# only match as symbols or strings (:approved, 'approved') within the same
+# model; models match by type (GrantRequest) or its snake_case form.
+
+REFERENCE_TOKEN_PATTERN = re.compile(r'([:\'"]?)(?<![\w?!])([a-z_]\w*[?!]?)')
+
+def snake_case(name):
+    """GrantRequest -> grant_request"""
+    return re.sub(r'(?<=[a-z0-9])([A-Z])', r'_\1', name).lower()
+
+def build_reference_graph(models_data):
+    """Return the reference edges found in all code blocks as a list of dicts"""
+    # token -> {'methods': [...], 'own_methods': {model: [...]}, 'states': {model: [...]}, 'models': [...]}
+    # Names like after_create or approved repeat in every model, so per-model
+    # lookups keep a large tenant from scanning every model on every token
+    targets = {}
+    
+    def target_entry(token):
+        return targets.setdefault(token, {'methods': [], 'own_methods': {}, 'states': {}, 'models': []})
+    
+    for model_name, model_data in models_data.items():
+        for method in model_data.get('methods') or []:
+            if isinstance(method, dict) and method.get('name'):
+                entry = target_entry(method['name'].lower())
+                target = ('method', model_name, method['name'])
+                entry['methods'].append(target)
+                entry['own_methods'].setdefault(model_name, []).append(target)
+        workflow = model_data.get('workflow')
+        for theme_data in (workflow.get('themes', {}) if isinstance(workflow, dict) else {}).values():
+            for state in (theme_data.get('states', []) if isinstance(theme_data, dict) else []):
+                if isinstance(state, dict) and state.get('internal_name'):
+                    target = ('state', model_name, state['internal_name'])
+                    model_states = target_entry(state['internal_name'].lower())['states'].setdefault(model_name, [])
+                    if target not in model_states:
+                        model_states.append(target)
+        model_type = model_data.get('type')
+        if model_type:
+            for pattern in {model_type.lower(), snake_case(model_type)}:
+                target_entry(pattern)['models'].append(('model', model_name, model_type))
+    if not targets:
+        return []
+    
+    edges = {}
+    for model_name, location, _, code, is_draft in iter_code_blocks(models_data):
+        for prefix, token in REFERENCE_TOKEN_PATTERN.findall(code.lower()):
+            entry = targets.get(token)
+            if entry is None:
+                continue
+            matched = entry['own_methods'].get(model_name) or entry['methods']
+            if prefix:
+                matched = matched + entry['states'].get(model_name, [])
+            matched = matched + [target for target in entry['models'] if target[1] != model_name]
+            for kind, target_model, name in matched:
+                # A method's own definition is not a reference to it
+                if kind == 'method' and target_model == model_name and location.startswith(f"Method {name} /"):
+                    continue
+                key = (model_name, location, is_draft, kind, target_model, name)
+                edges[key] = edges.get(key, 0) + 1
+    return [{'from_model': source_model, 'location': location, 'draft': is_draft,
+             'kind': kind, 'to_model': target_model, 'name': name, 'count': count}
+            for (source_model, location, is_draft, kind, target_model, name), count in edges.items()]
+
+def link_references(models_data):
+    """Store calls/called-by edges on each model; returns the number of edges"""
+    graph = build_reference_graph(models_data)
+    for model_data in models_data.values():
+        model_data['references'] = {'calls': [], 'called_by': []}
+    for edge in graph:
+        models_data[edge['from_model']]['references']['calls'].append({
+            'location': edge['location'], 'kind': edge['kind'], 'model': edge['to_model'],
+            'name': edge['name'], 'count': edge['count'], 'draft': edge['draft']})
+        models_data[edge['to_model']]['references']['called_by'].append({
+            'kind': edge['kind'], 'name': edge['name'], 'model': edge['from_model'],
+            'location': edge['location'], 'count': edge['count'], 'draft': edge['draft']})
+    return len(graph)
+
+def referenced_by(model_data, kind, name, include_drafts=True, limit=8):
+    """Summarize where a method, state or model is referenced, or return None"""
+    sources = [f"{entry['model']} › {entry['location']}"
+               for entry in (model_data.get('references') or {}).get('called_by', [])
+               if entry['kind'] == kind and entry['name'] == name and (include_drafts or not entry['draft'])]
+    if not sources:
+        return None
+    if len(sources) > limit:
+        sources = sources[:limit] + [f"and {len(sources) - limit} more"]
+    return '; '.join(sources)
+
+# Workflow Graph Reference:
 #
-# Views:
-# - Container: li.icon > div.listing[data-type='listing'][data-src='/stencils']
-# - View items: div.listing > ul.list > li.entry:not(.non-entry)
-# - View name from: li.entry > a.to-detail > div.label
-# Example:
-# <div class="listing" data-type="listing" data-src="/stencils" ...>
-#   <ul class="list">
-#     <li class="active entry selected" data-model-id="35727">
-#       <a class="to-detail" href="/stencils/35727">
-#         <div class="label">Gallery</div>
+# workflow_graph() turns one theme's workflow (one workflow_id) into an
+# adjacency-indexed state machine. States are numbered in scan order and every
+# other list refers to those indexes:
+#   graph: {states:      [internal_name, ...],
+#           edges:       [[target index, ...] per state],       sorted, no duplicates
+#           start:       index of the 'new' state, else 0,
+#           reach:       [[index, ...] per state],              states reachable from it
+#           unreachable: [index, ...],                          not reachable from start
+#           dead_ends:   [index, ...],                          states with no way out
+#           cycles:      [[index, ...], ...],                   strongly connected components
+#                                                               with more than one state or a self loop
+#           unresolved:  [{state, action, to_state}]}           targets that match no state
+# An action's to_state is the selected option text, matched against display
+# names first and internal names second, ignoring case. The graph is derived
+# from the states, so it is rebuilt wherever it is needed and only written to
+# the scan export for other tools.
 
-def wait_for_forms_and_parse(driver, max_retries=3):
-    """Wait for Forms section to load and parse content with retry logic"""
-    try:
-        # Clear screen and show header
-        os.system('cls' if os.name == 'nt' else 'clear')
-        print("\n" + "=" * 80)
-        print("\n                     Scanning Models and Themes")
-        print("\n" + "=" * 80)
-        
-        wait = WebDriverWait(driver, 10)
-        
-        # First verify Forms section exists
-        wait.until(EC.presence_of_element_located(
-            (By.CSS_SELECTOR, "#iconList")
-        ))
-        
-        # Wait for at least one model to be loaded
-        try:
-            wait.until(lambda d: len(d.find_elements(By.CSS_SELECTOR, "#iconList > ul[id]")) > 0)
-        except TimeoutException:
-            wait = WebDriverWait(driver, 30)
-            wait.until(lambda d: len(d.find_elements(By.CSS_SELECTOR, "#iconList > ul[id]")) > 0)
-            time.sleep(2)
-        
-        while True:
-            model_list = driver.find_elements(By.CSS_SELECTOR, "#iconList > ul[id]")
-            model_list = [model for model in model_list if model.get_attribute("id")]
-            model_count = len(model_list)
-            
-            # Get the height of the iconList container
-            icon_list = driver.find_element(By.CSS_SELECTOR, "#iconList")
-            list_height = driver.execute_script("return arguments[0].scrollHeight", icon_list)
-            
-            # Scroll through the list to ensure all models are loaded
-            current_scroll = 0
-            scroll_step = 500
-            
-            while current_scroll < list_height:
-                driver.execute_script(f"arguments[0].scrollTop = {current_scroll}", icon_list)
-                time.sleep(0.5)
-                current_scroll += scroll_step
-            
-            driver.execute_script("arguments[0].scrollTop = 0", icon_list)
-            
-            model_list = driver.find_elements(By.CSS_SELECTOR, "#iconList > ul[id]")
-            model_list = [model for model in model_list if model.get_attribute("id")]
-            new_count = len(model_list)
-            
-            if new_count > model_count:
-                model_count = new_count
+def workflow_graph(states):
+    """Build the adjacency-indexed graph and reachability analysis for one workflow"""
+    states = [state for state in states or [] if isinstance(state, dict)]
+    names = [state.get('internal_name') or state.get('display_name') or '' for state in states]
+    lookup = {}
+    for key in ('internal_name', 'display_name'):
+        for index, state in enumerate(states):
+            if state.get(key):
+                lookup[str(state[key]).strip().lower()] = index
+    edges = []
+    unresolved = []
+    for index, state in enumerate(states):
+        targets = set()
+        for action in state.get('actions', []):
+            if not isinstance(action, dict) or not action.get('to_state'):
                 continue
-            
-            print(f"\nFound {model_count} models.")
-            verify = input("Does this count appear correct? (y/n): ").strip().lower()
-            
-            if verify == 'y':
+            target = lookup.get(str(action['to_state']).strip().lower())
+            if target is None:
+                unresolved.append({'state': names[index], 'action': action.get('name'),
+                                   'to_state': action['to_state']})
+            else:
+                targets.add(target)
+        edges.append(sorted(targets))
+    
+    # Tarjan's algorithm, iterative so large workflows cannot hit the recursion limit.
+    # Components come out in reverse topological order, so each one's reach can be
+    # built from components that are already finished.
+    order = [None] * len(states)
+    low = [0] * len(states)
+    component_of = [None] * len(states)
+    components = []
+    reach_masks = []
+    stack = []
+    counter = 0
+    for root in range(len(states)):
+        if order[root] is not None:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, edge_index = work.pop()
+            if edge_index == 0:
+                order[node] = low[node] = counter
+                counter += 1
+                stack.append(node)
+            if edge_index < len(edges[node]):
+                work.append((node, edge_index + 1))
+                target = edges[node][edge_index]
+                if order[target] is None:
+                    work.append((target, 0))
+                elif component_of[target] is None:
+                    low[node] = min(low[node], order[target])
+                continue
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == order[node]:
+                members = []
+                while True:
+                    member = stack.pop()
+                    component_of[member] = len(components)
+                    members.append(member)
+                    if member == node:
+                        break
+                mask = 0
+                for member in members:
+                    mask |= 1 << member
+                for member in members:
+                    for target in edges[member]:
+                        if component_of[target] != len(components):
+                            mask |= reach_masks[component_of[target]]
+                components.append(sorted(members))
+                reach_masks.append(mask)
+    
+    # Members of a component share one reach list
+    component_reach = []
+    for mask in reach_masks:
+        targets = []
+        while mask:
+            lowest = mask & -mask
+            targets.append(lowest.bit_length() - 1)
+            mask ^= lowest
+        component_reach.append(targets)
+    reach = [component_reach[component_of[index]] for index in range(len(states))]
+    start = next((index for index, name in enumerate(names) if name.lower() == 'new'), 0)
+    reachable = set(reach[start]) if states else set()
+    return {
+        'states': names,
+        'edges': edges,
+        'start': start,
+        'reach': reach,
+        'unreachable': [index for index in range(len(states)) if index not in reachable],
+        'dead_ends': [index for index in range(len(states)) if not edges[index]],
+        'cycles': [members for members in reversed(components)
+                   if len(members) > 1 or members[0] in edges[members[0]]],
+        'unresolved': unresolved,
+    }
+
+def workflow_graph_lines(graph, limit=12):
+    """Summarize a workflow graph as (text, format) lines for the document and site"""
+    if not graph['states']:
+        return []
+    def state_list(indexes):
+        labels = [graph['states'][index] for index in indexes]
+        if len(labels) > limit:
+            labels = labels[:limit] + [f"and {len(labels) - limit} more"]
+        return ', '.join(labels)
+    edge_count = sum(len(targets) for targets in graph['edges'])
+    lines = [(f"State graph: {len(graph['states'])} states, {edge_count} transitions, "
+              f"start {graph['states'][graph['start']]}", 'italic')]
+    if graph['unreachable']:
+        lines.append((f"    Unreachable from {graph['states'][graph['start']]}: "
+                      f"{state_list(graph['unreachable'])}", 'action'))
+    if graph['dead_ends']:
+        lines.append((f"    No outgoing actions: {state_list(graph['dead_ends'])}", 'action'))
+    for members in graph['cycles'][:limit]:
+        lines.append((f"    Cycle: {state_list(members)}", 'action'))
+    for entry in graph['unresolved'][:limit]:
+        lines.append((f"    Unknown target: {entry['state']} / {entry['action']} -> {entry['to_state']}", 'action'))
+    return lines
+
+# Scan Diff Reference:
+#
+# diff_scans() compares two scans entity by entity. Each model's export record
+# (see the Scan Export Reference) is turned into a Merkle tree:
+#   model (type, is_dynamic)
+#     theme (workflow_id and code blocks)
+#       view
+#       state (display_name and validation blocks)
+#         action (to_state and guards)
+#     method (type, current_code, draft_code)
+# Children are keyed kind:name. Every node's hash covers its own fields and its children's hashes, so equal
+# hashes prove a whole subtree is unchanged and the walk only descends into
+# subtrees that differ. Whole models are compared by their record hash first
+# and only changed models are built into trees. A phase that was not scanned
+# on either side (methods, workflow or a theme's code) is left out of both
+# trees rather than reported as added or removed.
+#
+# Change: {change: added|removed|changed, kind, path: [model, ...], fields: [...]}
+# fields lists the node's own fields that differ and is only set for 'changed'.
+# A node whose children changed but whose own fields did not is not reported.
+#
+# Report file fluxx_diff_<timestamp>.json:
+#   {schema: 'fluxx-scan-diff', old: {file, site_url, created},
+#    new: {file, site_url, created}, summary: {added, removed, changed}, changes: [...]}
+
+SCAN_DIFF_SCHEMA = 'fluxx-scan-diff'
+
+def content_hash(value):
+    """Stable SHA-1 of a JSON-serializable value"""
+    return hashlib.sha1(json.dumps(value, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def merkle_node(kind, fields, children=None):
+    """Build a tree node whose hash covers its fields and its children's hashes"""
+    children = children or {}
+    digest = hashlib.sha1(json.dumps([kind, fields], sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    for key in sorted(children):
+        digest.update(f"\0{key}\0{children[key]['hash']}".encode('utf-8'))
+    return {'kind': kind, 'fields': fields, 'children': children, 'hash': digest.hexdigest()}
+
+def unique_key(children, kind, name):
+    """Key a child as kind:name, numbering repeated names so none are lost"""
+    key, count = f"{kind}:{name or ''}", 1
+    while key in children:
+        count += 1
+        key = f"{kind}:{name or ''} #{count}"
+    return key
+
+def scan_tree(record):
+    """Build the Merkle tree for one model's export record"""
+    themes = {}
+    for theme_name, theme_data in (record.get('themes') or {}).items():
+        views = {}
+        for view in theme_data.get('views') or []:
+            views[unique_key(views, 'view', view)] = merkle_node('view', {})
+        themes[theme_name] = {'fields': {} if theme_data.get('code') is None else dict(theme_data['code']),
+                              'children': views}
+    workflow = record.get('workflow')
+    for theme_name, theme_data in ((workflow or {}).get('themes') or {}).items():
+        theme = themes.setdefault(theme_name, {'fields': {}, 'children': {}})
+        theme['fields']['workflow_id'] = theme_data.get('workflow_id')
+        for state in theme_data.get('states') or []:
+            actions = {}
+            for action in state.get('actions') or []:
+                actions[unique_key(actions, 'action', action.get('name'))] = merkle_node(
+                    'action', {key: value for key, value in action.items() if key != 'name'})
+            fields = {'display_name': state.get('display_name')}
+            fields.update(state.get('validation_blocks') or {})
+            theme['children'][unique_key(theme['children'], 'state', state.get('internal_name'))] = merkle_node(
+                'state', fields, actions)
+    children = {f"theme:{theme_name}": merkle_node('theme', theme['fields'], theme['children'])
+                for theme_name, theme in themes.items()}
+    for method in record.get('methods') or []:
+        children[unique_key(children, 'method', method.get('name'))] = merkle_node(
+            'method', {key: value for key, value in method.items() if key != 'name'})
+    return merkle_node('model', {'type': record.get('type'), 'is_dynamic': record.get('is_dynamic')}, children)
+
+def diff_trees(old, new, path, changes):
+    """Append the changes between two nodes' subtrees, skipping identical hashes"""
+    if old['hash'] == new['hash']:
+        return
+    fields = sorted(key for key in set(old['fields']) | set(new['fields'])
+                    if old['fields'].get(key) != new['fields'].get(key))
+    if fields:
+        changes.append({'change': 'changed', 'kind': new['kind'], 'path': path, 'fields': fields})
+    for key, child in old['children'].items():
+        name = key.split(':', 1)[1]
+        if key not in new['children']:
+            changes.append({'change': 'removed', 'kind': child['kind'], 'path': path + [name]})
+        else:
+            diff_trees(child, new['children'][key], path + [name], changes)
+    for key, child in new['children'].items():
+        if key not in old['children']:
+            name = key.split(':', 1)[1]
+            changes.append({'change': 'added', 'kind': child['kind'], 'path': path + [name]})
+
+def align_scanned_phases(old_record, new_record):
+    """Drop phases that only one of two records scanned from both of them"""
+    old_record, new_record = dict(old_record), dict(new_record)
+    for key in ('methods', 'workflow'):
+        if old_record.get(key) is None or new_record.get(key) is None:
+            old_record[key] = new_record[key] = None
+    old_themes, new_themes = dict(old_record.get('themes') or {}), dict(new_record.get('themes') or {})
+    for theme_name in set(old_themes) & set(new_themes):
+        if old_themes[theme_name].get('code') is None or new_themes[theme_name].get('code') is None:
+            old_themes[theme_name] = dict(old_themes[theme_name], code=None)
+            new_themes[theme_name] = dict(new_themes[theme_name], code=None)
+    old_record['themes'], new_record['themes'] = old_themes, new_themes
+    return old_record, new_record
+
+def diff_record(record):
+    """Export record without the derived workflow graphs"""
+    workflow = record.get('workflow')
+    if isinstance(workflow, dict):
+        record = dict(record, workflow={'themes': {
+            theme_name: {key: value for key, value in theme_data.items() if key != 'graph'}
+            for theme_name, theme_data in workflow.get('themes', {}).items()}})
+    return record
+
+def diff_scans(old_models, new_models):
+    """Return the list of changes from one scan's models_data to another's"""
+    changes = []
+    for model_name in old_models:
+        if model_name not in new_models:
+            changes.append({'change': 'removed', 'kind': 'model', 'path': [model_name]})
+    for model_name, model_data in new_models.items():
+        if model_name not in old_models:
+            changes.append({'change': 'added', 'kind': 'model', 'path': [model_name]})
+            continue
+        old_record, new_record = align_scanned_phases(diff_record(export_model_record(old_models[model_name])),
+                                                      diff_record(export_model_record(model_data)))
+        if content_hash(old_record) != content_hash(new_record):
+            diff_trees(scan_tree(old_record), scan_tree(new_record), [model_name], changes)
+    return changes
+
+def scan_diff_report(old_models, old_header, new_models, new_header):
+    """Build the JSON change report for two scans"""
+    changes = diff_scans(old_models, new_models)
+    return {
+        'schema': SCAN_DIFF_SCHEMA,
+        'old': {key: old_header.get(key) for key in ('file', 'site_url', 'created')},
+        'new': {key: new_header.get(key) for key in ('file', 'site_url', 'created')},
+        'summary': {change: sum(1 for entry in changes if entry['change'] == change)
+                    for change in ('added', 'removed', 'changed')},
+        'changes': changes,
+    }
+
+def write_diff_report(report, filename=None):
+    """Save a change report as JSON and return its filename"""
+    timestamp_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = filename or f'fluxx_diff_{timestamp_str}.json'
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return filename
+
+def find_previous_scan(site_url, exclude=None, before=None):
+    """Return the newest saved scan export of site_url, or None
+
+    exclude is a filename to skip (the scan being written); before limits the
+    search to scans created earlier than that ISO timestamp.
+    """
+    latest = None
+    for filename in os.listdir('.'):
+        if not (filename.startswith('fluxx_scan_') and filename.endswith('.jsonl')):
+            continue
+        if exclude and os.path.abspath(filename) == os.path.abspath(exclude):
+            continue
+        try:
+            with open(filename, encoding='utf-8') as f:
+                header = json.loads(f.readline())
+        except (OSError, ValueError):
+            continue
+        if header.get('schema') != SCAN_SCHEMA or header.get('site_url') != site_url or not header.get('created'):
+            continue
+        if before and header['created'] >= before:
+            continue
+        if latest is None or header['created'] > latest[1]:
+            latest = (filename, header['created'])
+    return latest[0] if latest else None
+
+def compare_with_previous_scan(models_data, site_url, filename, created=None):
+    """Diff a scan against the previous export of the same site and save the report
+
+    Returns the report, or None when there is no earlier scan.
+    """
+    previous = find_previous_scan(site_url, exclude=filename, before=created)
+    if not previous:
+        return None
+    old_models, old_header = load_scan_export(previous)
+    report = scan_diff_report(old_models, dict(old_header, file=previous), models_data,
+                              {'file': filename, 'site_url': site_url,
+                               'created': created or datetime.datetime.now().isoformat(timespec='seconds')})
+    summary = report['summary']
+    print(f"\nChanges since {old_header['created']}: {summary['added']} added, "
+          f"{summary['removed']} removed, {summary['changed']} changed")
+    print(f"Change report saved to: {write_diff_report(report)}")
+    return report
+
+def change_description(entry, include_drafts=True):
+    """Describe one change for the document, or return None if it only touches drafts"""
+    fields = entry.get('fields') or []
+    if not include_drafts:
+        fields = [field for field in fields if not field.startswith('draft_')]
+        if entry['change'] == 'changed' and not fields:
+            return None
+    text = f"{entry['change'].capitalize()} {entry['kind']}"
+    if len(entry['path']) > 1:
+        text += f" {' › '.join(entry['path'][1:])}"
+    if fields:
+        text += f" ({', '.join(fields)})"
+    return text
+
+def add_changes_section(doc, report, include_drafts=True):
+    """Add a "Changes since <date>" section listing the report's changes per model"""
+    doc.add_heading(f"Changes since {report['old']['created'].replace('T', ' ')}", 1)
+    summary = {'added': 0, 'removed': 0, 'changed': 0}
+    by_model = {}
+    for entry in report['changes']:
+        description = change_description(entry, include_drafts)
+        if description:
+            summary[entry['change']] += 1
+            by_model.setdefault(entry['path'][0], []).append(description)
+    doc.add_paragraph(f"{summary['added']} added, {summary['removed']} removed, {summary['changed']} changed "
+                      f"compared with {os.path.basename(report['old']['file'] or '')}")
+    if not by_model:
+        doc.add_paragraph("No changes")
+    for model_name, descriptions in by_model.items():
+        doc.add_heading(model_name, 2)
+        for description in descriptions:
+            item = doc.add_paragraph(description, style='List Bullet')
+            item.paragraph_format.space_before = Pt(0)
+            item.paragraph_format.space_after = Pt(0)
+    doc.add_page_break()
+
+def run_scan_diff(filenames):
+    """Compare two saved scans, or one scan with the previous scan of its site"""
+    new_file = filenames[-1]
+    new_models, new_header = load_scan_export(new_file)
+    if len(filenames) > 1:
+        old_file = filenames[0]
+    else:
+        old_file = find_previous_scan(new_header.get('site_url'), exclude=new_file, before=new_header.get('created'))
+        if not old_file:
+            print(f"No earlier scan of {new_header.get('site_url') or 'this site'} found in this folder")
+            return None
+    old_models, old_header = load_scan_export(old_file)
+    report = scan_diff_report(old_models, dict(old_header, file=old_file),
+                              new_models, dict(new_header, file=new_file))
+    for entry in report['changes']:
+        print(f"{entry['path'][0]}: {change_description(entry)}")
+    summary = report['summary']
+    print(f"\n{summary['added']} added, {summary['removed']} removed, {summary['changed']} changed "
+          f"since {old_header.get('created')}")
+    print(f"Change report saved to: {write_diff_report(report)}")
+    return report
+
+# Mock Fluxx Server Reference:
+#
+# MockFluxxServer serves a stand-in for the Fluxx admin panel from any
+# models_data (a saved scan export, a generated tenant or the built-in
+# sample), so every scan phase can run offline in headless Chrome:
+#   /                              dashboard with a.to-admin-panel
+#   /?db=config                    admin panel with the dashboard picker
+#   /client_stores/1               Forms: #iconList > ul[id] with li.icon[data-card-uid],
+#                                  /stencils view listings and theme config links
+#   /client_stores/2               Workflow: div.link.is-admin[data-id] model list
+#   /client_stores/3               Card Settings: the same model list with a Methods tab
+#   /model_themes/<uid>/edit       theme config modal (before new / after create blocks)
+#   /model_panels/<dashboard>/<id> theme links (workflow) or dock tabs (methods) for a model
+#   /machine_states?model_theme_id=<uid>   state listing with ul.events actions
+#   /machine_states/<id>           form.machine_state
+#   /machine_events/<id>           form.machine_event
+#   /model_methods?model_type=<id> method listing
+#   /model_methods/<id>            method detail
+# Listings and details are loaded by XHR after the same clicks the scanner
+# makes, so network capture and every extractor backend see the same payloads
+# as on a live tenant. Every request waits `latency` seconds first. Model ids
+# follow the scanner's expectations: ul ids are the lowercase name with
+# underscores and data-id is the name without spaces.
+
+MOCK_SERVER_PORT = 8765
+MOCK_SERVER_LATENCY = 0.2
+
+MOCK_SAMPLE_MODELS = {
+    'Grant Request': {
+        'type': 'GrantRequest', 'is_dynamic': False,
+        'themes': {'Main': {'views': ['Gallery', 'Detail'],
+                            'code': {'current_before_new': 'model.amount_requested ||= 0',
+                                     'draft_before_new': 'N/A', 'current_after_create': 'N/A',
+                                     'draft_after_create': 'model.notify_program_officer'}}},
+        'methods': [{'name': 'notify_program_officer', 'type': 'Instance',
+                     'current_code': 'def notify_program_officer\n  true\nend', 'draft_code': ''}],
+        'workflow': {'themes': {'Main': {'workflow_id': '1', 'states': [
+            {'display_name': 'New', 'internal_name': 'new',
+             'validation_blocks': {'current_before_validation': 'model.amount_requested > 0'},
+             'actions': [{'name': 'Submit', 'to_state': 'Submitted', 'guard_instructions': None,
+                          'draft_guard': None}]},
+            {'display_name': 'Submitted', 'internal_name': 'submitted', 'validation_blocks': {},
+             'actions': [{'name': 'Approve', 'to_state': 'Approved', 'guard_instructions': 'model.reviewed?',
+                          'draft_guard': None}]},
+            {'display_name': 'Approved', 'internal_name': 'approved', 'validation_blocks': {}, 'actions': []}]}}},
+    },
+    'Organization': {
+        'type': 'Organization', 'is_dynamic': False,
+        'themes': {'Default': {'views': ['Gallery'], 'code': {key: 'N/A' for key, _ in THEME_BLOCK_ORDER}}},
+        'methods': [],
+        'workflow': {'themes': {}},
+    },
+}
+
+MOCK_PAGE_STYLE = """body{font-family:Arial,sans-serif;margin:0}
+header,ul.dashboards,#iconList,#modelList,#stage,#listing,div.detail{padding:8px}
+li.icon{margin:4px 0}div.link.is-admin{cursor:pointer;font-weight:bold}
+div.modal{position:fixed;top:10%;left:10%;width:80%;background:#fff;border:1px solid #999}
+"""
+
+MOCK_PAGE_SCRIPT = """(function(){
+function load(url,done){var request=new XMLHttpRequest();request.open('GET',url);
+request.setRequestHeader('X-Requested-With','XMLHttpRequest');request.onload=function(){done(request.responseText);};request.send();}
+function find(selector){return document.querySelector(selector);}
+function clear(){for(var i=0;i<arguments.length;i++){var el=find(arguments[i]);if(el)el.innerHTML='';}}
+document.addEventListener('click',function(event){
+var target=event.target,el,modal;
+if((el=target.closest('#iconList li.list-label div.link.is-admin'))){el.closest('ul').classList.toggle('open');return;}
+if((el=target.closest('a.open-config'))){event.preventDefault();modal=find('div.modal.new-modal.area');
+modal.innerHTML='';modal.setAttribute('style','display: block; opacity: 0');
+load(el.getAttribute('href'),function(html){modal.innerHTML=html+'<a class="close-modal" href="#">Close</a>';
+modal.setAttribute('style','display: block; opacity: 1');});return;}
+if((el=target.closest('a.close-modal'))){event.preventDefault();modal=el.closest('div.modal');modal.innerHTML='';
+modal.setAttribute('style','display: none');return;}
+if((el=target.closest('a.scroll-to-card'))){event.preventDefault();el.scrollIntoView();return;}
+if((el=target.closest('#modelList div.link.is-admin'))){clear('#stage','#listing','div.detail.area');
+load(el.getAttribute('data-src'),function(html){find('#stage').innerHTML=html;});return;}
+if((el=target.closest('#stage li.icon > a.link, #stage a.ui-tabs-anchor'))){event.preventDefault();
+if(el.getAttribute('href').charAt(0)!=='/')return;clear('#listing','div.detail.area');
+load(el.getAttribute('href'),function(html){find('#listing').innerHTML=html;});return;}
+if((el=target.closest('#listing a.to-detail'))){event.preventDefault();clear('div.detail.area');
+load(el.getAttribute('href'),function(html){find('div.detail.area').innerHTML=html;});return;}
+if(target.closest('a.to-detail, a.new-event, a.to-modal'))event.preventDefault();
+});
+})();
+"""
+
+MOCK_DASHBOARDS = (('1', 'Forms'), ('2', 'Workflow'), ('3', 'Card Settings'))
+
+class MockTenant:
+    """Number every theme, state, action and method of a models_data and render its pages"""
+    
+    def __init__(self, models_data):
+        self.models = {}  # data-id -> (model name, model data)
+        self.themes = {}  # uid -> (data-id, theme name)
+        self.workflows = {}  # uid -> (workflow id, [state id, ...])
+        self.states = {}  # id -> (state, [state, ...] of its workflow)
+        self.events = {}  # id -> (action, [state, ...] of its workflow)
+        self.methods = {}  # id -> method
+        self.model_methods = {}  # data-id -> [method id, ...]
+        next_id = 100
+        for model_name, model_data in models_data.items():
+            # The scanner rebuilds names from ul ids, so ids are derived from that form
+            data_id = mock_model_id(model_name).replace('_', ' ').title().replace(' ', '')
+            self.models[data_id] = (model_name, model_data)
+            workflow = model_data.get('workflow')
+            workflow_themes = workflow.get('themes', {}) if isinstance(workflow, dict) else {}
+            for theme_name in model_data.get('themes', {}):
+                next_id += 1
+                uid = str(next_id)
+                self.themes[uid] = (data_id, theme_name)
+                theme_workflow = workflow_themes.get(theme_name) or {}
+                states = [state for state in theme_workflow.get('states', []) if isinstance(state, dict)]
+                state_ids = []
+                for state in states:
+                    next_id += 1
+                    self.states[str(next_id)] = (state, states)
+                    state_ids.append(str(next_id))
+                    # Actions are numbered right after their state
+                    for action in state.get('actions', []):
+                        next_id += 1
+                        self.events[str(next_id)] = (action, states)
+                self.workflows[uid] = (theme_workflow.get('workflow_id') or uid, state_ids)
+            self.model_methods[data_id] = []
+            for method in model_data.get('methods') or []:
+                next_id += 1
+                self.methods[str(next_id)] = method
+                self.model_methods[data_id].append(str(next_id))
+    
+    def page(self, dashboard=None, admin=False):
+        """Render a full page; admin pages get the dashboard picker"""
+        picker = ''
+        if admin or dashboard:
+            # The scanner finds Card Settings by this attribute
+            updated = ' data-updated="NaN/NaN/NaN"'
+            picker = '<ul class="dashboards"><li class="combo">Dashboards</li>' + ''.join(
+                f'<li class="item"><a class="to-dashboard" href="/client_stores/{number}"'
+                f'{updated if title == "Card Settings" else ""}>{title}</a></li>'
+                for number, title in MOCK_DASHBOARDS) + '</ul>'
+        if dashboard == 'Forms':
+            content = self.forms_html() + '<div class="modal new-modal area" style="display: none"></div>'
+        elif dashboard in ('Workflow', 'Card Settings'):
+            panel = 'workflow' if dashboard == 'Workflow' else 'methods'
+            content = ('<div id="modelList">' + ''.join(
+                f'<div class="link is-admin" data-id="{html_escape(data_id)}" '
+                f'data-src="/model_panels/{panel}/{html_escape(data_id)}">{html_escape(model_name)}</div>'
+                for data_id, (model_name, _) in self.models.items()) + '</div>'
+                '<div id="stage"></div><div id="listing"></div><div class="detail area" data-type="detail"></div>')
+        else:
+            content = '<p>Dashboard</p>'
+        return (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>Fluxx {dashboard or "Dashboard"}</title>'
+                f'<style>{MOCK_PAGE_STYLE}</style></head><body>'
+                f'<header><a class="to-admin-panel" href="/?db=config">Admin Panel</a></header>'
+                f'{picker}{content}<script>{MOCK_PAGE_SCRIPT}</script></body></html>')
+    
+    def forms_html(self):
+        parts = ['<div id="iconList">']
+        uids = {value: uid for uid, value in self.themes.items()}
+        for data_id, (model_name, model_data) in self.models.items():
+            model_type = html_escape(model_data.get('type') or data_id)
+            parts.append(f'<ul id="{html_escape(mock_model_id(model_name))}" class="toggle-class" '
+                         f'data-click-when-opened=".scroll-to-card">'
+                         f'<li class="list-label"><div class="link is-admin">{html_escape(model_name)}</div></li>')
+            for theme_name, theme_data in model_data.get('themes', {}).items():
+                uid = uids[(data_id, theme_name)]
+                views = ''.join(f'<li class="entry" data-model-id="{uid}{index}"><a class="to-detail" '
+                                f'href="/stencils/{uid}{index}"><div class="label">{html_escape(view)}</div></a></li>'
+                                for index, view in enumerate(theme_data.get('views', [])))
+                parts.append(f'<li class="icon" data-card-uid="{uid}">'
+                             f'<a class="link scroll-to-card" href="#fluxx-card-{uid}">'
+                             f'<span class="label" role="menuitem">{html_escape(theme_name)}</span></a> '
+                             f'<a class="to-modal open-config" data-on-success="matchListItem,close" '
+                             f'href="/model_themes/{uid}/edit">Configure</a>'
+                             f'<div class="listing" data-type="listing" data-src="/stencils"><ul class="list">{views}'
+                             f'<li class="entry non-entry"><a class="to-detail"><div class="label">New View</div></a></li>'
+                             f'</ul></div></li>')
+            parts.append(f'<li class="icon new-theme"><a class="link to-modal" '
+                         f'href="/model_themes/new?model_theme[model_type]={model_type}">'
+                         f'<span class="label">New Theme</span></a></li></ul>')
+        parts.append('</div>')
+        return ''.join(parts)
+    
+    def theme_modal(self, uid):
+        data_id, theme_name = self.themes[uid]
+        code = self.models[data_id][1]['themes'][theme_name].get('code') or {}
+        fields = (('current_before_new', 'model_theme_unsafe_before_new_block'),
+                  ('draft_before_new', 'model_theme_draft_before_new_block'),
+                  ('current_after_create', 'model_theme_unsafe_after_create_block'),
+                  ('draft_after_create', 'model_theme_draft_after_create_block'))
+        return '<form class="model_theme">' + ''.join(
+            mock_textarea(field_id, code.get(key) if code.get(key) != 'N/A' else '')
+            for key, field_id in fields) + '</form>'
+    
+    def model_panel(self, panel, data_id):
+        model_data = self.models[data_id][1]
+        if panel == 'methods':
+            return ('<ul class="dock-tabs"><li><a class="ui-tabs-anchor" href="#details">Details</a></li>'
+                    f'<li><a class="ui-tabs-anchor" href="/model_methods?model_type={html_escape(data_id)}">'
+                    'Methods</a></li></ul>')
+        uids = {value: uid for uid, value in self.themes.items()}
+        return '<ul class="icons">' + ''.join(
+            f'<li class="icon"><a class="link" title="{html_escape(theme_name)}" '
+            f'href="/machine_states?model_theme_id={uids[(data_id, theme_name)]}">{html_escape(theme_name)}</a></li>'
+            for theme_name in model_data.get('themes', {})) + (
+            '<li class="icon new-theme"><a class="link" title="New Theme" href="#">New Theme</a></li></ul>')
+    
+    def state_listing(self, uid):
+        workflow_id, state_ids = self.workflows[uid]
+        entries = []
+        for state_id in state_ids:
+            state, _ = self.states[state_id]
+            events = ''.join(f'<li><a class="to-detail" href="/machine_events/{int(state_id) + 1 + index}">'
+                             f'{html_escape(action.get("name") or "")}</a></li>'
+                             for index, action in enumerate(state.get('actions', [])))
+            entries.append(f'<li class="entry" data-model-id="{state_id}">'
+                           f'<h2>{html_escape(state.get("display_name") or "")} '
+                           f'({html_escape(state.get("internal_name") or "")})</h2>'
+                           f'<a class="to-detail" href="/machine_states/{state_id}">Edit</a>'
+                           f'<ul class="events">{events}<li><a class="new-event" '
+                           f'href="/machine_events/new?machine_workflow_id={html_escape(str(workflow_id))}">+</a></li></ul></li>')
+        return ('<div class="listing" data-type="listing" data-src="/machine_states"><ul class="list">'
+                + ''.join(entries) + '</ul></div>')
+    
+    def state_detail(self, state_id):
+        state, _ = self.states[state_id]
+        blocks = state.get('validation_blocks') or {}
+        fields = (('current_before_validation', 'machine_state_unsafe_before_validation_enter'),
+                  ('draft_before_validation', 'machine_state_draft_before_validation_enter'),
+                  ('current_after_enter', 'machine_state_unsafe_after_enter'),
+                  ('draft_after_enter', 'machine_state_draft_after_enter'))
+        return ('<form class="machine_state">'
+                + ''.join(mock_textarea(field_id, blocks.get(key)) for key, field_id in fields) + '</form>')
+    
+    def event_detail(self, event_id):
+        action, states = self.events[event_id]
+        names = [state.get('display_name') or '' for state in states]
+        if action.get('to_state') and action['to_state'] not in names:
+            names.append(action['to_state'])
+        options = ''.join(f'<option{" selected" if name == action.get("to_state") else ""}>{html_escape(name)}</option>'
+                          for name in names)
+        return (f'<form class="machine_event"><select id="machine_event_to_state_id">{options}</select>'
+                + mock_textarea('machine_event_unsafe_guard', action.get('guard_instructions'))
+                + mock_textarea('machine_event_draft_guard', action.get('draft_guard')) + '</form>')
+    
+    def method_listing(self, data_id):
+        entries = ''.join(f'<li class="entry" data-model-id="{method_id}"><h2>{html_escape(self.methods[method_id].get("name") or "")}</h2>'
+                          f'<a class="to-detail" href="/model_methods/{method_id}">Edit</a></li>'
+                          for method_id in self.model_methods.get(data_id, []))
+        return f'<div class="listing area" data-type="listing" data-src="/model_methods"><ul class="list">{entries}</ul></div>'
+    
+    def method_detail(self, method_id):
+        method = self.methods[method_id]
+        option = f'<option selected>{html_escape(method["type"])}</option>' if method.get('type') else '<option></option>'
+        return (f'<div class="method"><select id="model_method_method_type">{option}</select>'
+                + mock_textarea('model_method_unsafe_dyn_method', method.get('current_code'))
+                + mock_textarea('model_method_draft_dyn_method', method.get('draft_code')) + '</div>')
+
+def mock_model_id(model_name):
+    """The #iconList ul id of a model"""
+    return model_name.lower().replace(' ', '_')
+
+def mock_textarea(field_id, code):
+    """Render a code field the way Fluxx forms do"""
+    # A leading newline in a textarea is dropped by HTML parsers, so add one to keep the code intact
+    return f'<textarea id="{field_id}" class="code-to-submit">\n{html_escape(code or "")}</textarea>'
+
+class MockFluxxRequestHandler(BaseHTTPRequestHandler):
+    """Route admin panel requests to the server's MockTenant"""
+    
+    ROUTES = [
+        (re.compile(r'/client_stores/(\d+)$'), 'dashboard'),
+        (re.compile(r'/model_themes/(\d+)/edit$'), 'theme_modal'),
+        (re.compile(r'/model_panels/(workflow|methods)/([^/]+)$'), 'model_panel'),
+        (re.compile(r'/machine_states$'), 'state_listing'),
+        (re.compile(r'/machine_states/(\d+)$'), 'state_detail'),
+        (re.compile(r'/machine_events/(\d+)$'), 'event_detail'),
+        (re.compile(r'/model_methods$'), 'method_listing'),
+        (re.compile(r'/model_methods/(\d+)$'), 'method_detail'),
+    ]
+    
+    def do_GET(self):
+        self.server.request_count += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        tenant = self.server.tenant
+        parsed = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        body = None
+        try:
+            if parsed.path == '/':
+                body = tenant.page(admin=query.get('db') == 'config')
+            for pattern, route in self.ROUTES:
+                match = pattern.match(unquote(parsed.path))
+                if not match:
+                    continue
+                if route == 'dashboard':
+                    body = tenant.page(dict(MOCK_DASHBOARDS).get(match.group(1)))
+                elif route == 'model_panel':
+                    body = tenant.model_panel(*match.groups())
+                elif route == 'state_listing':
+                    body = tenant.state_listing(query.get('model_theme_id', ''))
+                elif route == 'method_listing':
+                    body = tenant.method_listing(query.get('model_type', ''))
+                else:
+                    body = getattr(tenant, route)(match.group(1))
                 break
-            print("\nWaiting for more models to load...")
-            time.sleep(3)
-                
-        # Initialize dictionary to store model data
-        models = {}
-        current_model = 0
-        total_models = len(model_list)
-        
-        # Print initial progress bar
-        sys.stdout.write("\rScanning Models: [--------------------------------------------------] 0.0% (0/{})".format(total_models))
-        sys.stdout.flush()
-        
-        # Process each model
-        for model_ul in model_list:
-            try:
-                current_model += 1
-                progress = (current_model / total_models) * 100
-                
-                # Create progress bar
-                bar_length = 50
-                filled_length = int(bar_length * current_model // total_models)
-                bar = '=' * filled_length + '-' * (bar_length - filled_length)
-                
-                # Update progress bar
-                sys.stdout.write('\r' + ' ' * 100)
-                sys.stdout.write('\rScanning Models: [{0}] {1:.1f}% ({2}/{3})'.format(
-                    bar, progress, current_model, total_models
-                ))
-                sys.stdout.flush()
-                
-                # Get model name from the UL id attribute
-                model_id = model_ul.get_attribute("id")
-                if not model_id:
+        except KeyError:
+            body = None
+        if body is None:
+            self.send_error(404)
+            return
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def log_message(self, format, *args):
+        pass
+
+class MockFluxxServer:
+    """Serve a models_data as a local Fluxx admin panel on a background thread"""
+    
+    def __init__(self, models_data=None, port=MOCK_SERVER_PORT, latency=MOCK_SERVER_LATENCY, host='127.0.0.1'):
+        self.httpd = ThreadingHTTPServer((host, port), MockFluxxRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.tenant = MockTenant(models_data if models_data is not None else MOCK_SAMPLE_MODELS)
+        self.httpd.latency = latency
+        self.httpd.request_count = 0
+        self.thread = None
+    
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    @property
+    def request_count(self):
+        return self.httpd.request_count
+    
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def run_mock_server(filename=None, port=MOCK_SERVER_PORT, latency=MOCK_SERVER_LATENCY, models_data=None):
+    """Serve a saved scan (or the built-in sample tenant) until Ctrl+C"""
+    if filename:
+        models_data = load_scan_export(filename)[0]
+    server = MockFluxxServer(models_data, port, latency)
+    print(f"Mock Fluxx admin panel for {len(server.httpd.tenant.models)} models at {server.url} "
+          f"({latency:.2f}s latency per request)")
+    print(f'Scan it with: python "{os.path.basename(sys.argv[0])}" --url {server.url} --headless')
+    print("Press Ctrl+C to stop")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+# Synthetic Tenant Reference:
+#
+# generate_synthetic_tenant() builds a models_data with the shape a full scan
+# produces (forms, code, methods and workflow phases), so the same data can
+# be rendered directly, saved as a scan export, or served by MockFluxxServer
+# and scanned. Counts are per model except `models`; actions is the average
+# number of actions per state. code_lines is the average block length and
+# duplication is the share of code blocks copied from an earlier block, as
+# happens when snippets are pasted between themes. The same seed always
+# produces the same tenant. Names survive the scanner's ul id round trip
+# (title case, letters and digits only).
+
+SYNTHETIC_WORDS = ['Grant', 'Request', 'Program', 'Review', 'Payment', 'Report', 'Budget', 'Organization',
+                   'Contact', 'Portal', 'Application', 'Award', 'Milestone', 'Approval', 'Fund', 'Panel',
+                   'Site', 'Visit', 'Compliance', 'Document', 'Outcome', 'Initiative', 'Strategy', 'Cycle']
+SYNTHETIC_STATES = ['New', 'Submitted', 'In Review', 'Pending Approval', 'Approved', 'Declined',
+                    'On Hold', 'Returned', 'Awarded', 'Closed', 'Withdrawn', 'Completed']
+SYNTHETIC_VIEWS = ['Gallery', 'Detail', 'Print', 'Portal', 'Summary', 'Export']
+SYNTHETIC_ACTIONS = ['Submit', 'Approve', 'Decline', 'Return', 'Hold', 'Resume', 'Close', 'Reopen', 'Withdraw']
+
+def synthetic_code(rng, fields, methods, lines):
+    """Generate a Ruby-like code block of about the given number of lines"""
+    body = []
+    for _ in range(max(1, rng.randint(lines // 2, lines + lines // 2))):
+        field = rng.choice(fields)
+        pick = rng.random()
+        if pick < 0.4:
+            body.append(f"model.{field} = model.{rng.choice(fields)}.to_i + {rng.randint(1, 999)}")
+        elif pick < 0.6 and methods:
+            body.append(f"model.{rng.choice(methods)}({field}: model.{field})")
+        elif pick < 0.8:
+            body.append(f"if model.{field}.present? && model.state == :{rng.choice(['new', 'submitted', 'approved'])}")
+            body.append(f"  model.update(:{rng.choice(fields)} => '{rng.choice(SYNTHETIC_WORDS).lower()}')")
+            body.append("end")
+        else:
+            body.append(f"# {rng.choice(SYNTHETIC_WORDS)} {field} check")
+    return '\n'.join(body)
+
+def generate_synthetic_tenant(models=100, themes=3, views=4, methods=5, states=6, actions=2,
+                              code_lines=20, duplication=0.3, dynamic_ratio=0.3, seed=0):
+    """Build a deterministic synthetic models_data for scaling tests"""
+    rng = random.Random(seed)
+    models_data = {}
+    pool = []  # Earlier code blocks that later blocks may duplicate
+    
+    def code_block(fields, method_names):
+        if pool and rng.random() < duplication:
+            return rng.choice(pool)
+        code = synthetic_code(rng, fields, method_names, code_lines)
+        pool.append(code)
+        return code
+    
+    workflow_id = 0
+    for index in range(models):
+        words = rng.sample(SYNTHETIC_WORDS, 2)
+        model_name = f"{words[0]} {words[1]} {index + 1}"
+        camel = model_name.replace(' ', '')
+        is_dynamic = rng.random() < dynamic_ratio
+        fields = [f"{rng.choice(SYNTHETIC_WORDS).lower()}_{rng.choice(['id', 'amount', 'date', 'status', 'notes'])}"
+                  for _ in range(8)]
+        method_names = [f"{rng.choice(['calculate', 'notify', 'sync', 'validate', 'build'])}_"
+                        f"{rng.choice(SYNTHETIC_WORDS).lower()}_{number + 1}" for number in range(methods)]
+        model_themes = {}
+        for number in range(themes):
+            code = {}
+            for key, _ in THEME_BLOCK_ORDER:
+                present = rng.random() < (0.3 if key.startswith('draft_') else 0.6)
+                code[key] = code_block(fields, method_names) if present else 'N/A'
+            model_themes['Main' if number == 0 else f"{rng.choice(SYNTHETIC_WORDS)} Theme {number + 1}"] = {
+                'views': [SYNTHETIC_VIEWS[view] if view < len(SYNTHETIC_VIEWS) else f"View {view + 1}"
+                          for view in range(views)],
+                'code': code,
+            }
+        model_methods = [{
+            'name': name,
+            'type': rng.choice(['Instance', 'Class']),
+            'current_code': f"def {name}\n" + code_block(fields, method_names) + "\nend",
+            'draft_code': (f"def {name}\n" + code_block(fields, method_names) + "\nend") if rng.random() < 0.2 else '',
+        } for name in method_names]
+        workflow_themes = {}
+        if states:
+            # Workflows live on the first theme, like most Fluxx builds
+            workflow_id += 1
+            names = [SYNTHETIC_STATES[number] if number < len(SYNTHETIC_STATES) else f"Stage {number + 1}"
+                     for number in range(states)]
+            theme_states = []
+            for number, display_name in enumerate(names):
+                validation = {}
+                for key, _ in VALIDATION_BLOCK_ORDER:
+                    if rng.random() < (0.1 if key.startswith('draft_') else 0.25):
+                        validation[key] = code_block(fields, method_names)
+                count = 0 if number == len(names) - 1 else rng.randint(0, 2 * actions)
+                theme_states.append({
+                    'display_name': display_name,
+                    'internal_name': snake_case(display_name.replace(' ', '')),
+                    'validation_blocks': validation,
+                    'actions': [{
+                        'name': SYNTHETIC_ACTIONS[action % len(SYNTHETIC_ACTIONS)] + ('' if action < len(SYNTHETIC_ACTIONS)
+                                                                                     else f" {action + 1}"),
+                        'to_state': rng.choice(names),
+                        'guard_instructions': code_block(fields, method_names) if rng.random() < 0.3 else None,
+                        'draft_guard': None,
+                    } for action in range(count)],
+                })
+            workflow_themes['Main'] = {'workflow_id': str(workflow_id), 'states': theme_states}
+        models_data[model_name] = {
+            'type': f"MacModelTypeDyn{camel}" if is_dynamic else camel,
+            'is_dynamic': is_dynamic,
+            'themes': model_themes,
+            'methods': model_methods,
+            'workflow': {'themes': workflow_themes},
+        }
+    return models_data
+
+def write_synthetic_scan(models_data, filename=None, seed=0):
+    """Save a synthetic tenant as a scan export and return its filename"""
+    filename = filename or f'fluxx_synthetic_{len(models_data)}_{seed}.jsonl'
+    exporter = ScanExporter('https://synthetic.fluxx.io', filename)
+    try:
+        exporter.write_phase('workflow', models_data)
+    finally:
+        exporter.close()
+    return filename
+
+def run_synthetic_tenant(args):
+    """Generate a synthetic tenant from the command line options, then save or serve it"""
+    start = time.time()
+    models_data = generate_synthetic_tenant(args.generate_tenant, args.themes, args.views, args.methods,
+                                            args.states, args.actions, args.code_lines, args.duplication,
+                                            seed=args.seed)
+    blocks = sum(1 for _ in iter_code_blocks(models_data))
+    print(f"Generated {len(models_data)} models ({blocks} code blocks) in {time.time() - start:.1f}s")
+    if args.mock_server is not None:
+        run_mock_server(None, args.mock_port, args.mock_latency, models_data=models_data)
+        return
+    filename = write_synthetic_scan(models_data, seed=args.seed)
+    print(f"Saved to {filename}")
+    print(f'Render it with: python "{os.path.basename(sys.argv[0])}" --from-scan {filename}')
+
+# Benchmark Reference:
+#
+# run_benchmark() generates synthetic tenants of several sizes, scans each one
+# from a local MockFluxxServer with no latency in headless Chrome, and renders
+# the scanned data. Every phase records:
+# - seconds: wall time of the phase
+# - commands: WebDriver commands sent (BrowserSession.command_count)
+# - requests: HTTP requests the mock server answered
+# - python_peak_growth_mb: how far the phase raised this process's memory
+#   high-water mark (0 when it stayed under an earlier phase's peak). The
+#   scan phases mostly use memory in Chrome, which this does not include
+# - browser_heap_mb: the renderer's JS heap when a scan phase ends
+#   (BrowserSession.memory_mb), where the scan phases' memory actually lives
+# - output_bytes: what the phase added to the scan export, or the size of the
+#   Word document for 'document'
+# Results are saved to fluxx_benchmark_<timestamp>.json. The first run (or
+# --update-baseline) also becomes the baseline; later runs flag any metric
+# that grew by more than the threshold and by more than its noise floor.
+# Scan phases need 'forms' first; 'document' alone renders the generated
+# tenant without a browser.
+
+BENCHMARK_SCHEMA = 'fluxx-benchmark'
+BENCHMARK_PHASES = ['forms', 'code', 'methods', 'workflow', 'document']
+BENCHMARK_SIZES = [10, 100]
+BENCHMARK_BASELINE_FILE = 'fluxx_benchmark_baseline.json'
+BENCHMARK_THRESHOLD = 0.2
+# Smaller differences are run-to-run noise, whatever their ratio
+BENCHMARK_NOISE = {'seconds': 0.25, 'commands': 10, 'requests': 10, 'python_peak_growth_mb': 10,
+                   'browser_heap_mb': 10, 'output_bytes': 4096}
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None if unavailable"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    try:
+        import ctypes
+        from ctypes import wintypes
+        
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage', 'QuotaPagedPoolUsage',
+                    'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage')]
+        
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        kernel32 = ctypes.windll.kernel32
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters),
+                                                        counters.cb):
+            return None
+        return round(counters.PeakWorkingSetSize / (1024 * 1024), 1)
+    except Exception:
+        return None
+
+def benchmark_tenant(size, phases=BENCHMARK_PHASES, seed=0):
+    """Scan and render one synthetic tenant, returning {phase: metrics}"""
+    models_data = generate_synthetic_tenant(size, seed=seed)
+    work_dir = tempfile.mkdtemp(prefix='fluxx_benchmark_')
+    server = MockFluxxServer(models_data, port=0, latency=0).start()
+    exporter = ScanExporter(server.url, os.path.join(work_dir, 'scan.jsonl'))
+    session = None
+    results = {}
+    try:
+        if any(phase != 'document' for phase in phases):
+            session = BrowserSession(server.url, os.path.join(work_dir, 'chrome'), headless=True)
+            session.get(server.url)
+            if not wait_for_dashboard(session) or not navigate_to_admin(session):
+                raise RuntimeError(f"Could not open the mock admin panel at {server.url}")
+            extractors = ExtractorSelector(session)
+        steps = {
+            'forms': lambda data: wait_for_forms_and_parse(session, extractors=extractors, confirm=False),
+            'code': lambda data: gather_theme_code(session, data, extractors, confirm=False),
+            'methods': lambda data: scan_methods(session, data, None, extractors, confirm=False),
+            'workflow': lambda data: scan_model_workflows(session, data, None, extractors, confirm=False),
+        }
+        data = models_data
+        for phase in phases:
+            commands = session.command_count if session else 0
+            requests_before = server.request_count
+            peak_before = peak_rss_mb()
+            start = time.perf_counter()
+            if phase == 'document':
+                filename = generate_word_document(data, server.url)
+                seconds = time.perf_counter() - start
+                output_bytes = os.path.getsize(filename)
+                os.remove(filename)
+            else:
+                data = steps[phase](data)
+                seconds = time.perf_counter() - start
+                if not data:
+                    raise RuntimeError(f"The {phase} phase returned no models")
+                before = exporter.file.tell()
+                exporter.write_phase(phase, data)
+                output_bytes = exporter.file.tell() - before
+            peak_after = peak_rss_mb()
+            browser_heap = session.memory_mb() if session and phase != 'document' else None
+            results[phase] = {
+                'seconds': round(seconds, 3),
+                'commands': (session.command_count - commands) if session else 0,
+                'requests': server.request_count - requests_before,
+                'python_peak_growth_mb': (round(peak_after - peak_before, 1)
+                                          if peak_before is not None and peak_after is not None else None),
+                'browser_heap_mb': round(browser_heap, 1) if browser_heap is not None else None,
+                'output_bytes': output_bytes,
+            }
+    finally:
+        exporter.close()
+        if session:
+            session.quit()
+        server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+def compare_benchmarks(results, baseline, threshold=BENCHMARK_THRESHOLD):
+    """Return the metrics that grew past the threshold since the baseline"""
+    regressions = []
+    for size, phases in results['sizes'].items():
+        for phase, metrics in phases.items():
+            base = baseline.get('sizes', {}).get(size, {}).get(phase)
+            if not base:
+                continue
+            for metric, value in metrics.items():
+                old = base.get(metric)
+                if value is None or old is None:
                     continue
-                    
-                model_name = model_id.replace('_', ' ').title()
-                
-                # Find the "New Theme" link to extract model type
-                model_type = None
-                try:
-                    # Try multiple selectors to find model type
-                    selectors = [
-                        "a.link.to-modal[href*='model_theme[model_type]']",
-                        "a.link[href*='model_theme[model_type]']",
-                        "a[href*='model_theme[model_type]']"
-                    ]
-                    
-                    for selector in selectors:
-                        try:
-                            new_theme_link = model_ul.find_element(By.CSS_SELECTOR, selector)
-                            if new_theme_link:
-                                href = new_theme_link.get_attribute("href")
-                                # Extract model type from URL parameter
-                                match = re.search(r'model_theme\[model_type\]=(\w+)', href)
-                                if match:
-                                    model_type = match.group(1)
-                        except:
-                            continue
-                except:
-                    pass
-                
-                # Check if model is dynamic
-                is_dynamic = model_type and model_type.startswith('MacModelTypeDyn')
-                
-                models[model_name] = {
-                    'type': model_type,
-                    'is_dynamic': is_dynamic,
-                    'themes': {}
-                }
-                
-                # Find themes within this model's UL
-                theme_items = model_ul.find_elements(By.CSS_SELECTOR, 
-                    "li.icon[data-card-uid]")
-                
-                for theme in theme_items:
-                    try:
-                        theme_label = theme.find_element(By.CSS_SELECTOR, 
-                            "a.link.scroll-to-card span.label").text
-                        theme_name = theme_label.get_attribute("textContent").strip()
-                        
-                        if theme_name and theme_name not in ['New Theme', 'Retired Themes', 'Export', 'Filter', 'Visualizations']:
-                            models[model_name]['themes'][theme_name] = {'views': []}
-                            
-                            # Find and process views
-                            listing_div = theme.find_element(By.CSS_SELECTOR, 
-                                "div.listing[data-type='listing'][data-src='/stencils']")
-                            
-                            views = listing_div.find_elements(By.CSS_SELECTOR,
-                                "ul.list > li.entry:not(.non-entry)")
-                            
-                            for view in views:
-                                try:
-                                    label_div = view.find_element(By.CSS_SELECTOR, 
-                                        "a.to-detail > div.label")
-                                    view_name = label_div.get_attribute("textContent").strip()
-                                    
-                                    if view_name and view_name != 'New View':
-                                        models[model_name]['themes'][theme_name]['views'].append(view_name)
-                                except:
-                                    continue
-                    except:
-                        continue
-                        
-            except:
+                if value - old > BENCHMARK_NOISE.get(metric, 0) and value > old * (1 + threshold):
+                    regressions.append({'size': size, 'phase': phase, 'metric': metric, 'baseline': old,
+                                        'current': value, 'change': round(value / old - 1, 3) if old else None})
+    return regressions
+
+def run_benchmark(sizes=None, phases=None, baseline_file=BENCHMARK_BASELINE_FILE, threshold=BENCHMARK_THRESHOLD,
+                  update_baseline=False, seed=0):
+    """Benchmark each tenant size, save the results and report regressions against the baseline"""
+    sizes = sizes or BENCHMARK_SIZES
+    phases = [phase for phase in BENCHMARK_PHASES if phase in (phases or BENCHMARK_PHASES)]
+    if any(phase != 'document' for phase in phases) and 'forms' not in phases:
+        phases.insert(0, 'forms')  # The other scan phases start from the Forms tree
+    results = {
+        'schema': BENCHMARK_SCHEMA,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'seed': seed,
+        'sizes': {},
+    }
+    for size in sizes:
+        print(f"\nBenchmarking {size} models ({', '.join(phases)})...")
+        phase_results = benchmark_tenant(size, phases, seed)
+        results['sizes'][str(size)] = phase_results
+        print(f"\n{'Phase':<10} {'Seconds':>9} {'Commands':>9} {'Requests':>9} {'Py +MB':>7} {'Heap MB':>8} "
+              f"{'Output':>11}")
+        for phase, metrics in phase_results.items():
+            print(f"{phase:<10} {metrics['seconds']:>9.2f} {metrics['commands']:>9} {metrics['requests']:>9} "
+                  f"{metrics['python_peak_growth_mb'] if metrics['python_peak_growth_mb'] is not None else '-':>7} "
+                  f"{metrics['browser_heap_mb'] if metrics['browser_heap_mb'] is not None else '-':>8} "
+                  f"{metrics['output_bytes']:>11,}")
+    
+    timestamp_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f'fluxx_benchmark_{timestamp_str}.json'
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {filename}")
+    
+    if update_baseline or not os.path.exists(baseline_file):
+        with open(baseline_file, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {baseline_file}")
+        return []
+    with open(baseline_file, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare_benchmarks(results, baseline, threshold)
+    if not regressions:
+        print(f"No regressions beyond {threshold:.0%} against {baseline_file} ({baseline.get('created')})")
+    for entry in regressions:
+        change = f"+{entry['change']:.0%}" if entry['change'] is not None else "new"
+        print(f"REGRESSION {entry['size']} models / {entry['phase']} / {entry['metric']}: "
+              f"{entry['baseline']} -> {entry['current']} ({change})")
+    return regressions
+
+# Batch Reference:
+#
+# run_batch() scans a list of tenants without prompts, each in its own worker
+# process, with at most --workers scans running at once. The tenants file has
+# one Fluxx URL or instance name per line (blank lines and # comments are
+# skipped); names go through validate_fluxx_url, full http(s) URLs are used
+# as-is. Every tenant needs a saved login in the sessions folder (one
+# interactive run saves it); the others are reported and skipped.
+#
+# Each worker runs in <batch dir>/<host>/, so that folder collects the
+# tenant's scan export, Word documents, metrics, failure and change reports,
+# its learned timeouts and a log of everything the scan printed. Keeping the
+# batch directory between runs lets each scan be compared with the previous
+# one. All tenants share the code index of the folder the batch started in.
+# fluxx_batch_<timestamp>.json in the batch directory summarizes the run.
+#
+# With --status-port the workers save their live status and metrics to
+# fluxx_status.json in their tenant folder every few seconds. The batch
+# process serves them together: /status lists every tenant's state (queued,
+# running, ok, failed) with its progress, and /metrics labels each tenant's
+# numbers with its site.
+
+BATCH_SCHEMA = 'fluxx-batch'
+BATCH_STATUS_SCHEMA = 'fluxx-batch-status'
+BATCH_DIR = 'fluxx_batch'
+BATCH_WORKERS = 2
+BATCH_PHASES = ['code', 'methods', 'workflow']
+BATCH_STATUS_FILE = 'fluxx_status.json'
+BATCH_STATUS_INTERVAL = 2  # Seconds between status file updates
+BATCH_STATES = ['queued', 'running', 'ok', 'failed']
+
+def run_scan_phases(session, models_data, phases, extractors, exporter):
+    """Run the chosen scan phases after Forms without prompts, exporting each one"""
+    steps = {
+        'code': lambda data: gather_theme_code(session, data, extractors, confirm=False),
+        'methods': lambda data: scan_methods(session, data, None, extractors, confirm=False),
+        'workflow': lambda data: scan_model_workflows(session, data, None, extractors, confirm=False),
+    }
+    for phase in BATCH_PHASES:
+        if phase in phases:
+            models_data = steps[phase](models_data)
+            exporter.write_phase(phase, models_data)
+    return models_data
+
+def write_tenant_status(filename, state, metrics=None):
+    """Save a worker's live status and metrics report for the batch status endpoint"""
+    metrics = metrics or SCAN_METRICS
+    data = {'state': state, 'status': metrics.status(), 'report': metrics.report()}
+    # Write a temporary file first so the batch process never reads half a file
+    temp_filename = filename + '.tmp'
+    with open(temp_filename, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(temp_filename, filename)
+
+def publish_tenant_status(filename, stop_event):
+    """Rewrite the tenant status file every few seconds until the scan ends"""
+    while True:
+        try:
+            write_tenant_status(filename, 'running')
+        except OSError:
+            pass
+        if stop_event.wait(BATCH_STATUS_INTERVAL):
+            return
+
+class BatchStatus:
+    """Combine the status files of the batch workers for the status endpoint"""
+    
+    def __init__(self, batch_dir, tasks):
+        self.batch_dir = batch_dir
+        self.tasks = tasks
+        self.started = time.monotonic()
+        self.finished = {}  # url -> final state reported by the pool
+    
+    def finish(self, url, state):
+        """Record a tenant's final state; a worker that died never updates its status file"""
+        self.finished[url] = state
+    
+    def tenants(self):
+        """Return each tenant's state with its last saved status and metrics report"""
+        tenants = []
+        for task in self.tasks:
+            entry = {'url': task['url'], 'folder': task['folder'], 'state': 'queued', 'status': None, 'report': None}
+            try:
+                with open(os.path.join(self.batch_dir, task['folder'], BATCH_STATUS_FILE), encoding='utf-8') as f:
+                    entry.update(json.load(f))
+            except (OSError, ValueError):
+                pass
+            entry['state'] = self.finished.get(task['url'], entry['state'])
+            tenants.append(entry)
+        return tenants
+    
+    def status(self):
+        """Return the live progress of every tenant in the batch as a JSON-ready dict"""
+        tenants = self.tenants()
+        return {
+            'schema': BATCH_STATUS_SCHEMA,
+            'batch_dir': self.batch_dir,
+            'elapsed_seconds': round(time.monotonic() - self.started, 1),
+            'states': {state: sum(1 for tenant in tenants if tenant['state'] == state) for state in BATCH_STATES},
+            'tenants': [{'url': tenant['url'], 'folder': tenant['folder'], 'state': tenant['state'],
+                         'status': tenant['status']} for tenant in tenants],
+        }
+    
+    def prometheus(self):
+        """Return the tenant counts and each started tenant's status and metrics in the Prometheus text format"""
+        tenants = self.tenants()
+        lines = ["# HELP fluxx_batch_tenants Tenants in the batch by state", "# TYPE fluxx_batch_tenants gauge"]
+        lines += [f'fluxx_batch_tenants{{state="{state}"}} {sum(1 for tenant in tenants if tenant["state"] == state)}'
+                  for state in BATCH_STATES]
+        started = [tenant for tenant in tenants if tenant['status'] and tenant['report']]
+        return ('\n'.join(lines) + '\n' + prometheus_status(*[tenant['status'] for tenant in started]) +
+                prometheus_metrics(*[tenant['report'] for tenant in started]))
+
+def read_tenant_list(filename):
+    """Return the tenant URLs listed in a file, in order and without duplicates"""
+    urls = []
+    with open(filename, encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line:
                 continue
+            url = line.rstrip('/') if urlparse(line).scheme in ('http', 'https') else validate_fluxx_url(line)
+            if url not in urls:
+                urls.append(url)
+    return urls
+
+def scan_tenant(task):
+    """Scan one tenant and write its documents without prompts; runs in a batch worker process"""
+    url = task['url']
+    tenant_dir = os.path.join(task['batch_dir'], task['folder'])
+    os.makedirs(tenant_dir, exist_ok=True)
+    timestamp_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    log_name = f'fluxx_batch_{timestamp_str}.log'
+    result = {'url': url, 'folder': task['folder'], 'status': 'failed', 'error': None, 'models': 0,
+              'retries': 0, 'failures': 0, 'changes': None, 'seconds': None, 'scan': None, 'documents': [],
+              'log': os.path.join(task['folder'], log_name)}
+    start = time.perf_counter()
+    cwd, stdout, stderr = os.getcwd(), sys.stdout, sys.stderr
+    log = open(os.path.join(tenant_dir, log_name), 'w', encoding='utf-8', buffering=1)
+    sys.stdout = sys.stderr = log
+    os.chdir(tenant_dir)
+    # Worker processes are reused, so the module-level state starts over for every tenant
+    TIMEOUT_PROFILE.load(url)
+    RETRY_POLICY.reset()
+    SCAN_METRICS.reset(url)
+    status_filename = os.path.join(tenant_dir, BATCH_STATUS_FILE) if task.get('status') else None
+    stop_status = threading.Event()
+    status_thread = None
+    if status_filename:
+        status_thread = threading.Thread(target=publish_tenant_status, args=(status_filename, stop_status), daemon=True)
+        status_thread.start()
+    session = None
+    exporter = None
+    try:
+        print(f"Batch scan of {url} started {datetime.datetime.now().isoformat(timespec='seconds')}")
+        session = BrowserSession(url, os.path.join(tenant_dir, 'chrome_temp'), headless=task['headless'])
+        restore_session_cookies(session.driver, url, task['cookie_path'])
+        if not wait_for_dashboard(session):
+            raise RuntimeError("The saved login did not reach the dashboard; run the tool once for this "
+                               "tenant to log in again")
+        # Saving the cookies again keeps the login fresh for the next run
+        session.cookie_path = save_session_cookies(session.driver, url, task['cookie_path'])
+        if not navigate_to_admin(session):
+            raise RuntimeError("Could not navigate to the Admin Panel")
         
-        # Show completion
-        sys.stdout.write('\r' + ' ' * 100)
-        sys.stdout.write('\rModel scanning complete!')
-        sys.stdout.flush()
-        print("\n" + "=" * 80)
+        extractors = ExtractorSelector(session)
+        models_data = wait_for_forms_and_parse(session, extractors=extractors, confirm=False)
+        if not models_data:
+            raise RuntimeError("Could not parse the Forms section")
+        exporter = ScanExporter(url)
+        exporter.write_phase('forms', models_data)
+        result['scan'] = os.path.join(task['folder'], exporter.filename)
+        models_data = run_scan_phases(session, models_data, task['phases'], extractors, exporter)
         
-        return models
+        print(f"\nLinked {link_references(models_data)} cross-references between code, methods and states")
+        exporter.write_references(models_data)
+        update_code_index(models_data, url, exporter.filename, task['index'])
+        changes = compare_with_previous_scan(models_data, url, exporter.filename)
+        print_failure_report()
+        write_scan_metrics()
         
+        # The batch pool already uses the CPUs, so each tenant renders in its own process
+        documents = generate_word_variants(models_data, site_url=url, variants=task['variants'], workers=1,
+                                           changes=changes)
+        report = RETRY_POLICY.report()
+        result.update(status='ok', models=len(models_data), retries=report['retries'],
+                      failures=report['failure_count'], changes=changes['summary'] if changes else None,
+                      documents=[os.path.join(task['folder'], name) for name in documents if name])
     except Exception as e:
-        print(f"\nError parsing Forms section: {str(e)}")
+        result['error'] = f"{type(e).__name__}: {str(e).strip()}"
+        import traceback
+        traceback.print_exc()
+    finally:
+        TIMEOUT_PROFILE.save()
+        if exporter:
+            exporter.close()
+        if session:
+            session.quit()
+        if status_thread:
+            stop_status.set()
+            status_thread.join()
+            try:
+                write_tenant_status(status_filename, result['status'])
+            except OSError:
+                pass
+        shutil.rmtree(os.path.join(tenant_dir, 'chrome_temp'), ignore_errors=True)
+        os.chdir(cwd)
+        sys.stdout, sys.stderr = stdout, stderr
+        log.close()
+    result['seconds'] = round(time.perf_counter() - start, 1)
+    return result
+
+def run_batch(tenants_file, batch_dir=BATCH_DIR, workers=BATCH_WORKERS, phases=None, variants=None,
+              headless=False, index_path=CODE_INDEX_FILE, status_port=None):
+    """Scan and document every tenant in a list, several at a time, and save a summary report"""
+    urls = read_tenant_list(tenants_file)
+    if not urls:
+        print(f"No tenants listed in {tenants_file}.")
         return None
+    phases = [phase for phase in BATCH_PHASES if phase in (phases or BATCH_PHASES)]
+    variants = tuple(variants or ('internal',))
+    batch_dir = os.path.abspath(batch_dir)
+    os.makedirs(batch_dir, exist_ok=True)
+    
+    results = {}
+    tasks = []
+    for url in urls:
+        folder = (urlparse(url).netloc or url).replace(':', '_')
+        cookie_path = session_cookie_path(url)
+        if not os.path.exists(cookie_path):
+            results[url] = {'url': url, 'folder': folder, 'status': 'skipped',
+                            'error': f"No saved login ({cookie_path}); run the tool once for this tenant"}
+            print(f"Skipping {url}: no saved login in {SESSION_DIR}")
+            continue
+        tasks.append({'url': url, 'folder': folder, 'batch_dir': batch_dir, 'cookie_path': os.path.abspath(cookie_path),
+                      'index': os.path.abspath(index_path), 'phases': phases, 'variants': variants,
+                      'headless': headless, 'status': bool(status_port)})
+    
+    batch_status = None
+    if status_port and tasks:
+        # Status files left by the previous batch would show its tenants as finished
+        for task in tasks:
+            try:
+                os.remove(os.path.join(batch_dir, task['folder'], BATCH_STATUS_FILE))
+            except OSError:
+                pass
+        batch_status = BatchStatus(batch_dir, tasks)
+        start_status_server(status_port, batch_status)
+    
+    start = time.perf_counter()
+    if tasks:
+        workers = max(1, min(workers, len(tasks)))
+        print(f"\nScanning {len(tasks)} tenants, {workers} at a time ({', '.join(['forms'] + phases)}); "
+              f"output in {batch_dir}")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(scan_tenant, task): task for task in tasks}
+            for future in as_completed(futures):
+                task = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # The worker process died before it could report
+                    result = {'url': task['url'], 'folder': task['folder'], 'status': 'failed',
+                              'error': f"{type(e).__name__}: {str(e)}"}
+                results[task['url']] = result
+                if batch_status:
+                    batch_status.finish(task['url'], result['status'])
+                outcome = (f"{result.get('models', 0)} models in {result.get('seconds', 0):.0f}s"
+                           if result['status'] == 'ok' else result['error'].splitlines()[0])
+                print(f"[{len(results)}/{len(urls)}] {task['url']}: {result['status']} - {outcome}")
+    
+    summary = {
+        'schema': BATCH_SCHEMA,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'tenants_file': os.path.abspath(tenants_file),
+        'workers': workers if tasks else 0,
+        'phases': ['forms'] + phases,
+        'variants': list(variants),
+        'seconds': round(time.perf_counter() - start, 1),
+        'tenants': [results[url] for url in urls],
+    }
+    timestamp_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = os.path.join(batch_dir, f'fluxx_batch_{timestamp_str}.json')
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    
+    print_divider()
+    print(f"{'Tenant':<40} {'Status':<8} {'Models':>7} {'Failures':>9} {'Changes':>8} {'Seconds':>8}")
+    for result in summary['tenants']:
+        changes = result.get('changes')
+        changed = sum(changes.values()) if changes else '-'
+        print(f"{result['folder'][:40]:<40} {result['status']:<8} {result.get('models', '-'):>7} "
+              f"{result.get('failures', '-'):>9} {changed:>8} {result.get('seconds', '-'):>8}")
+    ok = sum(1 for result in summary['tenants'] if result['status'] == 'ok')
+    print(f"\n{ok} of {len(urls)} tenants scanned in {summary['seconds']:.0f}s")
+    print(f"Batch summary saved to: {filename}")
+    return summary
+
+# Sharded Scan Reference:
+#
+# A very large tenant can be scanned by several machines at once:
+# 1. --manifest SCAN_JSONL --shards N turns the Forms phase of a saved scan
+#    into fluxx_manifest_<timestamp>.json. Models are assigned to shards by
+#    weight (1 + their theme count), heaviest first, each to the lightest
+#    shard so far; ties go by model name, so the same scan and shard count
+#    always give the same manifest.
+# 2. --scan-shard MANIFEST --shard K (1..N) on any machine logs in (reusing a
+#    saved login if there is one), parses the Forms tree and scans only shard
+#    K's models through the manifest's phases. The result is an ordinary scan
+#    export, fluxx_shard_<K>of<N>_<timestamp>.jsonl, ending in a shard record:
+#      {record: 'shard', manifest, shard, shards, models, missing, failed_models,
+#       completed}
+#    An export without the shard record was interrupted and is not merged.
+# 3. --merge-shards MANIFEST PARTIAL... combines the partial exports into one
+#    fluxx_scan_<timestamp>.jsonl (phase 'merge') and generates the document
+#    from it as --from-scan does. Each model is taken from its own shard's
+#    export in manifest order; if a shard was scanned more than once the
+#    newest export wins (ties by file name), so the merged records do not
+#    depend on the order of the files. Models of missing shards keep their
+#    Forms data from the manifest.
+#
+# Manifest: {schema: 'fluxx-manifest', version, id, created, site_url, scan,
+#            shards, phases, models: [{name, shard, weight, data}]}
+# id is a hash of the site, phases and assignment; partials from another
+# manifest are rejected.
+
+MANIFEST_SCHEMA = 'fluxx-manifest'
+MANIFEST_SCHEMA_VERSION = 1
+
+def assign_shards(models_data, shards):
+    """Return {model: shard number}, balancing model weight across the shards"""
+    weights = {name: 1 + len(model_data.get('themes', {})) for name, model_data in models_data.items()}
+    loads = [(0, shard) for shard in range(1, shards + 1)]
+    heapq.heapify(loads)
+    assignment = {}
+    for name in sorted(weights, key=lambda name: (-weights[name], name)):
+        load, shard = heapq.heappop(loads)
+        assignment[name] = shard
+        heapq.heappush(loads, (load + weights[name], shard))
+    return assignment
 
-def generate_word_document(models_data, site_url=None):
-    """Generate a Word document using the Social Edge template format"""
+def write_shard_manifest(scan_file, shards, phases=None, filename=None):
+    """Split the models of a saved scan into a shard manifest and return its filename"""
+    models_data, header = load_scan_export(scan_file)
+    if not models_data:
+        raise ValueError(f"{scan_file} has no models")
+    shards = max(1, min(shards, len(models_data)))
+    phases = [phase for phase in BATCH_PHASES if phase in (phases or BATCH_PHASES)]
+    assignment = assign_shards(models_data, shards)
+    manifest = {
+        'schema': MANIFEST_SCHEMA,
+        'version': MANIFEST_SCHEMA_VERSION,
+        'id': content_hash([header.get('site_url'), phases, sorted(assignment.items())]),
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'site_url': header.get('site_url'),
+        'scan': os.path.basename(scan_file),
+        'shards': shards,
+        'phases': phases,
+        'models': [{'name': name, 'shard': assignment[name], 'weight': 1 + len(model_data.get('themes', {})),
+                    'data': export_model_record({
+                        'type': model_data.get('type'), 'is_dynamic': model_data.get('is_dynamic'),
+                        'themes': {theme: {'views': theme_data.get('views', [])}
+                                   for theme, theme_data in model_data.get('themes', {}).items()}})}
+                   for name, model_data in models_data.items()],
+    }
+    timestamp_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = filename or f'fluxx_manifest_{timestamp_str}.json'
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    
+    print(f"{len(models_data)} models of {manifest['site_url']} split into {shards} shards "
+          f"({', '.join(['forms'] + phases)}):")
+    for shard in range(1, shards + 1):
+        entries = [entry for entry in manifest['models'] if entry['shard'] == shard]
+        print(f"  shard {shard}: {len(entries)} models, weight {sum(entry['weight'] for entry in entries)}")
+    print(f"\nManifest saved to: {filename}")
+    print(f'Scan each shard with: --scan-shard {filename} --shard K')
+    return filename
+
+def load_shard_manifest(filename):
+    """Load a shard manifest, checking its schema"""
+    with open(filename, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('schema') != MANIFEST_SCHEMA:
+        raise ValueError(f"{filename} is not a shard manifest")
+    if manifest.get('version', 0) > MANIFEST_SCHEMA_VERSION:
+        raise ValueError(f"{filename} uses manifest version {manifest['version']}; "
+                         f"this tool reads up to version {MANIFEST_SCHEMA_VERSION}")
+    return manifest
+
+def scan_shard(manifest_file, shard, headless=False):
+    """Scan one shard of a manifest on this machine and return the partial export's filename"""
+    manifest = load_shard_manifest(manifest_file)
+    if not 1 <= shard <= manifest['shards']:
+        raise ValueError(f"--shard must be between 1 and {manifest['shards']}")
+    url = manifest['site_url']
+    assigned = [entry['name'] for entry in manifest['models'] if entry['shard'] == shard]
+    print(f"Scanning shard {shard} of {manifest['shards']}: {len(assigned)} models of {url}")
+    
+    TIMEOUT_PROFILE.load(url)
+    RETRY_POLICY.reset()
+    SCAN_METRICS.reset(url)
+    temp_dir = os.path.join(os.getcwd(), 'chrome_temp')
+    session = BrowserSession(url, temp_dir, headless=headless)
+    exporter = None
     try:
-        # Create document
-        doc = Document()
-        
-        # Set standard margins (1 inch = 1440 twips)
-        sections = doc.sections
-        for section in sections:
-            section.left_margin = int(1.25 * 1440)  # 1.25 inch left margin
-            section.right_margin = int(1.25 * 1440)  # 1.25 inch right margin
-            section.top_margin = int(1.25 * 1440)  # 1.25 inch top margin
-            section.bottom_margin = int(1.25 * 1440)  # 1.25 inch bottom margin
-            # Set page dimensions
-            section.page_width = Pt(8.5 * 72)  # 8.5 inches
-            section.page_height = Pt(11 * 72)  # 11 inches
-        
-        # Set default font and paragraph styles
-        style = doc.styles['Normal']
-        style.font.name = 'Calibri'
-        style.font.size = Pt(11)
-        style.paragraph_format.space_before = Pt(12)  # Space before paragraphs
-        style.paragraph_format.space_after = Pt(12)   # Space after paragraphs
-        style.paragraph_format.line_spacing = 1.15    # Line spacing
-        
-        # Update heading styles
-        heading1 = doc.styles['Heading 1']
-        heading1.font.name = 'Calibri'
-        heading1.font.size = Pt(16)
-        heading1.font.bold = True
-        heading1.paragraph_format.space_before = Pt(24)  # Extra space before H1
-        heading1.paragraph_format.space_after = Pt(12)
-        
-        heading2 = doc.styles['Heading 2']
-        heading2.font.name = 'Calibri'
-        heading2.font.size = Pt(14)
-        heading2.font.bold = True
-        heading2.paragraph_format.space_before = Pt(18)  # Space before H2
-        heading2.paragraph_format.space_after = Pt(12)
-        
-        # Add title with proper spacing
-        title = doc.add_heading('Fluxx Build Documentation', 0)
-        title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        title.paragraph_format.space_before = Pt(36)  # Extra space at top
-        title.paragraph_format.space_after = Pt(24)
-        
-        # Add subtitle with URL if provided
-        if site_url:
-            subtitle = doc.add_paragraph()
-            subtitle.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            subtitle.paragraph_format.space_before = Pt(12)
-            subtitle.paragraph_format.space_after = Pt(24)
-            subtitle_text = subtitle.add_run(f"Generated for: {site_url}")
-            subtitle_text.font.size = Pt(12)
-            subtitle_text.font.name = 'Calibri'
-            
-        # Add generation timestamp
-        timestamp = doc.add_paragraph()
-        timestamp.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        timestamp.paragraph_format.space_before = Pt(12)
-        timestamp.paragraph_format.space_after = Pt(36)  # Extra space after header
-        timestamp_text = timestamp.add_run(f"Generated on: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        timestamp_text.font.size = Pt(10)
-        timestamp_text.font.name = 'Calibri'
-        
-        doc.add_page_break()
+        if os.path.exists(session_cookie_path(url)):
+            restore_session_cookies(session.driver, url)
+        else:
+            session.get(url)
+        if not wait_for_dashboard(session):
+            print("\nError: Could not detect dashboard load.")
+            return None
+        session.save_cookies()
+        if not navigate_to_admin(session):
+            print("\nError: Could not navigate to Admin Panel.")
+            return None
         
-        # Process each model
-        for model_name, model_data in models_data.items():
-            try:
-                # Add spacing before model section
-                doc.add_paragraph().paragraph_format.space_before = Pt(24)
-                
-                # Create table with specific width and center alignment
-                table = doc.add_table(rows=9, cols=2)
-                table.style = 'Table Grid'
-                table.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                
-                # Set table width to 90% of page width
-                section = doc.sections[0]
-                available_width = section.page_width - (section.left_margin + section.right_margin)
-                table_width = int(available_width * 0.9)
-                table.width = table_width
-                
-                # Set column widths (30% for labels, 70% for content)
-                for i, width in enumerate([0.3, 0.7]):
-                    for cell in table.columns[i].cells:
-                        cell.width = int(table_width * width)
-                
-                # Define all row titles with their indices
-                row_titles = {
-                    0: 'Model Name',  # Header row
-                    1: 'Themes:',
-                    2: 'Workflow:',
-                    4: 'Method:',
-                    5: 'Before New / After Create:',
-                    6: 'Before Validation / After Enter / Guard Instructions:',
-                    7: 'Documents:',
-                    8: 'Embedded Cards / Dynamic Relationships:'
-                }
-                
-                # Set up all row titles and initialize empty cells
-                for row_idx, title in row_titles.items():
-                    if row_idx > 0:  # Skip header row
-                        cell = table.rows[row_idx].cells[0]
-                        cell.text = title
-                        cell.paragraphs[0].runs[0].bold = True
-                        cell.paragraphs[0].runs[0].font.name = 'Calibri'
-                        # Initialize empty content cell
-                        table.rows[row_idx].cells[1].text = ''
-                
-                # Model header (row 0)
-                header_row = table.rows[0]
-                header_row.cells[0].merge(header_row.cells[1])
-                model_type = model_data.get('type', '')
-                is_dynamic = model_data.get('is_dynamic', False)
-                header_text = model_name
-                if model_type:
-                    header_text += f" ({model_type})"
-                if is_dynamic:
-                    header_text += " - Dynamic Model"
-                header_cell = header_row.cells[0]
-                header_para = header_cell.paragraphs[0]
-                header_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                header_run = header_para.add_run(header_text)
-                header_run.font.bold = True
-                header_run.font.size = Pt(14)
-                header_run.font.name = 'Calibri'
-                
-                # Process themes (row 1)
-                themes = model_data.get('themes', {})
-                theme_text = [f"{len(themes)} Themes Built"]
-                for theme_name, theme_data in themes.items():
-                    theme_line = [f"\n{theme_name}"]
-                    views = theme_data.get('views', [])
-                    for view in views:
-                        theme_line.append(f"- {view}")
-                    theme_text.append('\n'.join(theme_line))
-                table.rows[1].cells[1].text = '\n'.join(theme_text)
-                
-                # Process workflows (row 2)
-                workflow_data = model_data.get('workflow', {})
-                if isinstance(workflow_data, dict):
-                    themes = workflow_data.get('themes', {})
-                    if themes:
-                        workflow_text = []
-                        for theme_name, theme_data in themes.items():
-                            if isinstance(theme_data, dict):
-                                states = theme_data.get('states', [])
-                                if states:
-                                    workflow_text.append(f"\nTheme: {theme_name}")
-                                    for state in states:
-                                        if isinstance(state, dict):
-                                            display_name = state.get('display_name', '')
-                                            internal_name = state.get('internal_name', '')
-                                            workflow_text.append(f"• {display_name} ({internal_name})")
-                                            
-                                            actions = state.get('actions', [])
-                                            for action in actions:
-                                                if isinstance(action, dict):
-                                                    action_text = f"  - {action.get('name', '')}"
-                                                    to_state = action.get('to_state')
-                                                    if to_state:
-                                                        action_text += f" [To State -> {to_state}]"
-                                                    workflow_text.append(action_text)
-                        
-                        if workflow_text:
-                            workflow_cell = table.rows[2].cells[1]
-                            workflow_cell.text = ''
-                            for line in workflow_text:
-                                para = workflow_cell.add_paragraph()
-                                if line.startswith('\nTheme:'):
-                                    run = para.add_run(line.strip())
-                                    run.bold = True
-                                elif line.startswith('  -'):
-                                    run = para.add_run(line)
-                                    run.font.size = Pt(9)
-                                    run.font.italic = True
-                                    run.font.color.rgb = RGBColor(128, 128, 128)
-                                else:
-                                    run = para.add_run(line)
-                                para.paragraph_format.space_after = Pt(0)
-                                para.paragraph_format.space_before = Pt(0)
-                    else:
-                        table.rows[2].cells[1].text = "No workflow states configured"
-                else:
-                    table.rows[2].cells[1].text = "No workflow configuration"
-                
-                # Process Before New / After Create (row 5)
-                before_after_cell = table.rows[5].cells[1]
-                code_text = []
-                
-                # Get themes from model data
-                themes = model_data.get('themes', {})
-                if themes:
-                    has_code = False
-                    for theme_name, theme_data in themes.items():
-                        if isinstance(theme_data, dict):
-                            theme_code = theme_data.get('code', {})
-                            if theme_code:
-                                theme_has_code = False
-                                # Order blocks consistently
-                                block_order = [
-                                    ('current_before_new', 'Current Before New Block'),
-                                    ('draft_before_new', 'Draft Before New Block'),
-                                    ('current_after_create', 'Current After Create Block'),
-                                    ('draft_after_create', 'Draft After Create Block')
-                                ]
-                                
-                                for block_key, block_label in block_order:
-                                    if block_key in theme_code and theme_code[block_key] and theme_code[block_key] != "N/A":
-                                        if not theme_has_code:
-                                            code_text.append(f"\nTheme: {theme_name}")
-                                            theme_has_code = True
-                                            has_code = True
-                                        code_text.append(f"\n{block_label}:")
-                                        code_text.append(theme_code[block_key])
-                    
-                    if not has_code:
-                        code_text = ["No Before New or After Create blocks configured"]
-                else:
-                    code_text = ["No themes configured"]
-                
-                # Write to cell with proper formatting
-                before_after_cell.text = ''  # Clear existing text
-                for line in code_text:
-                    para = before_after_cell.add_paragraph()
-                    if line.startswith('\nTheme:'):
-                        run = para.add_run(line.strip())
-                        run.bold = True
-                    elif line.endswith('Block:'):
-                        run = para.add_run(line)
-                        run.italic = True
-                    elif line.startswith('No '):  # Handle "No blocks configured" messages
-                        run = para.add_run(line)
-                        run.italic = True
-                    else:
-                        run = para.add_run(line)
-                        run.font.name = 'Consolas'
-                        run.font.size = Pt(9)
-                        run.font.color.rgb = RGBColor(128, 128, 128)
-                    para.paragraph_format.space_after = Pt(0)
-                    para.paragraph_format.space_before = Pt(0)
-                
-                # Process validation blocks and guard instructions (row 6)
-                validation_cell = table.rows[6].cells[1]
-                if isinstance(workflow_data, dict):
-                    themes = workflow_data.get('themes', {})
-                    if themes:
-                        validation_text = []
-                        validation_text.append("VALIDATION BLOCKS:")
-                        
-                        # Process validation blocks
-                        for theme_name, theme_data in themes.items():
-                            if isinstance(theme_data, dict):
-                                states = theme_data.get('states', [])
-                                if states:
-                                    has_validation = False
-                                    for state in states:
-                                        if isinstance(state, dict):
-                                            validation_blocks = state.get('validation_blocks', {})
-                                            if validation_blocks:
-                                                if not has_validation:
-                                                    validation_text.append(f"\nTheme: {theme_name}")
-                                                    has_validation = True
-                                                
-                                                display_name = state.get('display_name', '')
-                                                internal_name = state.get('internal_name', '')
-                                                validation_text.append(f"\nState: {display_name} ({internal_name})")
-                                                
-                                                # Order validation blocks consistently
-                                                block_order = [
-                                                    ('current_before_validation', 'Current Before Validation'),
-                                                    ('draft_before_validation', 'Draft Before Validation'),
-                                                    ('current_after_enter', 'Current After Enter'),
-                                                    ('draft_after_enter', 'Draft After Enter')
-                                                ]
-                                                
-                                                for block_key, block_label in block_order:
-                                                    if block_key in validation_blocks and validation_blocks[block_key]:
-                                                        validation_text.append(f"\n{block_label}:")
-                                                        validation_text.append(validation_blocks[block_key])
-                                
-                                # Process guard instructions
-                                has_guards = False
-                                guard_text = ["\nGUARD INSTRUCTIONS:"]
-                                
-                                for theme_name, theme_data in themes.items():
-                                    if isinstance(theme_data, dict):
-                                        states = theme_data.get('states', [])
-                                        if states:
-                                            theme_has_guards = False
-                                            for state in states:
-                                                if isinstance(state, dict):
-                                                    actions = state.get('actions', [])
-                                                    for action in actions:
-                                                        if isinstance(action, dict):
-                                                            guard = action.get('guard_instructions')
-                                                            draft_guard = action.get('draft_guard')
-                                                            
-                                                            if guard or draft_guard:
-                                                                if not theme_has_guards:
-                                                                    guard_text.append(f"\nTheme: {theme_name}")
-                                                                    theme_has_guards = True
-                                                                    has_guards = True
-                                                                
-                                                                display_name = state.get('display_name', '')
-                                                                internal_name = state.get('internal_name', '')
-                                                                action_name = action.get('name', '')
-                                                                
-                                                                if guard:
-                                                                    guard_text.append(f"\nGuard Instructions for {action_name} in {display_name} ({internal_name}):")
-                                                                    guard_text.append(guard)
-                                                                if draft_guard:
-                                                                    guard_text.append(f"\nDraft Guard Instructions for {action_name} in {display_name} ({internal_name}):")
-                                                                    guard_text.append(draft_guard)
-                                
-                                if has_guards:
-                                    validation_text.extend(guard_text)
-                                
-                                if len(validation_text) > 1:
-                                    validation_cell.text = ''
-                                    for line in validation_text:
-                                        para = validation_cell.add_paragraph()
-                                        if line.endswith('BLOCKS:') or line.endswith('INSTRUCTIONS:'):
-                                            run = para.add_run(line)
-                                            run.bold = True
-                                        elif line.startswith('\nTheme:'):
-                                            run = para.add_run(line.strip())
-                                            run.bold = True
-                                        elif line.startswith('\nGuard Instructions for') or line.endswith('Block:'):
-                                            run = para.add_run(line)
-                                            run.italic = True
-                                        elif line.startswith('\nState:'):
-                                            run = para.add_run(line)
-                                            run.bold = True
-                                            run.italic = True
-                                        else:
-                                            run = para.add_run(line)
-                                            run.font.name = 'Consolas'
-                                            run.font.size = Pt(9)
-                                            run.font.color.rgb = RGBColor(128, 128, 128)
-                                        para.paragraph_format.space_after = Pt(0)
-                                        para.paragraph_format.space_before = Pt(0)
-                                else:
-                                    validation_cell.text = "No validation blocks or guard instructions configured"
-                            else:
-                                validation_cell.text = "No workflow configuration"
-                        else:
-                            validation_cell.text = "No workflow configuration"
-                    else:
-                        validation_cell.text = "No workflow configuration"
-                else:
-                    validation_cell.text = "No workflow configuration"
-                
-                # Rows 3, 4, 7, and 8 remain empty for user input
-                
-                # Add spacing after table
-                doc.add_paragraph().paragraph_format.space_after = Pt(24)
-                
-                # Add page break between models
-                if model_name != list(models_data.keys())[-1]:
-                    doc.add_page_break()
-                    
-                # Process methods (row 4)
-                methods = model_data.get('methods', [])
-                if methods:
-                    methods_cell = table.rows[4].cells[1]
-                    methods_cell.text = ''  # Clear existing text
-                    
-                    # Add header showing total methods count
-                    header_para = methods_cell.add_paragraph()
-                    header_run = header_para.add_run(f"{len(methods)} Methods Found")
-                    header_run.bold = True
-                    
-                    # Process each method
-                    for method in methods:
-                        if isinstance(method, dict):
-                            # Add method name and type
-                            name_para = methods_cell.add_paragraph()
-                            name_para.paragraph_format.space_before = Pt(12)
-                            name_run = name_para.add_run(f"\n{method.get('name', '')}")
-                            name_run.bold = True
-                            if method.get('type'):
-                                type_run = name_para.add_run(f" ({method.get('type')})")
-                                type_run.italic = True
-                            
-                            # Add current code if exists
-                            if method.get('current_code'):
-                                code_para = methods_cell.add_paragraph()
-                                code_para.paragraph_format.space_before = Pt(6)
-                                code_run = code_para.add_run("Current Code:")
-                                code_run.italic = True
-                                code_para = methods_cell.add_paragraph()
-                                code_run = code_para.add_run(method['current_code'])
-                                code_run.font.name = 'Consolas'
-                                code_run.font.size = Pt(9)
-                                code_run.font.color.rgb = RGBColor(128, 128, 128)
-                            
-                            # Add draft code if exists
-                            if method.get('draft_code'):
-                                draft_para = methods_cell.add_paragraph()
-                                draft_para.paragraph_format.space_before = Pt(6)
-                                draft_run = draft_para.add_run("Draft Code:")
-                                draft_run.italic = True
-                                draft_para = methods_cell.add_paragraph()
-                                draft_run = draft_para.add_run(method['draft_code'])
-                                draft_run.font.name = 'Consolas'
-                                draft_run.font.size = Pt(9)
-                                draft_run.font.color.rgb = RGBColor(128, 128, 128)
-                else:
-                    table.rows[4].cells[1].text = "No methods found"
-                
-            except Exception as e:
-                print(f"\nError processing model {model_name}: {str(e)}")
-                continue
+        # The Forms tree is parsed again so every model in it is loaded on the page
+        extractors = ExtractorSelector(session)
+        forms = wait_for_forms_and_parse(session, extractors=extractors, confirm=False) or {}
+        models_data = {name: forms[name] for name in assigned if name in forms}
+        missing = [name for name in assigned if name not in forms]
+        if missing:
+            print(f"\n{len(missing)} models of this shard are no longer on the Forms dashboard: "
+                  f"{', '.join(missing[:10])}{' ...' if len(missing) > 10 else ''}")
         
-        # Save document
         timestamp_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f'fluxx_documentation_{timestamp_str}.docx'
-        doc.save(filename)
-        print(f"\nWord document saved as: {filename}")
-        return filename
-        
-    except Exception as e:
-        print(f"\nError generating Word document: {str(e)}")
+        exporter = ScanExporter(url, f"fluxx_shard_{shard}of{manifest['shards']}_{timestamp_str}.jsonl")
+        exporter.write_phase('forms', models_data)
+        models_data = run_scan_phases(session, models_data, manifest['phases'], extractors, exporter)
+        print_failure_report()
+        write_scan_metrics()
+        exporter.write_shard({
+            'manifest': manifest['id'],
+            'shard': shard,
+            'shards': manifest['shards'],
+            'models': len(models_data),
+            'missing': missing,
+            'failed_models': [name for name in RETRY_POLICY.failed_models() if name in models_data],
+            'completed': datetime.datetime.now().isoformat(timespec='seconds'),
+        })
+        print(f"\nShard {shard} saved to: {exporter.filename}")
+        return exporter.filename
+    finally:
+        TIMEOUT_PROFILE.save()
+        if exporter:
+            exporter.close()
+        session.quit()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def read_shard_record(filename):
+    """Return (header, shard record) of a partial export; the record is None if the shard did not finish"""
+    header = shard_record = None
+    with open(filename, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if header is None:
+                header = record
+            elif record.get('record') == 'shard':
+                shard_record = record
+    return header, shard_record
+
+def merge_shards(manifest_file, partial_files):
+    """Combine shard exports into one models_data in manifest order; returns (models_data, report)"""
+    manifest = load_shard_manifest(manifest_file)
+    chosen = {}  # shard -> (created, filename, shard record)
+    skipped = []
+    for filename in partial_files:
+        header, shard_record = read_shard_record(filename)
+        if shard_record is None:
+            skipped.append({'file': filename, 'reason': 'no shard record (the scan did not finish)'})
+        elif shard_record.get('manifest') != manifest['id']:
+            skipped.append({'file': filename, 'reason': 'written for a different manifest'})
+        else:
+            candidate = (header.get('created') or '', os.path.basename(filename), filename, shard_record)
+            current = chosen.get(shard_record['shard'])
+            if current is None or candidate[:2] > current[:2]:
+                chosen[shard_record['shard']] = candidate
+    
+    partials = {shard: load_scan_export(candidate[2])[0] for shard, candidate in chosen.items()}
+    models_data = {}
+    unscanned = []
+    for entry in manifest['models']:
+        model_data = partials.get(entry['shard'], {}).get(entry['name'])
+        if model_data is None:
+            # Keep the model's Forms data so the document still lists it
+            model_data = import_model_record(entry['data'])
+            unscanned.append(entry['name'])
+        models_data[entry['name']] = model_data
+    report = {
+        'shards': {shard: os.path.basename(candidate[2]) for shard, candidate in sorted(chosen.items())},
+        'missing_shards': [shard for shard in range(1, manifest['shards'] + 1) if shard not in chosen],
+        'unscanned_models': unscanned,
+        'failed_models': sorted(name for candidate in chosen.values() for name in candidate[3].get('failed_models', [])),
+        'skipped_files': skipped,
+    }
+    return models_data, report
+
+def run_merge_shards(manifest_file, partial_files, variants=None):
+    """Merge shard exports into one scan export and generate the documentation from it without prompts"""
+    manifest = load_shard_manifest(manifest_file)
+    models_data, report = merge_shards(manifest_file, partial_files)
+    for entry in report['skipped_files']:
+        print(f"Skipping {entry['file']}: {entry['reason']}")
+    print(f"Merged {len(report['shards'])} of {manifest['shards']} shards ({len(models_data)} models)")
+    if report['missing_shards']:
+        print(f"Missing shards: {', '.join(map(str, report['missing_shards']))}; their models have Forms data only")
+    elif report['unscanned_models']:
+        print(f"{len(report['unscanned_models'])} models were not on the Forms dashboard when their shard was "
+              f"scanned and have Forms data only")
+    if report['failed_models']:
+        print(f"{len(report['failed_models'])} models had fetch failures on their shard: "
+              f"{', '.join(report['failed_models'][:10])}{' ...' if len(report['failed_models']) > 10 else ''}")
+    
+    link_references(models_data)
+    exporter = ScanExporter(manifest['site_url'])
+    try:
+        exporter.write_phase('merge', models_data)
+        exporter.write_references(models_data)
+    finally:
+        exporter.close()
+    print(f"Merged scan saved to: {exporter.filename}")
+    update_code_index(models_data, manifest['site_url'], exporter.filename)
+    run_from_scan(exporter.filename, tuple(variants or ('internal',)))
+    return exporter.filename
+
+def replay_trace(filename, save=True):
+    """Run the scan steps recorded in a trace against its responses and report how it went"""
+    SESSION_TRACE.load(filename)
+    opened = next((mark for mark in SESSION_TRACE.marks if mark['m'] == 'open'), None)
+    if opened is None:
+        print(f"{filename} has no recorded scan to replay.")
         return None
+    url = opened['url']
+    print(f"Replaying {len(SESSION_TRACE.records):,} recorded responses from {url}")
+    profile_root = tempfile.mkdtemp(prefix='fluxx_replay_')
+    start = time.perf_counter()
+    session = BrowserSession(url, profile_root, driver_factory=lambda profile_dir, headless=False: ReplayDriver(SESSION_TRACE))
+    models_data = {}
+    capture = None
+    try:
+        # The same opening steps main() takes, with the cookies kept out of the sessions folder
+        session.get(url)
+        session.current_url
+        wait_for_dashboard(session)
+        session.cookie_path = save_session_cookies(session.driver, url, os.path.join(profile_root, 'cookies.json'))
+        navigate_to_admin(session)
+        extractors = ExtractorSelector(session)
+        for mark in SESSION_TRACE.marks:
+            step, names = mark['m'], mark.get('models')
+            data = models_data if names is None else {name: models_data[name] for name in names if name in models_data}
+            if step == 'forms' and names is not None:
+                models_data.update(wait_for_forms_and_parse(session, extractors=extractors, confirm=False,
+                                                            only=names) or {})
+            elif step == 'forms':
+                models_data = wait_for_forms_and_parse(session, extractors=extractors, confirm=False) or {}
+            elif step == 'capture':
+                capture = NetworkCapture(session)
+                capture.start()
+                session.recycle_callbacks.append(capture.start)
+            elif step == 'navigate_forms':
+                navigate_to_forms(session)
+            elif step == 'code':
+                data = gather_theme_code(session, data, extractors, confirm=False)
+            elif step == 'methods':
+                data = scan_methods(session, data, capture, extractors, confirm=False)
+            elif step == 'workflow':
+                data = scan_model_workflows(session, data, capture, extractors, confirm=False)
+            if step in ('code', 'methods', 'workflow') and names is None:
+                models_data = data
+    except TraceMismatch as e:
+        # The scan left the recorded path somewhere a phase does not catch it
+        print(f"\nReplay stopped: {e.msg}")
+    finally:
+        session.quit()
+        shutil.rmtree(profile_root, ignore_errors=True)
+    elapsed = time.perf_counter() - start
+    
+    print_divider()
+    print(f"Replayed {SESSION_TRACE.position:,} of {len(SESSION_TRACE.records):,} responses in {elapsed:.2f}s "
+          f"({session.command_count:,} WebDriver commands, {len(models_data)} models)")
+    if SESSION_TRACE.mismatches:
+        print(f"{len(SESSION_TRACE.mismatches)} commands did not match the trace; the first ones:")
+        for mismatch in SESSION_TRACE.mismatches[:5]:
+            print(f"  at #{mismatch['position']}: sent {mismatch['sent']} {json.dumps(mismatch['params'])[:120]}, "
+                  f"expected {mismatch['expected']}")
+    if save and models_data:
+        timestamp_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        exporter = ScanExporter(url, f'fluxx_replay_{timestamp_str}.jsonl')
+        try:
+            exporter.write_phase('replay', models_data)
+        finally:
+            exporter.close()
+        print(f"Replayed scan saved to: {exporter.filename}")
+    return models_data
+
+def run_from_scan(filename, variants=None):
+    """Generate documentation from a saved scan export without opening a browser
+
+    Given variants, it writes a single document per variant without asking about the layout.
+    """
+    models_data, header = load_scan_export(filename)
+    print(f"Loaded {len(models_data)} models scanned from {header.get('site_url') or 'unknown site'} "
+          f"on {header.get('created')}")
+    if not any('references' in model_data for model_data in models_data.values()):
+        # Exports written before cross-references existed
+        link_references(models_data)
+    changes = compare_with_previous_scan(models_data, header.get('site_url'), filename, header.get('created'))
+    if variants:
+        split, appendix, site_format = None, False, None
+    else:
+        variants = choose_variants()
+        split, appendix = choose_layout()
+        site_format = choose_site_format()
+    doc_filenames = wait_with_spinner(
+        "Generating Word document...",
+        generate_word_variants,
+        models_data,
+        site_url=header.get('site_url'),
+        variants=variants,
+        split=split,
+        appendix=appendix,
+        changes=changes
+    )
+    for doc_filename in doc_filenames:
+        if doc_filename:
+            print(f"\nDocumentation has been saved to: {doc_filename}")
+    if site_format:
+        for variant in variants:
+            generate_static_site(models_data, header.get('site_url'), site_format, variant)
+
+def parse_args(argv=None):
+    """Parse command line options; with none the interactive scan runs"""
+    parser = argparse.ArgumentParser(description="Fluxx Build Documentation Tool")
+    parser.add_argument('--from-scan', metavar='SCAN_JSONL',
+                        help="generate the Word document from a saved scan export instead of scanning")
+    parser.add_argument('--diff', metavar='SCAN_JSONL', nargs='+',
+                        help="compare two saved scans (OLD NEW), or one scan with the previous scan of its site")
+    parser.add_argument('--url', help="scan this address as-is instead of asking for a Fluxx instance")
+    parser.add_argument('--headless', action='store_true', help="run Chrome without a window")
+    parser.add_argument('--status-port', type=int, metavar='PORT',
+                        help=f"serve live scan progress on http://127.0.0.1:PORT/status and /metrics "
+                             f"(e.g. {STATUS_SERVER_PORT})")
+    parser.add_argument('--profile', action='store_true',
+                        help="profile each phase with cProfile and tracemalloc into a fluxx_profile_<time> folder")
+    parser.add_argument('--profile-commands', action='store_true',
+                        help="time every WebDriver command by the code that sent it and print a summary at exit")
+    trace = parser.add_argument_group("session trace")
+    trace.add_argument('--record-trace', metavar='TRACE', nargs='?', const='',
+                       help="record every WebDriver command and response of the scan (default fluxx_trace_<time>.jsonl.gz)")
+    trace.add_argument('--redact', action='store_true', help="leave cookies, typed text and email addresses out of the trace")
+    trace.add_argument('--replay-trace', metavar='TRACE', help="run the recorded scan against a trace without a browser")
+    mock = parser.add_argument_group("mock server")
+    mock.add_argument('--mock-server', metavar='SCAN_JSONL', nargs='?', const='',
+                      help="serve a saved scan (or a built-in sample tenant) as a local Fluxx admin panel")
+    mock.add_argument('--mock-port', type=int, default=MOCK_SERVER_PORT, help="mock server port")
+    mock.add_argument('--mock-latency', type=float, default=MOCK_SERVER_LATENCY,
+                      help="seconds the mock server waits before every response")
+    synthetic = parser.add_argument_group("synthetic tenant")
+    synthetic.add_argument('--generate-tenant', metavar='MODELS', type=int,
+                           help="generate a synthetic tenant with this many models and save it as a scan export "
+                                "(or serve it with --mock-server)")
+    synthetic.add_argument('--themes', type=int, default=3, help="themes per model")
+    synthetic.add_argument('--views', type=int, default=4, help="views per theme")
+    synthetic.add_argument('--methods', type=int, default=5, help="methods per model")
+    synthetic.add_argument('--states', type=int, default=6, help="workflow states per model (0 for none)")
+    synthetic.add_argument('--actions', type=int, default=2, help="average actions per workflow state")
+    synthetic.add_argument('--code-lines', type=int, default=20, help="average lines per code block")
+    synthetic.add_argument('--duplication', type=float, default=0.3, help="share of code blocks copied from earlier ones")
+    synthetic.add_argument('--seed', type=int, default=0, help="random seed")
+    batch = parser.add_argument_group("batch")
+    batch.add_argument('--batch', metavar='TENANTS_FILE',
+                       help="scan and document every tenant listed in the file (one URL per line) "
+                            "using their saved logins")
+    batch.add_argument('--batch-dir', default=BATCH_DIR, help="folder for the per-tenant outputs and summary")
+    batch.add_argument('--workers', type=int, default=BATCH_WORKERS, help="tenants scanned at the same time")
+    batch.add_argument('--batch-phases', nargs='+', choices=BATCH_PHASES,
+                       help="scan phases to run after Forms (default all)")
+    batch.add_argument('--variants', nargs='+', choices=list(DOC_VARIANTS),
+                       help="document variants for --batch and --merge-shards (default internal)")
+    shards = parser.add_argument_group("sharded scan")
+    shards.add_argument('--manifest', metavar='SCAN_JSONL',
+                        help="split the models of a saved scan into a shard manifest for several machines")
+    shards.add_argument('--shards', type=int, default=2, help="number of shards in the manifest")
+    shards.add_argument('--shard-phases', nargs='+', choices=BATCH_PHASES,
+                        help="scan phases each shard runs after Forms (default all)")
+    shards.add_argument('--scan-shard', metavar='MANIFEST', help="scan one shard of a manifest on this machine")
+    shards.add_argument('--shard', type=int, help="shard number to scan (1 to the number of shards)")
+    shards.add_argument('--merge-shards', metavar='FILE', nargs='+',
+                        help="merge shard scans (MANIFEST PARTIAL...) into one scan and generate the document")
+    benchmark = parser.add_argument_group("benchmark")
+    benchmark.add_argument('--benchmark', metavar='MODELS', type=int, nargs='*',
+                           help=f"scan and render synthetic tenants of these sizes from a local mock server "
+                                f"(default {' '.join(map(str, BENCHMARK_SIZES))})")
+    benchmark.add_argument('--benchmark-phases', nargs='+', choices=BENCHMARK_PHASES, help="phases to measure")
+    benchmark.add_argument('--baseline', default=BENCHMARK_BASELINE_FILE, help="benchmark baseline file")
+    benchmark.add_argument('--threshold', type=float, default=BENCHMARK_THRESHOLD,
+                           help="flag metrics that grew by more than this fraction")
+    benchmark.add_argument('--update-baseline', action='store_true', help="save this run as the baseline")
+    code_index = parser.add_argument_group("code index")
+    code_index.add_argument('--index-scan', metavar='SCAN_JSONL', nargs='+',
+                            help="add saved scan exports to the code index")
+    code_index.add_argument('--query', metavar='TERM', nargs='+', help="find code blocks containing every term")
+    code_index.add_argument('--written', metavar='FIELD', nargs='+', help="find where a field or variable is written")
+    code_index.add_argument('--called', metavar='METHOD', nargs='+', help="find where a method is called")
+    code_index.add_argument('--tenant', help="only search this tenant host (e.g. example.fluxx.io)")
+    code_index.add_argument('--all-scans', action='store_true', help="search every scan, not only the latest per tenant")
+    code_index.add_argument('--limit', type=int, default=50, help="maximum number of blocks to show")
+    code_index.add_argument('--index', default=CODE_INDEX_FILE, help="code index file")
+    args = parser.parse_args(argv)
+    if args.diff and len(args.diff) > 2:
+        parser.error("--diff takes one or two scan exports")
+    if args.shards < 1:
+        parser.error("--shards must be at least 1")
+    if args.scan_shard and args.shard is None:
+        parser.error("--scan-shard needs --shard")
+    if args.merge_shards and len(args.merge_shards) < 2:
+        parser.error("--merge-shards takes a manifest and at least one shard scan")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.generate_tenant is not None and args.mock_server:
+        parser.error("--generate-tenant serves its own tenant; use --mock-server without a scan")
+    return args
 
 def show_spinner(stop_event, message=""):
     """Show a simple spinner animation with a message"""
@@ -1719,7 +6956,7 @@ def validate_fluxx_url(url):
 def wait_for_modal_load(driver, timeout=10):
     """Wait for modal to fully load"""
     try:
-        wait = WebDriverWait(driver, timeout)
+        wait = adaptive_wait(driver, 'modal_load', timeout)
         modal = wait.until(EC.presence_of_element_located(
             (By.CSS_SELECTOR, "div.modal.new-modal.area[style*='opacity: 1']")
         ))
@@ -1735,7 +6972,7 @@ def wait_for_modal_load(driver, timeout=10):
 def safely_close_modal(driver, timeout=10):
     """Safely close the modal window"""
     try:
-        wait = WebDriverWait(driver, timeout)
+        wait = adaptive_wait(driver, 'modal_close', timeout)
         close_button = wait.until(EC.element_to_be_clickable(
             (By.CSS_SELECTOR, "a.close-modal")
         ))
@@ -1756,7 +6993,7 @@ def close_all_models(driver):
         for model in open_models:
             # Remove the open class
             driver.execute_script("arguments[0].classList.remove('open');", model)
-        time.sleep(0.5)  # Brief pause to let animations complete
+        pause(0.5)  # Brief pause to let animations complete
     except Exception as e:
         print(f"Warning: Could not close all models: {str(e)}")
 
@@ -1770,9 +7007,9 @@ def ensure_model_open(driver, model_ul, model_name):
             driver.execute_script("arguments[0].click();", model_header)
             
             # Wait for the open class to appear
-            wait = WebDriverWait(driver, 10)
+            wait = adaptive_wait(driver, 'model_open')
             wait.until(lambda d: 'open' in model_ul.get_attribute('class').split())
-            time.sleep(1)  # Additional pause to let content load
+            pause(1)  # Additional pause to let content load
             
             # Verify the model opened
             if 'open' not in model_ul.get_attribute('class').split():
@@ -1781,83 +7018,77 @@ def ensure_model_open(driver, model_ul, model_name):
     except Exception as e:
         return False
 
-def get_theme_code(driver, theme_element, model_ul, model_name):
-    """Get Before/After code for a theme"""
+def get_theme_uids(driver, model_ul):
+    """Map each theme label in a model to its stable data-card-uid in one round trip"""
+    return driver.execute_script("""
+        var uids = {};
+        arguments[0].querySelectorAll('li.icon[data-card-uid]').forEach(function (theme) {
+            var label = theme.querySelector('a.link.scroll-to-card span.label');
+            if (!label) { return; }
+            var name = label.textContent.trim();
+            if (!(name in uids)) { uids[name] = theme.getAttribute('data-card-uid'); }
+        });
+        return uids;
+    """, model_ul) or {}
+
+def get_theme_code(driver, theme_element, model_ul, model_name, extractors=None):
+    """Get Before/After code for a theme
+
+    Errors are raised so the caller's retry policy can classify them.
+    """
+    extractors = extractors or ExtractorSelector(driver)
     try:
         # Ensure model is open before processing themes
         if not ensure_model_open(driver, model_ul, model_name):
-            return None
+            raise TimeoutException(f"Model {model_name} did not open")
         
-        # Now ensure the theme is visible by clicking the theme name
-        try:
+        # Find the gear icon that opens the theme config modal
+        gear_icon = theme_element.find_element(By.CSS_SELECTOR, 
+            "a.to-modal.open-config[data-on-success='matchListItem,close']")
+
+        def open_modal():
+            # Ensure the theme is visible by clicking the theme name
             theme_link = theme_element.find_element(By.CSS_SELECTOR, 
                 "a.link.scroll-to-card")
             theme_link.click()
-            time.sleep(1)
-        except Exception as e:
-            return None
+            pause(1)
+                
+            # Wait for theme to be visible and expanded
+            wait = adaptive_wait(driver, 'theme_visible')
+            wait.until(EC.visibility_of(theme_element))
             
-        # Wait for theme to be visible and expanded
-        wait = WebDriverWait(driver, 10)
-        wait.until(EC.visibility_of(theme_element))
-        
-        # Find and click the gear icon
-        try:
-            gear_icon = theme_element.find_element(By.CSS_SELECTOR, 
-                "a.to-modal.open-config[data-on-success='matchListItem,close']")
+            # Click the gear icon
             driver.execute_script("arguments[0].scrollIntoView(true);", gear_icon)
-            time.sleep(1)
+            pause(1)
             driver.execute_script("arguments[0].click();", gear_icon)
-        except Exception as e:
-            return None
-        
-        # Wait for modal to load
-        modal = wait_for_modal_load(driver)
-        if not modal:
-            return None
             
-        # Find all code textareas with correct IDs
-        code_blocks = {
-            'current_before_new': {
-                'id': 'model_theme_unsafe_before_new_block',
-                'label': 'Current Before New Block'
-            },
-            'draft_before_new': {
-                'id': 'model_theme_draft_before_new_block',
-                'label': 'Draft Before New Block'
-            },
-            'current_after_create': {
-                'id': 'model_theme_unsafe_after_create_block',
-                'label': 'Current After Create Block'
-            },
-            'draft_after_create': {
-                'id': 'model_theme_draft_after_create_block',
-                'label': 'Draft After Create Block'
-            }
-        }
-        
-        code_data = {}
-        for key, block in code_blocks.items():
-            try:
-                textarea = modal.find_element(By.CSS_SELECTOR, f"textarea#{block['id']}")
-                code = textarea.get_attribute("value").strip()
-                code_data[key] = code if code else "N/A"
-            except:
-                code_data[key] = "N/A"
+            # Wait for modal to load
+            if wait_for_modal_load(driver) is None:
+                raise TimeoutException("Theme config modal did not load")
+            return True
+
+        context = {'href': gear_icon.get_attribute("href"), 'open': open_modal}
+        fields = extractors.extract('theme_code', context)
         
-        # Safely close the modal
-        safely_close_modal(driver)
-        return code_data
+        # Safely close the modal if one was opened
+        if context['opened']:
+            safely_close_modal(driver)
+        if fields is None:
+            return None
+
+        return {key: (fields.get(key) or "N/A") for key in EXTRACTOR_FIELDS['theme_code']['fields']}
         
-    except Exception as e:
+    except Exception:
         try:
             safely_close_modal(driver)
         except:
             pass
-        return None
+        raise
 
-def gather_theme_code(driver, models):
-    """Gather Before/After code for all themes"""
+@profiled_phase('code')
+def gather_theme_code(driver, models, extractors=None, on_model_done=None, confirm=True):
+    """Gather Before/After code for all themes; confirm=False skips the prompt"""
+    extractors = extractors or ExtractorSelector(driver)
     print("\n" + "=" * 80)
     print("\n                     Theme Code Gathering Process")
     print("\n" + "=" * 80 + "\n")
@@ -1868,19 +7099,18 @@ def gather_theme_code(driver, models):
     print("- Please do not interact with the browser while the process is running")
     print("- The browser will automatically handle all interactions")
     print("\n" + "-" * 80)
-    verify = input("\nWould you like to proceed with gathering code? (y/n): ").strip().lower()
+    verify = PHASE_PROFILER.ask("\nWould you like to proceed with gathering code? (y/n): ").strip().lower() if confirm else 'y'
     
     if verify != 'y':
         print("\nSkipping code gathering process.")
         return models
+    SCAN_METRICS.begin_phase('code', len(models))
     
     total_models = len(models)
-    current_model = 0
     
     try:
-        for model_name, model_data in models.items():
+        for current_model, model_name, model_data in scan_models(driver, models, 'Forms'):
             try:
-                current_model += 1
                 progress = (current_model / total_models) * 100
                 
                 # Update progress bar
@@ -1893,41 +7123,63 @@ def gather_theme_code(driver, models):
                 ))
                 sys.stdout.flush()
                 
-                model_ul = driver.find_element(By.CSS_SELECTOR, f"ul#{model_name.lower().replace(' ', '_')}")
+                # Restart the browser here if it has grown too large or hung
+                SCAN_METRICS.begin_model(model_name)
+                session_checkpoint(driver, 'Forms', f"theme code for {model_name}")
+                
+                model_selector = f"ul#{model_name.lower().replace(' ', '_')}"
+                scope = {}
+                
+                def open_model():
+                    scope['model_ul'] = driver.find_element(By.CSS_SELECTOR, model_selector)
+                    if not ensure_model_open(driver, scope['model_ul'], model_name):
+                        raise TimeoutException(f"Model {model_name} did not open")
+                    return True
                 
                 # Ensure model is open
-                if not ensure_model_open(driver, model_ul, model_name):
+                if not RETRY_POLICY.call(open_model, 'Forms', {'model': model_name}, resolve=open_model):
                     continue
+                model_ul = scope['model_ul']
+                
+                # Map theme names to their stable card ids once per model
+                theme_uids = get_theme_uids(driver, model_ul)
                 
                 for theme_name, theme_data in model_data['themes'].items():
-                    try:
-                        theme_elements = model_ul.find_elements(By.CSS_SELECTOR, "li.icon[data-card-uid]")
-                        
-                        for theme_element in theme_elements:
-                            try:
-                                label = theme_element.find_element(By.CSS_SELECTOR, 
-                                    "a.link.scroll-to-card span.label").text
-                                
-                                if label == theme_name:
-                                    code_data = get_theme_code(driver, theme_element, model_ul, model_name)
-                                    if code_data:
-                                        models[model_name]['themes'][theme_name]['code'] = code_data
-                            except Exception:
-                                continue
-                    except Exception:
+                    entity = {'model': model_name, 'theme': theme_name}
+                    uid = theme_uids.get(theme_name)
+                    if uid is None:
+                        RETRY_POLICY.record('Forms', entity,
+                            NoSuchElementException(f"Theme {theme_name} not found"), 1)
                         continue
+                    
+                    def fetch_code():
+                        # Re-resolve the theme by its card id on every attempt
+                        theme_element = find_by_stable_key(scope['model_ul'], "li.icon", "data-card-uid", uid)
+                        return get_theme_code(driver, theme_element, scope['model_ul'], model_name, extractors)
+                    
+                    code_data = RETRY_POLICY.call(fetch_code, 'Forms', entity, resolve=open_model)
+                    if code_data:
+                        models[model_name]['themes'][theme_name]['code'] = code_data
                 
                 # Close model after processing
                 try:
+                    model_ul = scope['model_ul']
                     if 'open' in model_ul.get_attribute('class').split():
                         model_header = model_ul.find_element(By.CSS_SELECTOR, "li.list-label div.link.is-admin")
                         driver.execute_script("arguments[0].click();", model_header)
-                        time.sleep(1)
+                        pause(1)
                 except Exception:
                     pass
                     
-            except Exception:
+            except Exception as e:
+                RETRY_POLICY.record('Forms', {'model': model_name}, e, 1)
                 continue
+            finally:
+                # The final scan phase hands each finished model to the streaming renderer
+                if on_model_done and not session_hung(driver):
+                    on_model_done(model_name)
+        
+        session_idle(driver)
         
         # Show completion
         sys.stdout.write('\r' + ' ' * 100)  # Clear line
@@ -1940,40 +7192,51 @@ def gather_theme_code(driver, models):
     except Exception as e:
         print(f"\nError during code gathering: {str(e)}")
         return models
+    finally:
+        # Close the phase however it ends, so it is not reported as running
+        SCAN_METRICS.end_phase()
+
+def choose_action(failed_count=0):
+    """Show the post-scan actions menu and return the user's choice"""
+    print_divider()
+    print("Available Actions:")
+    print("1. Generate Word document")
+    print("2. Re-run scan")
+    print("3. Exit")
+    if failed_count:
+        print(f"4. Re-scan {failed_count} failed models")
+    return input("\nEnter your choice (1-{}): ".format(4 if failed_count else 3)).strip()
 
-def main():
+def main(url=None, headless=False):
+    """Run the interactive scan; url skips the prompt (e.g. a mock server address)"""
     try:
         # Show logo and contact info
         print_logo()
         
         # Get Fluxx URL
-        url = get_fluxx_url()
+        url = url or get_fluxx_url()
         if not url:
             return
 
-        # Check Chrome setup
-        if not check_chrome_and_driver():
+        # Load the wait timeouts learned on previous runs against this tenant
+        TIMEOUT_PROFILE.load(url)
+
+        # Check Chrome setup (the bundled ChromeDriver check is Windows-only)
+        if platform.system() == 'Windows' and not check_chrome_and_driver():
             input("\nPress Enter to exit...")
             return
             
         # Setup Chrome
         print("Starting Chrome...")
-        driver_path = get_resource_path("chromedriver.exe")
-        options = webdriver.ChromeOptions()
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--log-level=3')
-        options.add_experimental_option('excludeSwitches', ['enable-logging', 'enable-automation'])
-        options.add_experimental_option('useAutomationExtension', False)
         
-        # Create temp profile
+        # Create temp profile root; each browser restart gets its own profile inside it
         temp_dir = os.path.join(os.getcwd(), 'chrome_temp')
         if not os.path.exists(temp_dir):
             os.makedirs(temp_dir)
-        options.add_argument(f'--user-data-dir={temp_dir}')
         
-        service = Service(driver_path, log_path='NUL')  # Suppress ChromeDriver logs
-        driver = webdriver.Chrome(service=service, options=options)
+        # The session restarts Chrome transparently when memory grows or an operation hangs
+        driver = BrowserSession(url, temp_dir, headless=headless)
+        SESSION_TRACE.mark('open', url=url)
         
         print(f"Navigating to {url}")
         driver.get(url)
@@ -1991,6 +7254,9 @@ def main():
             input("Press Enter to exit...")
             return
         
+        # Save the login so browser restarts can re-authenticate
+        driver.save_cookies()
+        
         print("\nDashboard detected! Navigating to Admin Panel...")
         
         # Navigate to Admin Panel
@@ -1999,10 +7265,21 @@ def main():
             input("Press Enter to exit...")
             return
         
+        # Extractor backends are probed once and reused for every scan phase
+        extractors = ExtractorSelector(driver)
+        exporter = None
+        
         # Parse the Forms section
         while True:  # Options loop
+            RETRY_POLICY.reset()
+            SCAN_METRICS.reset(url)
+            if exporter:
+                exporter.close()
+                exporter = None
+            
             # Get the data
-            models_data = wait_for_forms_and_parse(driver)
+            SESSION_TRACE.mark('forms')
+            models_data = wait_for_forms_and_parse(driver, extractors=extractors)
             if not models_data:
                 print("\nError: Could not parse Forms section.")
                 print_divider()
@@ -2013,50 +7290,155 @@ def main():
                     input("Press Enter to exit...")
                     return
             
+            # Every finished phase is appended to the scan export
+            exporter = ScanExporter(url)
+            exporter.write_phase('forms', models_data)
+            print(f"\nScan data is being saved to: {exporter.filename}")
+            
             # Ask if user wants to gather code blocks
             print("\nWould you like to gather Before/After code blocks from themes?")
             print("This step can be skipped if you only need model structure and workflows.")
             code_choice = input("Gather code blocks? (y/n): ").strip().lower()
             
-            if code_choice == 'y':
-                # Gather theme code if requested
-                models_data = gather_theme_code(driver, models_data)
-            
             # Ask if user wants to scan methods
             print("\nWould you like to scan model methods?")
             print("This will gather methods from each model's themes.")
             methods_choice = input("Scan methods? (y/n): ").strip().lower()
             
-            if methods_choice == 'y':
-                # Scan methods
-                models_data = scan_methods(driver, models_data)
-            
             # Ask if user wants to scan workflows
             print("\nWould you like to scan model workflows?")
             print("This will gather workflow states and actions for each model.")
             workflow_choice = input("Scan workflows? (y/n): ").strip().lower()
             
-            if workflow_choice == 'y':
-                # Scan workflows
-                models_data = scan_model_workflows(driver, models_data)
-
-            print_divider()
-            print("Available Actions:")
-            print("1. Generate Word document")
-            print("2. Re-run scan")
-            print("3. Exit")
+            # Ask once whether to read listings from network responses
+            capture = None
+            if methods_choice == 'y' or workflow_choice == 'y':
+                print("\nWould you like to use network capture mode?")
+                print("This reads method and workflow listings directly from the Fluxx responses")
+                print("instead of waiting for each element to render.")
+                capture_choice = input("Use network capture? (y/n): ").strip().lower()
+                if capture_choice == 'y':
+                    SESSION_TRACE.mark('capture')
+                    capture = NetworkCapture(driver)
+                    capture.start()
+                    driver.recycle_callbacks.append(capture.start)
+            
+            # Ask whether to build the document while the scan runs
+            print("\nWould you like to build the Word document while scanning?")
+            print("Each model is written as soon as its data is complete.")
+            stream_choice = input("Build document while scanning? (y/n): ").strip().lower()
+            streamer = None
+            if stream_choice == 'y':
+                streamer = DocumentStreamer(models_data, site_url=url, variants=choose_variants())
+                streamer.start()
             
-            choice = input("\nEnter your choice (1-3): ").strip()
+            # Only the last phase that runs knows when a model is complete
+            final_phase = 'workflow' if workflow_choice == 'y' else 'methods' if methods_choice == 'y' else 'code'
+            
+            def done_callback(phase):
+                return streamer.model_done if streamer and phase == final_phase else None
+            
+            try:
+                if code_choice == 'y':
+                    # Gather theme code if requested
+                    SESSION_TRACE.mark('code')
+                    models_data = gather_theme_code(driver, models_data, extractors, done_callback('code'))
+                    exporter.write_phase('code', models_data)
+
+                if methods_choice == 'y':
+                    # Scan methods
+                    SESSION_TRACE.mark('methods')
+                    models_data = scan_methods(driver, models_data, capture, extractors, done_callback('methods'))
+                    exporter.write_phase('methods', models_data)
+                
+                if workflow_choice == 'y':
+                    # Scan workflows
+                    SESSION_TRACE.mark('workflow')
+                    models_data = scan_model_workflows(driver, models_data, capture, extractors,
+                                                       done_callback('workflow'))
+                    exporter.write_phase('workflow', models_data)
+                
+                if streamer:
+                    for doc_filename in streamer.finish():
+                        print(f"\nDocumentation has been saved to: {doc_filename}")
+            finally:
+                # A phase that raised leaves a half-written document; remove it instead
+                if streamer:
+                    streamer.abort()
+            
+            print(f"\nLinked {link_references(models_data)} cross-references between code, methods and states")
+            exporter.write_references(models_data)
+            update_code_index(models_data, url, exporter.filename)
+            changes = compare_with_previous_scan(models_data, url, exporter.filename)
+
+            # No deadline applies while waiting at the menu
+            session_idle(driver)
+            
+            # Report which extractor backend won the probe for each entity
+            for entity, backend_name in extractors.summary().items():
+                print(f"Extractor for {entity}: {backend_name}")
+            
+            # Report entities that could not be scanned after retries
+            print_failure_report()
+            write_scan_metrics()
+
+            failed_models = RETRY_POLICY.failed_models()
+            choice = choose_action(len(failed_models))
+            
+            while choice == '4' and failed_models:
+                # Targeted re-scan of only the models that had failures
+                RETRY_POLICY.reset()
+                missing = [name for name in failed_models if name not in models_data]
+                if missing:
+                    # Models whose Forms entry failed have nothing to re-scan until it is read again
+                    SESSION_TRACE.mark('navigate_forms')
+                    navigate_to_forms(driver)
+                    SESSION_TRACE.mark('forms', models=missing)
+                    models_data.update(wait_for_forms_and_parse(driver, extractors=extractors, confirm=False,
+                                                                only=missing) or {})
+                    failed_models = [name for name in failed_models if name in models_data]
+                subset = {name: models_data[name] for name in failed_models}
+                if code_choice == 'y':
+                    SESSION_TRACE.mark('navigate_forms')
+                    navigate_to_forms(driver)
+                    SESSION_TRACE.mark('code', models=failed_models)
+                    gather_theme_code(driver, subset, extractors)
+                if methods_choice == 'y':
+                    SESSION_TRACE.mark('methods', models=failed_models)
+                    scan_methods(driver, subset, capture, extractors)
+                if workflow_choice == 'y':
+                    SESSION_TRACE.mark('workflow', models=failed_models)
+                    scan_model_workflows(driver, subset, capture, extractors)
+                exporter.write_phase('rescan', subset)
+                link_references(models_data)
+                exporter.write_references(models_data)
+                update_code_index(models_data, url, exporter.filename)
+                changes = compare_with_previous_scan(models_data, url, exporter.filename)
+                print_failure_report()
+                write_scan_metrics()
+                failed_models = RETRY_POLICY.failed_models()
+                choice = choose_action(len(failed_models))
             
             if choice == '1':
-                doc_filename = wait_with_spinner(
+                variants = choose_variants()
+                split, appendix = choose_layout()
+                site_format = choose_site_format()
+                doc_filenames = wait_with_spinner(
                     "Generating Word document...", 
-                    generate_word_document, 
+                    generate_word_variants, 
                     models_data,
-                    site_url=url  # Pass the URL to the document generator
+                    site_url=url,  # Pass the URL to the document generator
+                    variants=variants,
+                    split=split,
+                    appendix=appendix,
+                    changes=changes
                 )
-                if doc_filename:
-                    print(f"\nDocumentation has been saved to: {doc_filename}")
+                for doc_filename in doc_filenames:
+                    if doc_filename:
+                        print(f"\nDocumentation has been saved to: {doc_filename}")
+                if site_format:
+                    for variant in variants:
+                        generate_static_site(models_data, url, site_format, variant)
                 
                 print_divider()
                 print("Would you like to:")
@@ -2090,6 +7472,12 @@ def main():
         traceback.print_exc()
         print("=" * 50)
     finally:
+        TIMEOUT_PROFILE.save()
+        try:
+            if exporter:
+                exporter.close()
+        except Exception:
+            pass
         try:
             driver.quit()
             # Clean up temp directory
@@ -2101,8 +7489,50 @@ def main():
             pass
 
 if __name__ == "__main__":
+    # Required for the document worker pool in the frozen (PyInstaller) build
+    multiprocessing.freeze_support()
+    pause_on_exit = True
     try:
-        main()
+        args = parse_args()
+        # The unattended modes run on shared runners and schedulers, which have nobody to press Enter
+        pause_on_exit = not (args.index_scan or args.query or args.written or args.called or args.diff or
+                             args.replay_trace or args.manifest or args.scan_shard or args.merge_shards or
+                             args.batch or args.benchmark is not None)
+        if args.profile:
+            PHASE_PROFILER.enable()
+        if args.status_port and not args.batch:
+            # A batch serves the status of its workers itself
+            start_status_server(args.status_port)
+        if args.profile_commands:
+            COMMAND_PROFILER.enable()
+        if args.record_trace is not None:
+            SESSION_TRACE.start_recording(args.record_trace or None, args.redact)
+        if args.index_scan or args.query or args.written or args.called:
+            run_code_query(args)
+        elif args.diff:
+            run_scan_diff(args.diff)
+        elif args.replay_trace:
+            replay_trace(args.replay_trace)
+        elif args.manifest:
+            write_shard_manifest(args.manifest, args.shards, args.shard_phases)
+        elif args.scan_shard:
+            scan_shard(args.scan_shard, args.shard, args.headless)
+        elif args.merge_shards:
+            run_merge_shards(args.merge_shards[0], args.merge_shards[1:], args.variants)
+        elif args.batch:
+            run_batch(args.batch, args.batch_dir, args.workers, args.batch_phases, args.variants, args.headless,
+                      args.index, args.status_port)
+        elif args.benchmark is not None:
+            run_benchmark(args.benchmark, args.benchmark_phases, args.baseline, args.threshold,
+                          args.update_baseline, args.seed)
+        elif args.generate_tenant is not None:
+            run_synthetic_tenant(args)
+        elif args.mock_server is not None:
+            run_mock_server(args.mock_server or None, args.mock_port, args.mock_latency)
+        elif args.from_scan:
+            run_from_scan(args.from_scan)
+        else:
+            main(args.url, args.headless)
     except KeyboardInterrupt:
         print("\nScript terminated by user.")
     except Exception as e:
@@ -2116,6 +7546,12 @@ if __name__ == "__main__":
         traceback.print_exc()
         print("=" * 50)
     finally:
-        print("\nPress Enter to exit...")
-        input()  # This will keep the window open
+        if SESSION_TRACE.recording:
+            SESSION_TRACE.close()
+            print(f"\nSession trace saved to: {SESSION_TRACE.filename}")
+        if COMMAND_PROFILER.enabled:
+            COMMAND_PROFILER.report()
+        if pause_on_exit:
+            print("\nPress Enter to exit...")
+            input()  # This will keep the window open
 
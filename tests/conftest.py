@@ -0,0 +1,21 @@
+"""Load the scraper script as a module for the tests"""
+import importlib.util
+import os
+import sys
+
+import pytest
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                      'Fluxx Build Documentation Data Scraper.py')
+
+
+@pytest.fixture(scope='session')
+def fluxx():
+    for dependency in ('selenium', 'docx', 'requests', 'webdriver_manager'):
+        pytest.importorskip(dependency)
+    spec = importlib.util.spec_from_file_location('fluxx_scraper', SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    # Registered so the document pool's worker processes can unpickle its functions
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,884 @@
+"""Checks for the deterministic parts of the scraper and one scan of the mock server"""
+import copy
+import gzip
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+
+def export_records(fluxx, models_data):
+    return {name: fluxx.export_model_record(model_data) for name, model_data in models_data.items()}
+
+
+def workflow_states(*states):
+    return [{'display_name': name.title(), 'internal_name': name, 'validation_blocks': {},
+             'actions': [{'name': f'To {target}', 'to_state': target} for target in targets]}
+            for name, targets in states]
+
+
+def test_workflow_graph_reachability_cycles_and_unresolved(fluxx):
+    graph = fluxx.workflow_graph(workflow_states(
+        ('new', ['Submitted']),
+        ('submitted', ['Review', 'Missing']),
+        ('review', ['submitted', 'Approved']),
+        ('approved', []),
+        ('orphan', ['approved']),
+    ))
+    assert graph['start'] == 0
+    assert graph['edges'] == [[1], [2], [1, 3], [], [3]]
+    assert graph['unreachable'] == [4]
+    assert graph['dead_ends'] == [3]
+    assert graph['cycles'] == [[1, 2]]
+    assert graph['unresolved'] == [{'state': 'submitted', 'action': 'To Missing', 'to_state': 'Missing'}]
+
+
+def test_diff_scans_reports_entity_changes(fluxx):
+    old = copy.deepcopy(fluxx.MOCK_SAMPLE_MODELS)
+    new = copy.deepcopy(old)
+    new['Grant Request']['methods'][0]['current_code'] = 'def notify_program_officer\n  false\nend'
+    new['Grant Request']['themes']['Main']['views'].append('Print')
+    del new['Organization']
+    new['Report'] = copy.deepcopy(old['Organization'])
+    changes = {(entry['change'], entry['kind'], tuple(entry['path'])): entry.get('fields')
+               for entry in fluxx.diff_scans(old, new)}
+    assert changes == {
+        ('removed', 'model', ('Organization',)): None,
+        ('added', 'model', ('Report',)): None,
+        ('changed', 'method', ('Grant Request', 'notify_program_officer')): ['current_code'],
+        ('added', 'view', ('Grant Request', 'Main', 'Print')): None,
+    }
+    assert fluxx.diff_scans(old, copy.deepcopy(old)) == []
+
+
+def test_compare_benchmarks_ignores_noise(fluxx):
+    baseline = {'sizes': {'10': {'forms': {'seconds': 1.0, 'commands': 100, 'browser_heap_mb': None}}}}
+    results = {'sizes': {'10': {'forms': {'seconds': 2.0, 'commands': 105, 'browser_heap_mb': 80}},
+                         '100': {'forms': {'seconds': 9.0}}}}
+    regressions = fluxx.compare_benchmarks(results, baseline, threshold=0.2)
+    assert regressions == [{'size': '10', 'phase': 'forms', 'metric': 'seconds', 'baseline': 1.0,
+                            'current': 2.0, 'change': 1.0}]
+
+
+def document_text(filename):
+    from docx import Document
+    doc = Document(filename)
+    # The generation time differs when the two documents straddle a second
+    text = [paragraph.text for paragraph in doc.paragraphs if not paragraph.text.startswith('Generated on:')]
+    for table in doc.tables:
+        for row in table.rows:
+            text.extend(paragraph.text for cell in row.cells for paragraph in cell.paragraphs)
+    return text
+
+
+@pytest.mark.parametrize('variant', ['internal', 'customer'])
+def test_fast_and_docx_writers_render_the_same_text(fluxx, tmp_path, monkeypatch, variant):
+    monkeypatch.chdir(tmp_path)
+    models_data = fluxx.generate_synthetic_tenant(8, seed=1)
+    fluxx.link_references(models_data)
+    fast = fluxx.generate_word_document(models_data, 'https://example.fluxx.io', engine='fast', variant=variant,
+                                        timestamp_str='fast')
+    slow = fluxx.generate_word_document(models_data, 'https://example.fluxx.io', engine='docx', variant=variant,
+                                        timestamp_str='docx')
+    assert fast and slow
+    assert document_text(fast) == document_text(slow)
+
+
+def write_partial(fluxx, manifest, shard, models_data, filename, finished=True):
+    exporter = fluxx.ScanExporter(manifest['site_url'], filename)
+    exporter.write_phase('forms', models_data)
+    if finished:
+        exporter.write_shard({'manifest': manifest['id'], 'shard': shard, 'shards': manifest['shards'],
+                              'models': len(models_data), 'missing': [], 'failed_models': []})
+    exporter.close()
+    return filename
+
+
+def test_merge_shards_is_order_independent(fluxx, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    models_data = fluxx.generate_synthetic_tenant(12, seed=2)
+    exporter = fluxx.ScanExporter('https://big.fluxx.io', 'forms.jsonl')
+    exporter.write_phase('forms', models_data)
+    exporter.close()
+    manifest_file = fluxx.write_shard_manifest('forms.jsonl', 3, filename='manifest.json')
+    assert fluxx.write_shard_manifest('forms.jsonl', 3, filename='again.json')
+    with open(manifest_file, encoding='utf-8') as f:
+        manifest = json.load(f)
+    with open('again.json', encoding='utf-8') as f:
+        assert json.load(f)['id'] == manifest['id']
+    
+    names = {}
+    for entry in manifest['models']:
+        names.setdefault(entry['shard'], []).append(entry['name'])
+    assert sorted(names) == [1, 2, 3]
+    partials = [write_partial(fluxx, manifest, shard, {name: models_data[name] for name in names[shard]},
+                              f'shard_{shard}.jsonl') for shard in sorted(names)]
+    # An interrupted shard scan has no shard record and must not replace the finished one
+    stale = {name: dict(models_data[name], type='Stale') for name in names[1]}
+    partials.append(write_partial(fluxx, manifest, 1, stale, 'shard_1_interrupted.jsonl', finished=False))
+    
+    merged = None
+    for order in itertools.permutations(partials):
+        models, report = fluxx.merge_shards(manifest_file, list(order))
+        assert list(models) == list(models_data)
+        assert report['missing_shards'] == [] and report['unscanned_models'] == []
+        if merged is None:
+            merged = export_records(fluxx, models)
+        assert export_records(fluxx, models) == merged
+    assert merged == export_records(fluxx, models_data)
+    
+    models, report = fluxx.merge_shards(manifest_file, partials[:2])
+    assert report['missing_shards'] == [3]
+    assert report['unscanned_models'] == names[3]
+
+
+def test_mock_server_scan_matches_the_served_tenant(fluxx, tmp_path, monkeypatch):
+    from selenium.common.exceptions import WebDriverException
+    monkeypatch.chdir(tmp_path)
+    server = fluxx.MockFluxxServer(port=0, latency=0).start()
+    session = None
+    try:
+        try:
+            session = fluxx.BrowserSession(server.url, os.path.join(str(tmp_path), 'chrome'), headless=True)
+        except WebDriverException as e:
+            pytest.skip(f"Chrome is not available: {e.msg}")
+        session.get(server.url)
+        assert fluxx.wait_for_dashboard(session) and fluxx.navigate_to_admin(session)
+        extractors = fluxx.ExtractorSelector(session)
+        models_data = fluxx.wait_for_forms_and_parse(session, extractors=extractors, confirm=False)
+        models_data = fluxx.gather_theme_code(session, models_data, extractors, confirm=False)
+        models_data = fluxx.scan_methods(session, models_data, None, extractors, confirm=False)
+        models_data = fluxx.scan_model_workflows(session, models_data, None, extractors, confirm=False)
+    finally:
+        if session:
+            session.quit()
+        server.stop()
+    assert export_records(fluxx, models_data) == export_records(fluxx, fluxx.MOCK_SAMPLE_MODELS)
+
+
+def test_timed_out_waits_widen_the_timeout_a_bounded_step(fluxx, tmp_path):
+    from selenium.common.exceptions import TimeoutException
+    profile = fluxx.TimeoutProfile(path=str(tmp_path / 'timeouts.json'), min_timeout=0.01, min_samples=20)
+    profile.load('example.fluxx.io')
+    for _ in range(40):
+        profile.record('workflow_listing', 0.01)
+    timeout = profile.timeout('workflow_listing', 10)
+    assert timeout == pytest.approx(0.03)
+    timeouts = []
+    for _ in range(4):
+        wait = fluxx.AdaptiveWait(object(), 'workflow_listing', profile=profile)
+        wait._poll = 0.001
+        with pytest.raises(TimeoutException):
+            wait.until(lambda driver: False)
+        timeouts.append(profile.timeout('workflow_listing', 10))
+    assert timeouts == pytest.approx([timeout * 1.5, timeout * 2.25, timeout * 2.25, timeout * 2.25])
+    assert len(profile.samples['workflow_listing']) == 40
+    
+    wait = fluxx.AdaptiveWait(object(), 'workflow_listing', profile=profile)
+    wait.until(lambda driver: True)
+    assert profile.timeout('workflow_listing', 10) == pytest.approx(timeout)
+    profile.record_miss('workflow_listing')
+    profile.save()
+    profile.load('example.fluxx.io')
+    assert profile.timeout('workflow_listing', 10) == pytest.approx(timeout)
+
+
+def test_hung_browser_is_restarted_and_the_model_scanned_again(fluxx):
+    class Watchdog:
+        tripped = False
+        operation = 'methods for B'
+    
+    class Session:
+        def __init__(self):
+            self.watchdog = Watchdog()
+            self.recycles = []
+        
+        def recycle(self, dashboard, reason=''):
+            self.watchdog.tripped = False
+            self.recycles.append(dashboard)
+    
+    session = Session()
+    policy = fluxx.RETRY_POLICY
+    policy.reset()
+    policy.watchdog = session.watchdog
+    calls = []
+    
+    def fetch(model_name, index):
+        calls.append((model_name, index))
+        if model_name == 'B' and len(calls) == 3:
+            session.watchdog.tripped = True  # The watchdog kills Chrome during B's first entity
+            raise RuntimeError("connection refused")
+        return True
+    
+    try:
+        for _ in range(policy.circuit_threshold):
+            policy.record('Card Settings', {'model': 'earlier'}, RuntimeError(), 1)
+        policy.consecutive['Card Settings'] = policy.circuit_threshold - 1
+        for number, model_name, model_data in fluxx.scan_models(session, {'A': {}, 'B': {}, 'C': {}}, 'Card Settings'):
+            try:
+                for index in range(2):
+                    policy.call(lambda: fetch(model_name, index), 'Card Settings', {'model': model_name})
+            except Exception as e:
+                policy.record('Card Settings', {'model': model_name}, e, 1)
+        assert session.recycles == ['Card Settings']
+        assert calls == [('A', 0), ('A', 1), ('B', 0), ('B', 0), ('B', 1), ('C', 0), ('C', 1)]
+        assert policy.failed_models() == ['earlier']
+        assert not policy.is_open('Card Settings')
+    finally:
+        policy.reset()
+        policy.watchdog = None
+
+
+def test_phases_are_closed_when_they_stop_early(fluxx, monkeypatch):
+    class DeadDriver:
+        def __getattr__(self, name):
+            raise RuntimeError("browser is gone")
+    
+    monkeypatch.setattr(fluxx, 'pause', lambda seconds: None)
+    fluxx.SCAN_METRICS.reset('https://example.fluxx.io')
+    models_data = copy.deepcopy(fluxx.MOCK_SAMPLE_MODELS)
+    fluxx.scan_methods(DeadDriver(), models_data, extractors=object(), confirm=False)
+    fluxx.scan_model_workflows(DeadDriver(), models_data, extractors=object(), confirm=False)
+    assert fluxx.SCAN_METRICS.status()['phase'] is None
+    fluxx.gather_theme_code(DeadDriver(), models_data, extractors=object(), confirm=False)
+    status = fluxx.SCAN_METRICS.status()
+    assert status['phase'] is None
+    assert set(status['phases']) == {'code'}
+
+
+def test_batch_status_combines_the_worker_status_files(fluxx, tmp_path):
+    tasks = [{'url': f'https://{host}', 'folder': host} for host in ('a.fluxx.io', 'b.fluxx.io', 'c.fluxx.io')]
+    for task in tasks[:2]:
+        os.makedirs(tmp_path / task['folder'])
+        metrics = fluxx.ScanMetrics()
+        metrics.reset(task['url'])
+        metrics.begin_phase('code', total=4)
+        fluxx.write_tenant_status(str(tmp_path / task['folder'] / fluxx.BATCH_STATUS_FILE), 'running', metrics)
+    batch_status = fluxx.BatchStatus(str(tmp_path), tasks)
+    batch_status.finish(tasks[1]['url'], 'failed')
+    
+    status = batch_status.status()
+    assert [tenant['state'] for tenant in status['tenants']] == ['running', 'failed', 'queued']
+    assert status['states'] == {'queued': 1, 'running': 1, 'ok': 0, 'failed': 1}
+    assert status['tenants'][0]['status']['site_url'] == 'https://a.fluxx.io'
+    assert status['tenants'][0]['status']['total'] == 4
+    
+    text = batch_status.prometheus()
+    assert 'fluxx_batch_tenants{state="running"} 1' in text
+    assert 'fluxx_scan_models_total{site="https://a.fluxx.io",phase="code"} 4' in text
+    assert 'fluxx_scan_models_total{site="https://b.fluxx.io",phase="code"} 4' in text
+    help_lines = [line for line in text.splitlines() if line.startswith('# HELP')]
+    assert len(help_lines) == len(set(help_lines))
+
+
+def test_redacted_trace_masks_credentials_and_still_replays(fluxx, tmp_path):
+    events = [
+        {'method': 'Network.requestWillBeSent',
+         'params': {'requestId': '1', 'type': 'Document',
+                    'request': {'url': 'https://example.fluxx.io/user_sessions', 'method': 'POST',
+                                'postData': 'user[login]=jo%40example.org&user[password]=hunter2',
+                                'headers': {'Content-Type': 'application/x-www-form-urlencoded'}}}},
+        {'method': 'Network.requestWillBeSentExtraInfo',
+         'params': {'requestId': '1', 'headers': {'Cookie': '_fluxx_session=SECRET123'},
+                    'associatedCookies': [{'cookie': {'name': '_fluxx_session', 'value': 'SECRET123'}}]}},
+        {'method': 'Network.responseReceivedExtraInfo',
+         'params': {'requestId': '1', 'headers': {'set-cookie': '_fluxx_session=SECRET456; path=/'}}},
+        {'method': 'Network.responseReceived',
+         'params': {'requestId': '2', 'type': 'XHR', 'response': {'url': 'https://example.fluxx.io/model_methods'}}},
+    ]
+    log = [{'level': 'INFO', 'timestamp': 1, 'message': json.dumps({'message': event, 'webview': 'x'})}
+           for event in events]
+    responses = {
+        'sendKeysToElement': {'value': None},
+        'getLog': {'value': log},
+        'getCookies': {'value': [{'name': '_fluxx_session', 'value': 'SECRET123'}]},
+        'getTitle': {'value': 'Fluxx for jo@example.org'},
+    }
+    sent = [('sendKeysToElement', {'id': 'e1', 'text': 'hunter2', 'value': list('hunter2')}),
+            ('getLog', {'type': 'performance'}), ('getCookies', {}), ('getTitle', {})]
+    
+    class Executor:
+        def execute(self, command, params=None):
+            return copy.deepcopy(responses[command])
+    
+    class Driver:
+        command_executor = Executor()
+    
+    filename = str(tmp_path / 'trace.jsonl.gz')
+    recorder = fluxx.SessionTrace()
+    recorder.start_recording(filename, redact=True)
+    driver = Driver()
+    recorder.attach(driver)
+    for command, params in sent:
+        driver.command_executor.execute(command, params)
+    recorder.close()
+    
+    with gzip.open(filename, 'rt', encoding='utf-8') as f:
+        text = f.read()
+    for secret in ('SECRET123', 'SECRET456', 'hunter2', 'jo@example.org', 'jo%40example.org'):
+        assert secret not in text
+    
+    replay = fluxx.SessionTrace()
+    replay.load(filename)
+    replayed = [replay.next_response(command, params) for command, params in sent]
+    assert replay.position == len(sent) and not replay.mismatches
+    messages = [json.loads(entry['message'])['message'] for entry in replayed[1]['value']]
+    assert [message['method'] for message in messages] == [event['method'] for event in events]
+    assert messages[0]['params']['request']['postData'] == '[redacted]'
+    assert messages[1]['params']['headers']['Cookie'] == '[redacted]'
+    assert messages[2]['params']['headers']['set-cookie'] == '[redacted]'
+    assert messages[3]['params']['response']['url'] == 'https://example.fluxx.io/model_methods'
+    assert replayed[2]['value'][0]['value'] == '[redacted]'
+    assert replayed[3]['value'] == 'Fluxx for [email]'
+    with pytest.raises(fluxx.TraceMismatch):
+        replay.next_response('getTitle', {})
+
+
+@pytest.mark.skipif(os.name != 'posix', reason="uses sh and pgrep")
+def test_watchdog_kills_the_whole_browser_process_tree(fluxx):
+    # sh stands in for ChromeDriver and its two sleeps for the Chrome processes it started
+    driver = subprocess.Popen(['sh', '-c', 'sleep 60 & sleep 60 & wait'])
+    deadline = time.time() + 5
+    while len(fluxx.process_tree(driver.pid)) < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    tree = fluxx.process_tree(driver.pid)
+    assert len(tree) == 3
+    
+    class Service:
+        process = driver
+    
+    class Session:
+        kill_browser = fluxx.BrowserSession.kill_browser
+    
+    session = Session()
+    session.driver = type('Driver', (), {'service': Service()})()
+    watchdog = fluxx.Watchdog(session, interval=0.01)
+    try:
+        watchdog.begin('methods for B', 0.01)
+        driver.wait(timeout=5)
+        assert watchdog.tripped
+        
+        def alive():
+            # Killed children nobody has reaped yet linger as zombies
+            return [pid for pid in tree[1:]
+                    if subprocess.run(['ps', '-o', 'stat=', '-p', str(pid)], capture_output=True,
+                                      text=True).stdout.strip()[:1] not in ('', 'Z')]
+        
+        deadline = time.time() + 5
+        while alive() and time.time() < deadline:
+            time.sleep(0.01)
+        assert alive() == []
+    finally:
+        watchdog.stop()
+
+
+def test_code_index_searches_the_most_recently_created_scan(fluxx, tmp_path):
+    path = str(tmp_path / 'index.sqlite')
+    site = 'https://example.fluxx.io'
+    newer = copy.deepcopy(fluxx.MOCK_SAMPLE_MODELS)
+    newer['Grant Request']['methods'][0]['current_code'] = 'def notify_program_officer\n  send_mail\nend'
+    fluxx.index_scan(newer, site, 'fluxx_scan_new.jsonl', '2026-03-02T09:00:00', path)
+    # An older export indexed afterwards must not become the default search target
+    fluxx.index_scan(fluxx.MOCK_SAMPLE_MODELS, site, 'fluxx_scan_old.jsonl', '2026-01-05T09:00:00', path)
+    
+    results = fluxx.query_code_index(['notify_program_officer'], path=path)
+    assert {result['scan'] for result in results} == {'fluxx_scan_new.jsonl'}
+    assert fluxx.query_code_index(['send_mail'], path=path)[0]['lines'] == [(2, 'send_mail')]
+    assert fluxx.query_code_index(['true'], path=path) == []
+    assert {result['scan'] for result in fluxx.query_code_index(['notify_program_officer'], all_scans=True, path=path)} == \
+        {'fluxx_scan_new.jsonl', 'fluxx_scan_old.jsonl'}
+
+
+def test_benchmark_memory_is_measured_per_phase(fluxx, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    results = fluxx.benchmark_tenant(3, ['document'])
+    metrics = results['document']
+    assert metrics['browser_heap_mb'] is None  # Rendering runs without a browser
+    assert metrics['python_peak_growth_mb'] is None or metrics['python_peak_growth_mb'] >= 0
+    assert 'peak_rss_mb' not in metrics
+    assert metrics['output_bytes'] > 0 and os.listdir(tmp_path) == []
+
+
+def test_profiled_phase_leaves_out_the_confirmation_prompt(fluxx, tmp_path, monkeypatch, capsys):
+    import pstats
+    profiler = fluxx.PhaseProfiler()
+    profiler.enable(str(tmp_path))
+    monkeypatch.setattr(fluxx, 'PHASE_PROFILER', profiler)
+    
+    def waiting_for_the_user(prompt):
+        time.sleep(0.3)
+        return 'y'
+    
+    monkeypatch.setattr('builtins.input', waiting_for_the_user)
+    
+    @fluxx.profiled_phase('methods')
+    def phase():
+        verify = fluxx.PHASE_PROFILER.ask("Proceed? (y/n): ")
+        return sum(range(1000)) if verify == 'y' else None
+    
+    assert phase() == sum(range(1000))
+    assert profiler.active is None
+    elapsed = float(re.search(r"Profiled methods: ([\d.]+)s", capsys.readouterr().out).group(1))
+    assert elapsed < 0.3
+    functions = {name for _, _, name in pstats.Stats(str(tmp_path / 'methods_1.pstats')).stats}
+    assert 'waiting_for_the_user' not in functions
+
+
+def test_forms_failures_name_the_model_and_can_be_scanned_again(fluxx, monkeypatch):
+    class Element:
+        def __init__(self, element_id=None):
+            self.element_id = element_id
+        
+        def get_attribute(self, name):
+            return self.element_id
+    
+    class Driver:
+        def find_elements(self, by, selector):
+            return [Element('grant_request'), Element('organization')]
+        
+        def find_element(self, by, selector):
+            return Element()
+        
+        def execute_script(self, script, *args):
+            return 0
+    
+    class Extractors:
+        broken = {'grant_request'}
+        
+        def reset(self):
+            pass
+        
+        def extract(self, kind, context):
+            model_id = context['element'].element_id
+            if model_id in self.broken:
+                raise RuntimeError("tree did not render")
+            return {'id': model_id, 'type': model_id.title(), 'themes': {}}
+    
+    monkeypatch.setattr(fluxx, 'pause', lambda seconds: None)
+    monkeypatch.setattr(fluxx.os, 'system', lambda command: 0)
+    extractors = Extractors()
+    fluxx.RETRY_POLICY.reset()
+    try:
+        models = fluxx.wait_for_forms_and_parse(Driver(), extractors=extractors, confirm=False)
+        assert list(models) == ['Organization']
+        assert fluxx.RETRY_POLICY.failed_models() == ['Grant Request']
+        
+        extractors.broken = set()
+        fluxx.RETRY_POLICY.reset()
+        rescanned = fluxx.wait_for_forms_and_parse(Driver(), extractors=extractors, confirm=False,
+                                                   only=['Grant Request'])
+        assert list(rescanned) == ['Grant Request']
+        assert fluxx.RETRY_POLICY.failed_models() == []
+    finally:
+        fluxx.RETRY_POLICY.reset()
+
+
+def test_aborted_streamer_stops_and_removes_its_partial_documents(fluxx, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    models_data = copy.deepcopy(fluxx.MOCK_SAMPLE_MODELS)
+    streamer = fluxx.DocumentStreamer(models_data, site_url='https://example.fluxx.io',
+                                      variants=('internal', 'customer'))
+    streamer.start()
+    streamer.model_done('Grant Request')
+    assert len(os.listdir(tmp_path)) == 2
+    streamer.abort()  # The scan phase raised before the last model was reported
+    assert not streamer.thread.is_alive()
+    assert os.listdir(tmp_path) == []
+    
+    streamer = fluxx.DocumentStreamer(models_data, site_url='https://example.fluxx.io')
+    streamer.start()
+    filenames = streamer.finish()
+    streamer.abort()
+    assert os.listdir(tmp_path) == filenames
+
+
+class CaptureDriver:
+    """Answers NetworkCapture from a MockTenant: clicking a detail link logs its XHR"""
+    
+    def __init__(self, tenant):
+        self.tenant = tenant
+        self.log = []
+        self.bodies = {}
+    
+    def respond(self, path, body, kind='XHR'):
+        request_id = str(len(self.bodies) + 1)
+        self.bodies[request_id] = body
+        for method, params in (('Network.responseReceived', {'requestId': request_id, 'type': kind,
+                                                              'response': {'url': 'https://example.fluxx.io' + path}}),
+                               ('Network.loadingFinished', {'requestId': request_id})):
+            self.log.append({'message': json.dumps({'message': {'method': method, 'params': params}})})
+    
+    def get_log(self, log_type):
+        entries, self.log = self.log, []
+        return entries
+    
+    def execute_cdp_cmd(self, command, params):
+        if command == 'Network.getResponseBody':
+            return {'body': self.bodies[params['requestId']], 'base64Encoded': False}
+        return {}
+    
+    def execute_script(self, script, selector):
+        href = re.search(r"href='(.*)'\]", selector).group(1)
+        kind, item_id = href.strip('/').split('/')
+        render = {'model_methods': self.tenant.method_detail, 'machine_states': self.tenant.state_detail,
+                  'machine_events': self.tenant.event_detail}[kind]
+        self.respond(href, render(item_id))
+        return True
+
+
+def test_methods_and_workflows_are_read_from_captured_xhr_responses(fluxx):
+    models_data = copy.deepcopy(fluxx.MOCK_SAMPLE_MODELS)
+    tenant = fluxx.MockTenant(models_data)
+    driver = CaptureDriver(tenant)
+    capture = fluxx.NetworkCapture(driver)
+    assert capture.start()
+    
+    # What clicking the Methods tab and then the theme would load
+    driver.respond('/model_methods', tenant.method_listing('GrantRequest'))
+    assert fluxx.capture_model_methods(driver, capture, timeout=1) == models_data['Grant Request']['methods']
+    uid = {value: uid for uid, value in tenant.themes.items()}[('GrantRequest', 'Main')]
+    driver.respond('/', '<html>page load</html>', kind='Document')
+    driver.respond('/machine_states', tenant.state_listing(uid))
+    workflow = fluxx.capture_workflow_states(driver, capture, timeout=1)
+    assert workflow == {key: models_data['Grant Request']['workflow']['themes']['Main'][key]
+                        for key in ('workflow_id', 'states')}
+    
+    # No listing response means the caller falls back to the rendered page
+    assert fluxx.capture_model_methods(driver, capture, timeout=0) is None
+    assert fluxx.css_string("it's a \\ path") == "it\\'s a \\\\ path"
+
+
+def test_extractor_probe_picks_the_fastest_correct_backend(fluxx):
+    calls = []
+    
+    def backend(name, result, seconds=0.0, needs_render=True):
+        class Backend(fluxx.ExtractorBackend):
+            def extract(self, entity, context):
+                calls.append(name)
+                time.sleep(seconds)
+                return result() if callable(result) else result
+        Backend.name = name
+        Backend.needs_render = needs_render
+        return Backend
+    
+    fast_result = {'current_code': 'true'}
+    backends = [backend('dom', {'current_code': 'true'}, 0.01), backend('wrong', {'current_code': ''}, needs_render=False),
+                backend('fast', lambda: fast_result, needs_render=False)]
+    selector = fluxx.ExtractorSelector(object(), backends=backends, probe_count=3)
+    opened = []
+    
+    def context():
+        return {'open': lambda: opened.append(True) or True}
+    
+    for _ in range(3):
+        assert selector.extract('method', context()) == {'current_code': 'true'}
+    assert selector.summary() == {'method': 'fast'}
+    
+    calls.clear()
+    opened.clear()
+    assert selector.extract('method', context()) == {'current_code': 'true'}
+    assert calls == ['fast'] and opened == []  # The pane is never opened for it
+    fast_result = None
+    assert selector.extract('method', context()) == {'current_code': 'true'}
+    assert calls[-2:] == ['fast', 'dom'] and opened == [True]
+
+
+def test_page_source_extractor_reads_the_forms_tree_until_reset(fluxx):
+    models_data = copy.deepcopy(fluxx.MOCK_SAMPLE_MODELS)
+    
+    class Element:
+        def get_attribute(self, name):
+            return 'grant_request'
+    
+    class Driver:
+        page_source = fluxx.MockTenant(models_data).page('Forms', admin=True)
+    
+    driver = Driver()
+    extractor = fluxx.PageSourceExtractor(driver)
+    entry = extractor.extract('model_tree', {'element': Element()})
+    assert entry == {'id': 'grant_request', 'type': 'GrantRequest', 'is_dynamic': False,
+                     'themes': {'Main': {'views': ['Gallery', 'Detail']}}}
+    
+    models_data['Grant Request']['themes']['Main']['views'].append('Print')
+    driver.page_source = fluxx.MockTenant(models_data).page('Forms', admin=True)
+    assert extractor.extract('model_tree', {'element': Element()}) == entry  # Cached tree
+    extractor.reset()
+    assert extractor.extract('model_tree', {'element': Element()})['themes']['Main']['views'] == \
+        ['Gallery', 'Detail', 'Print']
+
+
+def test_retry_policy_recovers_stale_elements_and_opens_a_circuit(fluxx, monkeypatch):
+    from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException
+    delays = []
+    monkeypatch.setattr(fluxx, 'pause', delays.append)
+    clock = [1000.0]
+    monkeypatch.setattr(fluxx.time, 'time', lambda: clock[0])
+    policy = fluxx.RetryPolicy(circuit_threshold=2, circuit_cooldown=30.0)
+    
+    # A stale element is re-resolved and retried with backoff
+    attempts = []
+    resolved = []
+    
+    def stale_twice():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise StaleElementReferenceException("stale")
+        return 'ok'
+    
+    assert policy.call(stale_twice, 'Forms', {'model': 'Grant Request'}, resolve=lambda: resolved.append(1)) == 'ok'
+    assert len(attempts) == 3 and len(resolved) == 2 and delays == [0.5, 1.0] and policy.retries == 2
+    
+    # A missing element is not retried; two failures in a row open the dashboard's circuit
+    def missing():
+        raise NoSuchElementException("no such element")
+    
+    assert policy.call(missing, 'Card Settings', {'model': 'A', 'method': 'x'}) is None
+    assert policy.call(missing, 'Card Settings', {'model': 'B', 'method': 'y'}) is None
+    assert policy.is_open('Card Settings') and not policy.is_open('Forms')
+    assert policy.call(lambda: 'skipped', 'Card Settings', {'model': 'C'}) is None
+    assert [failure['kind'] for failure in policy.failures] == ['missing', 'missing', 'circuit_open']
+    assert policy.failed_models() == ['A', 'B', 'C']
+    
+    # After the cooldown one entity is let through and a success closes the circuit
+    clock[0] += 31
+    assert policy.call(lambda: 'ok', 'Card Settings', {'model': 'D'}) == 'ok'
+    assert not policy.is_open('Card Settings')
+    report = policy.report()
+    assert report['retries'] == 2 and report['failure_count'] == 3
+
+
+def test_fast_writer_escapes_markup_and_drops_control_characters(fluxx, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    models_data = copy.deepcopy(fluxx.MOCK_SAMPLE_MODELS)
+    models_data['Grant Request']['methods'][0]['current_code'] = 'if a < b && c > "d"\n  x = \'<w:t>]]>\'\nend'
+    models_data['Organization']['themes'] = {'R&D <Main>': {'views': ['A & B'], 'code': {}}}
+    fast = fluxx.generate_word_document(models_data, 'https://example.fluxx.io', engine='fast', timestamp_str='fast')
+    slow = fluxx.generate_word_document(models_data, 'https://example.fluxx.io', engine='docx', timestamp_str='docx')
+    text = document_text(fast)
+    assert text == document_text(slow)
+    assert any('if a < b && c > "d"\n  x = \'<w:t>]]>\'\nend' in paragraph for paragraph in text)
+    assert any('R&D <Main>' in paragraph for paragraph in text)
+    
+    # Code pasted from elsewhere can hold characters XML does not allow
+    models_data['Grant Request']['methods'][0]['current_code'] = 'x = 1\x0b\x01\nend'
+    fast = fluxx.generate_word_document(models_data, 'https://example.fluxx.io', engine='fast', timestamp_str='control')
+    assert any('x = 1\nend' in paragraph for paragraph in document_text(fast))
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                    reason="the workers import the scraper through the test loader's module")
+def test_parallel_rendering_merges_sections_in_model_order(fluxx, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    models_data = fluxx.generate_synthetic_tenant(fluxx.PARALLEL_MIN_MODELS, seed=2)
+    fluxx.link_references(models_data)
+    serial = fluxx.generate_word_document(models_data, 'https://example.fluxx.io', timestamp_str='serial')
+    with ProcessPoolExecutor(max_workers=3) as pool:
+        parallel = fluxx.generate_word_document(models_data, 'https://example.fluxx.io', pool=pool,
+                                                timestamp_str='parallel')
+    assert document_text(parallel) == document_text(serial)
+    filenames = fluxx.generate_word_variants(models_data, 'https://example.fluxx.io', variants=('internal', 'customer'),
+                                             workers=2)
+    assert len(filenames) == 2 and all(os.path.exists(filename) for filename in filenames)
+
+
+def test_volumes_split_the_models_and_long_code_moves_to_the_appendix(fluxx, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    models_data = fluxx.generate_synthetic_tenant(6, seed=3)
+    names = list(models_data)
+    groups = fluxx.plan_volumes(models_data, 'group')
+    assert [name for _, group in groups for name in group] == \
+        [name for name in names if not models_data[name]['is_dynamic']] + \
+        [name for name in names if models_data[name]['is_dynamic']]
+    sizes = fluxx.plan_volumes(models_data, 'size', max_bytes=1)
+    assert sizes == [(f"{name} to {name}", [name]) for name in names]
+    with pytest.raises(ValueError):
+        fluxx.plan_volumes(models_data, 'alphabet')
+    
+    filenames = fluxx.generate_word_volumes(models_data, 'https://example.fluxx.io', split='group')
+    assert [title for title, _ in groups] == ['Core Models', 'Dynamic Models']
+    assert len(filenames) == len(groups) + 1
+    index = '\n'.join(document_text(filenames[0]))
+    for (title, volume_names), filename in zip(groups, filenames[1:]):
+        assert os.path.basename(filename) in index
+        text = '\n'.join(document_text(filename))
+        others = [name for name in names if name not in volume_names]
+        assert all(name in text for name in volume_names)
+        assert not any(name in text for name in others)
+    
+    long_code = '\n'.join(f'x{line} = {line}' for line in range(fluxx.APPENDIX_MIN_LINES))
+    sample = copy.deepcopy(fluxx.MOCK_SAMPLE_MODELS)
+    sample['Grant Request']['methods'][0]['current_code'] = long_code
+    text = document_text(fluxx.generate_word_document(sample, 'https://example.fluxx.io', appendix=True,
+                                                      timestamp_str='appendix'))
+    assert any(f'See Appendix A.1.1 ({fluxx.APPENDIX_MIN_LINES} lines)' in paragraph for paragraph in text)
+    assert 'Code Appendix' in text and long_code in text
+
+
+def test_scan_export_round_trips_and_later_phases_replace_earlier_records(fluxx, tmp_path):
+    models_data = fluxx.generate_synthetic_tenant(6, seed=4)
+    fluxx.link_references(models_data)
+    forms_only = {name: {'type': data['type'], 'is_dynamic': data['is_dynamic'], 'themes': data['themes']}
+                  for name, data in models_data.items()}
+    filename = str(tmp_path / 'scan.jsonl')
+    exporter = fluxx.ScanExporter('https://example.fluxx.io', filename)
+    exporter.write_phase('forms', forms_only)
+    partial, header = fluxx.load_scan_export(filename)
+    assert header['site_url'] == 'https://example.fluxx.io'
+    assert list(partial) == list(models_data)
+    assert all('methods' not in data and 'workflow' not in data for data in partial.values())
+    
+    # Write the phases out of model order; the first record decides the order
+    exporter.write_phase('workflow', dict(reversed(list(models_data.items()))))
+    exporter.write_references(models_data)
+    exporter.close()
+    loaded, _ = fluxx.load_scan_export(filename)
+    assert list(loaded) == list(models_data)
+    assert export_records(fluxx, loaded) == export_records(fluxx, models_data)
+    assert {name: data['references'] for name, data in loaded.items()} == \
+        {name: data['references'] for name, data in models_data.items()}
+    
+    with open(filename, encoding='utf-8') as f:
+        lines = f.readlines()
+    newer = json.loads(lines[0])
+    newer['version'] = fluxx.SCAN_SCHEMA_VERSION + 1
+    for name, content in (('newer.jsonl', [json.dumps(newer) + '\n'] + lines[1:]),
+                          ('headless.jsonl', lines[1:]), ('empty.jsonl', [])):
+        with open(tmp_path / name, 'w', encoding='utf-8') as f:
+            f.writelines(content)
+        with pytest.raises(ValueError):
+            fluxx.load_scan_export(str(tmp_path / name))
+
+
+def search_site(index, query):
+    """Return the [title, href] documents that contain every query token"""
+    found = None
+    for token in query.lower().split():
+        hits = set()
+        for term, deltas in index['terms'].items():
+            if term == token:
+                hits.update(itertools.accumulate(deltas))
+        found = hits if found is None else found & hits
+    return [index['docs'][doc_id] for doc_id in sorted(found)]
+
+
+def test_static_site_pages_and_search_index_agree(fluxx, tmp_path):
+    models_data = copy.deepcopy(fluxx.MOCK_SAMPLE_MODELS)
+    output_dir = fluxx.generate_static_site(models_data, 'https://example.fluxx.io', 'html',
+                                            output_dir=str(tmp_path / 'html'))
+    for path in ('index.html', 'models/grant-request.html', 'workflows/grant-request.html',
+                 'models/organization.html', 'search-index.json', 'search-index.js', 'search.js', 'style.css'):
+        assert os.path.exists(os.path.join(output_dir, path))
+    with open(os.path.join(output_dir, 'search-index.json'), encoding='utf-8') as f:
+        index_json = f.read()
+    with open(os.path.join(output_dir, 'search-index.js'), encoding='utf-8') as f:
+        assert f.read() == f'window.FLUXX_SEARCH={index_json};\n'
+    index = json.loads(index_json)
+    
+    for title, href in index['docs']:
+        page, anchor = href.split('#')
+        with open(os.path.join(output_dir, page), encoding='utf-8') as f:
+            assert f'id="{anchor}"' in f.read()
+    # snake_case identifiers are found by their parts, and every token must match
+    assert search_site(index, 'amount_requested') == search_site(index, 'amount requested')
+    hits = search_site(index, 'amount_requested')
+    assert hits and all(href.startswith(('models/grant-request.html', 'workflows/grant-request.html'))
+                        for _, href in hits)
+    assert search_site(index, 'reviewed') and not search_site(index, 'reviewed organization')
+    
+    output_dir = fluxx.generate_static_site(models_data, None, 'md', output_dir=str(tmp_path / 'md'))
+    assert sorted(os.listdir(output_dir)) == ['index.md', 'models', 'search-index.json', 'workflows']
+    assert sorted(os.listdir(os.path.join(output_dir, 'models'))) == ['grant-request.md', 'organization.md']
+    assert fluxx.generate_static_site(models_data, None, 'pdf', output_dir=str(tmp_path / 'pdf')) is None
+
+
+def test_code_index_finds_writes_calls_and_token_prefixes(fluxx, tmp_path):
+    path = str(tmp_path / 'index.sqlite')
+    models_data = copy.deepcopy(fluxx.MOCK_SAMPLE_MODELS)
+    models_data['Organization']['methods'] = [{
+        'name': 'refresh_totals', 'type': 'Instance', 'draft_code': '',
+        'current_code': "def refresh_totals\n  total = grants.sum(:amount_requested)\n"
+                        "  model[:grant_total] = total\n  model.reviewed?\nend"}]
+    assert fluxx.index_scan(models_data, 'https://example.fluxx.io', 'a.jsonl', path=path) == 6
+    fluxx.index_scan(models_data, 'https://other.fluxx.io', 'b.jsonl', path=path)
+    
+    def found(terms, mode, **kwargs):
+        return [(result['tenant'], result['model'], result['location'], result['lines'])
+                for result in fluxx.query_code_index(terms, mode, path=path, **kwargs)]
+    
+    assert found(['amount_requested'], 'writes', tenant='example.fluxx.io') == [
+        ('example.fluxx.io', 'Grant Request', 'Theme Main / Current Before New Block',
+         [(1, 'model.amount_requested ||= 0')])]
+    assert found(['grant_total', 'total'], 'writes', tenant='example.fluxx.io') == [
+        ('example.fluxx.io', 'Organization', 'Method refresh_totals / Current Code',
+         [(2, 'total = grants.sum(:amount_requested)'), (3, 'model[:grant_total] = total')])]
+    # A trailing ? or ! is optional when searching calls
+    calls = found(['reviewed'], 'calls', tenant='example.fluxx.io')
+    assert [(model, location, lines) for _, model, location, lines in calls] == [
+        ('Grant Request', 'Workflow Main / Submitted (submitted) / Approve Guard', [(1, 'model.reviewed?')]),
+        ('Organization', 'Method refresh_totals / Current Code', [(4, 'model.reviewed?')])]
+    assert {tenant for tenant, *_ in found(['reviewed?'], 'calls')} == {'example.fluxx.io', 'other.fluxx.io'}
+    assert found(['sum'], 'writes') == []
+    
+    # Every token must appear and the last one may be a prefix
+    assert [location for _, _, location, _ in found(['grants', 'amount_req'], 'tokens', tenant='other.fluxx.io')] == \
+        ['Method refresh_totals / Current Code']
+    assert found(['grants', 'notify'], 'tokens') == []
+    
+    # Indexing the same scan again replaces its blocks
+    del models_data['Organization']['methods']
+    assert fluxx.index_scan(models_data, 'https://example.fluxx.io', 'a.jsonl', path=path) == 5
+    assert found(['refresh_totals'], 'tokens', tenant='example.fluxx.io') == []
+
+
+def test_cross_references_link_methods_states_and_models(fluxx):
+    no_code = {key: 'N/A' for key, _ in fluxx.THEME_BLOCK_ORDER}
+    models_data = {
+        'Grant Request': {
+            'type': 'GrantRequest', 'is_dynamic': False,
+            'themes': {'Main': {'views': [], 'code': dict(no_code, current_before_new='notify',
+                                                          draft_after_create='model.state == :approved')}},
+            'methods': [{'name': 'notify', 'type': 'Instance', 'current_code': 'def notify\n  approved\nend',
+                         'draft_code': ''}],
+            'workflow': {'themes': {'Main': {'workflow_id': '1', 'states': workflow_states(('approved', []))}}},
+        },
+        'Organization': {
+            'type': 'Organization', 'is_dynamic': False,
+            'themes': {'Main': {'views': [], 'code': dict(no_code,
+                                                          current_before_new='notify; grant_request; :approved')}},
+            'methods': [{'name': 'notify', 'type': 'Instance',
+                         'current_code': 'def notify\n  GrantRequest.where(x: 1)\nend', 'draft_code': ''}],
+        },
+    }
+    theme = 'Theme Main / Current Before New Block'
+    # Each model's notify call goes to its own notify; a definition does not reference itself, a
+    # bare word is not a state, and states are only linked within their own model
+    assert fluxx.link_references(models_data) == 5
+    grant_refs = models_data['Grant Request']['references']
+    organization_refs = models_data['Organization']['references']
+    assert grant_refs['calls'] == [
+        {'location': theme, 'kind': 'method', 'model': 'Grant Request', 'name': 'notify', 'count': 1, 'draft': False},
+        {'location': 'Theme Main / Draft After Create Block', 'kind': 'state', 'model': 'Grant Request',
+         'name': 'approved', 'count': 1, 'draft': True}]
+    assert sorted((entry['location'], entry['kind'], entry['model'], entry['name'])
+                  for entry in organization_refs['calls']) == [
+        ('Method notify / Current Code', 'model', 'Grant Request', 'GrantRequest'),
+        (theme, 'method', 'Organization', 'notify'),
+        (theme, 'model', 'Grant Request', 'GrantRequest')]
+    assert sorted(entry['location'] for entry in grant_refs['called_by'] if entry['kind'] == 'model') == \
+        ['Method notify / Current Code', theme]
+    
+    assert fluxx.referenced_by(models_data['Grant Request'], 'state', 'approved') == \
+        'Grant Request › Theme Main / Draft After Create Block'
+    assert fluxx.referenced_by(models_data['Grant Request'], 'state', 'approved', include_drafts=False) is None
+    assert fluxx.referenced_by(models_data['Grant Request'], 'model', 'GrantRequest', limit=1) == \
+        f'Organization › {theme}; and 1 more'
+    
+    # Linking again starts from scratch rather than adding duplicate edges
+    assert fluxx.link_references(models_data) == 5
+    assert len(models_data['Grant Request']['references']['calls']) == 2